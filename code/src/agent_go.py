@@ -13,17 +13,94 @@ from utils_camera import *          # 摄像头
 from utils_robot import *           # 机械臂运动
 from utils_pump import *            # GPIO、吸泵
 from utils_vlm_move import *        # 多模态大模型识别图像，吸泵吸取并移动物体
+from utils_vlm_movetome import *    # 多模态大模型识别图像，把物体拿给我
 from utils_drag_teaching import *   # 拖动示教
 from utils_agent import *           # 智能体Agent编排
 from utils_tts import *             # 语音合成模块
+from utils_plan import *            # 编排结果解析、校验与执行
+from utils_memory import *          # 有界对话记忆
+import asyncio
+import threading
 
 # print('播放欢迎词')
 pump_off()
+get_camera_stream()                 # 启动常驻摄像头采集线程，拍照时无需再打开摄像头预热
+threading.Thread(target=prewarm_tts, daemon=True).start()  # 后台预热常用回复的语音缓存
 # back_zero()
 #play_wav('asset/welcome.wav')
 
-message=[]
-message.append({"role":"system","content":AGENT_SYS_PROMPT})
+registry = build_registry(globals())   # 智能体可调用的函数注册表
+DRY_RUN = False                     # True：只预演编排并估算耗时，不运动机械臂
+
+memory = ConversationMemory(AGENT_SYS_PROMPT)   # 对话记忆：固定系统提示词，早期对话折叠为摘要
+GROUNDING_FUNCS = {'vlm_move': 0, 'vlm_movetome': 2}   # 需要视觉定位的函数 -> 多模态大模型系统提示词编号
+SCENE_FUNCS = {'vlm_move', 'vlm_movetome', 'crack_move', 'drag_teach'}  # 执行后桌面画面会改变的函数
+CONCURRENT_FUNCS = {'llm_led'}                          # 不等机械臂运动，与后续动作并行执行
+SPEAKING_FUNCS = {'vlm_vqa'}                            # 会播放语音，需等回复播报结束
+
+def speak(response):
+    '''
+    语音合成并播放机器人的回复
+    '''
+    print('开始语音合成')
+    speak_stream(response)            # 分句合成，边合成边播放
+
+def step_prompt(step):
+    '''
+    取出视觉动作的指令参数，不是字符串时返回None
+    '''
+    prompt = step.args[0] if step.args else step.kwargs.get('PROMPT')
+    return prompt if isinstance(prompt, str) else None
+
+async def run_plan(plan):
+    '''
+    异步执行智能体编排的动作：
+    语音合成和播放与第一个动作同时进行；
+    编排中有vlm_move等视觉定位动作，且它之前没有会改变桌面画面的动作时，先拍俯视图并在后台请求多模态大模型，
+    前面的动作照常执行，轮到该动作时直接使用定位结果；
+    机械臂动作按顺序执行，LED灯等不占用机械臂的动作在后台并行；
+    动作在线程中执行时不操作OpenCV窗口，拍到的俯视图回到事件循环线程再显示
+    '''
+    steps = plan.steps
+
+    # 找出可以提前定位的视觉动作
+    grounding = None
+    for i, step in enumerate(steps):
+        if step.name in GROUNDING_FUNCS and step_prompt(step) is not None:
+            grounding = i
+        if step.name in SCENE_FUNCS:
+            break
+
+    speech = asyncio.create_task(asyncio.to_thread(speak, plan.response))
+    locate = None
+    if grounding is not None:
+        step = steps[grounding]
+        print('提前拍摄俯视图，后台请求多模态大模型', step.text)
+        img_bgr = await asyncio.to_thread(top_view_shot, False)
+        show_image('waiic_vlm', img_bgr)    # OpenCV窗口只能在主线程（事件循环线程）显示
+        locate = asyncio.create_task(asyncio.to_thread(vlm_locate, step_prompt(step), img_bgr, GROUNDING_FUNCS[step.name]))
+
+    background = []
+    output_other = ''
+    for i, step in enumerate(steps): # 运行智能体规划编排的每个函数
+        print('开始执行动作', step.text)
+        if step.name in CONCURRENT_FUNCS:
+            background.append(asyncio.create_task(asyncio.to_thread(run_step, step, registry)))
+            continue
+        if step.name in SPEAKING_FUNCS:
+            await speech
+        if i == grounding:
+            # 定位失败时result为None，函数内部会重新拍照定位
+            result = await locate
+            ret = await asyncio.to_thread(run_step, step, registry, result=result)
+        else:
+            ret = await asyncio.to_thread(run_step, step, registry)
+        if ret != None:
+            output_other = ret
+
+    await asyncio.gather(speech, *background)
+    return output_other
+
 def agent_play():
     '''
     主函数，语音控制机械臂智能体编排动作
@@ -36,11 +113,16 @@ def agent_play():
     
     # 输入指令
     # 先回到原点，再把LED灯改为墨绿色，然后把绿色方块放在篮球上
-    start_record_ok = input('是否开启录音，输入数字录音指定时长，按k打字输入，按c输入默认指令\n')
-    if str.isnumeric(start_record_ok):
+    start_record_ok = input('是否开启录音，输入数字录音指定时长，按v说完自动识别，按k打字输入，按c输入默认指令\n')
+    if start_record_ok == 'v':
+        # 边说边识别，说完后拿到最终结果立即开始编排
+        for kind, text in stream_recognition():
+            print('识别中：' if kind == 'partial' else '识别结果：', text)
+            order = text
+    elif str.isnumeric(start_record_ok):
         DURATION = int(start_record_ok)
-        record(DURATION=DURATION)   # 录音
-        order = speech_recognition() # 语音识别
+        audio = record(DURATION=DURATION)   # 录音
+        order = speech_recognition(audio) # 语音识别
     elif start_record_ok == 'k':
         order = input('请输入指令')
     elif start_record_ok == 'c':
@@ -51,28 +133,25 @@ def agent_play():
         raise NameError('无指令，退出')
     
     # 智能体Agent编排动作
-    message.append({"role": "user", "content": order})
-    agent_plan_output = eval(agent_plan(message))
-    
+    memory.add("user", order)
+    plan = parse_plan(agent_plan(memory.messages()))
+    agent_plan_output = {'function': [step.text for step in plan.steps], 'response': plan.response}
+
     print('智能体编排动作如下\n', agent_plan_output)
+    dry_run(plan, registry)         # 校验函数和参数，预估耗时，不合法时抛出PlanError
+    if DRY_RUN:
+        memory.add("assistant", str(agent_plan_output))
+        return
     # plan_ok = input('是否继续？按c继续，按q退出')
     plan_ok = 'c'
     if plan_ok == 'c':
-        response = agent_plan_output['response'] # 获取机器人想对我说的话
-        print('开始语音合成')
-        tts(response)                     # 语音合成，导出wav音频文件
-        play_wav('temp/tts.wav')          # 播放语音合成音频文件
-        output_other=''
-        for each in agent_plan_output['function']: # 运行智能体规划编排的每个函数
-            print('开始执行动作', each)
-            ret=eval(each)
-            if ret!=None:
-                output_other=ret
+        # 语音播报、视觉定位与机械臂动作并行执行
+        output_other = asyncio.run(run_plan(plan))
     elif plan_ok =='q':
         # exit()
         raise NameError('按q退出')
     agent_plan_output['response']+='.'+ output_other
-    message.append({"role":"assistant","content":str(agent_plan_output)})
+    memory.add("assistant", str(agent_plan_output))
 
 # agent_play()
 if __name__ == '__main__':
@@ -1,6 +1,6 @@
 # calibrate_cli.py
 import sys
-from utils_robot import robot, handeye
+from utils_robot import handeye
 
 def main() -> None:
     print("=== MyCobot 手眼标定 CLI ===")
@@ -5,6 +5,7 @@ import json
 import os
 import time
 import math
+from utils_crack_path import resample_polyline
 from utils_robot import *  # 导入机械臂控制函数
 from utils_crack_upload import *
 
@@ -55,29 +56,7 @@ def extract_ordered_line_coordinates(image_path, output_json_path, num_points=50
     end_point = edge_points[-1]
 
     # 沿轮廓等距采样
-    def interpolate_points(points, num_points):
-        distances = np.sqrt(np.sum(np.diff(points, axis=0) ** 2, axis=1))
-        cumulative_distances = np.cumsum(distances)
-        total_distance = cumulative_distances[-1]
-        target_distances = np.linspace(0, total_distance, num_points)
-        interpolated_points = []
-        for target_distance in target_distances:
-            if target_distance == 0:
-                interpolated_points.append(points[0])
-            else:
-                idx = np.searchsorted(cumulative_distances, target_distance)
-                if idx == 0:
-                    interpolated_points.append(points[0])
-                else:
-                    prev_point = points[idx - 1]
-                    next_point = points[idx]
-                    prev_distance = cumulative_distances[idx - 1]
-                    fraction = (target_distance - prev_distance) / distances[idx - 1]
-                    interpolated_point = prev_point + fraction * (next_point - prev_point)
-                    interpolated_points.append(interpolated_point)
-        return np.array(interpolated_points)
-
-    ordered_points = interpolate_points(points, num_points)
+    ordered_points = resample_polyline(points, num_points)
 
     # 点坐标排序算法 - 确保点按顺序连接形成连续线条
     def sort_points(points, start, end):
@@ -1,6 +1,7 @@
 # handeye.py
 import json
 import logging
+import os
 from pathlib import Path
 from typing import List, Tuple, Optional
 
@@ -19,6 +20,7 @@ class HandEye:
         self.pixel_pts: Optional[np.ndarray] = None
         self.world_pts: Optional[np.ndarray] = None
         self.M: Optional[np.ndarray] = None          # 3×3 透视矩阵
+        self._mtime: Optional[float] = None          # 已加载标定文件的修改时间
         self._load_or_create()
 
     # ---------------- 标定 ----------------
@@ -53,23 +55,56 @@ class HandEye:
         self._save()
 
     # ---------------- 坐标映射 ----------------
+    def is_calibrated(self) -> bool:
+        self.reload_if_changed()
+        return self.pixel_pts is not None and len(self.pixel_pts) >= 2
+
     def pixel_to_world(self, px: Tuple[int, int]) -> Tuple[float, float]:
+        x, y = self.pixels_to_world([px])[0]
+        return float(x), float(y)
+
+    def pixels_to_world(self, pixels) -> np.ndarray:
+        """批量像素坐标 → 机械臂坐标，N×2 输入，N×2 输出，一次 perspectiveTransform 完成"""
+        self.reload_if_changed()
+        pts = np.asarray(pixels, dtype=np.float32).reshape(-1, 2)
         if self.M is not None and len(self.pixel_pts) >= 4:
-            pts = np.array([[px]], dtype=np.float32)
-            dst = cv2.perspectiveTransform(pts, self.M)[0][0]
-            return float(dst[0]), float(dst[1])
-        # 线性插值兜底
-        x = float(np.interp(px[0], self.pixel_pts[:, 0], self.world_pts[:, 0]))
-        y = float(np.interp(px[1], self.pixel_pts[:, 1], self.world_pts[:, 1]))
-        return x, y
+            return cv2.perspectiveTransform(pts.reshape(-1, 1, 2), self.M).reshape(-1, 2)
+        # 线性插值兜底（np.interp 要求横坐标递增）
+        ox = np.argsort(self.pixel_pts[:, 0])
+        oy = np.argsort(self.pixel_pts[:, 1])
+        x = np.interp(pts[:, 0], self.pixel_pts[ox, 0], self.world_pts[ox, 0])
+        y = np.interp(pts[:, 1], self.pixel_pts[oy, 1], self.world_pts[oy, 1])
+        return np.stack([x, y], axis=1)
+
+    def reload_if_changed(self) -> bool:
+        """标定文件被修改（如另一进程重新标定）后自动重新加载
+        文件不完整或格式错误时保留原来的标定，下次调用再重试"""
+        try:
+            mtime = self.cfg_path.stat().st_mtime
+        except FileNotFoundError:
+            return False
+        if mtime == self._mtime:
+            return False
+        try:
+            self._load_or_create()
+        except (ValueError, KeyError) as e:
+            log.warning(f"标定文件读取失败，沿用原标定：{e}")
+            return False
+        return True
 
     # ---------------- 持久化 ----------------
     def _load_or_create(self) -> None:
         if self.cfg_path.exists():
+            mtime = self.cfg_path.stat().st_mtime
             data = json.loads(self.cfg_path.read_text())
-            self.pixel_pts = np.array(data["pixel"], dtype=np.float32)
-            self.world_pts = np.array(data["world"], dtype=np.float32)
+            pixel = np.array(data["pixel"], dtype=np.float32).reshape(-1, 2)
+            world = np.array(data["world"], dtype=np.float32).reshape(-1, 2)
+            if len(pixel) != len(world):
+                raise ValueError(f"像素点 {len(pixel)} 个与机械臂点 {len(world)} 个不一致")
+            # 读取成功后才替换当前标定
+            self.pixel_pts, self.world_pts = pixel, world
             self._calc_matrix()
+            self._mtime = mtime
             log.info("已加载标定文件")
         else:
             self.pixel_pts = self.world_pts = None
@@ -83,6 +118,10 @@ class HandEye:
         if self.pixel_pts is None:
             return
         self.cfg_path.parent.mkdir(exist_ok=True)
-        json.dump({"pixel": self.pixel_pts.tolist(),
-                   "world": self.world_pts.tolist()},
-                  self.cfg_path.open("w"), indent=2)
\ No newline at end of file
+        # 先写临时文件再原子替换，其他进程不会读到写了一半的标定文件
+        tmp_path = self.cfg_path.with_name(self.cfg_path.name + ".tmp")
+        with tmp_path.open("w") as f:
+            json.dump({"pixel": self.pixel_pts.tolist(),
+                       "world": self.world_pts.tolist()}, f, indent=2)
+        os.replace(tmp_path, self.cfg_path)
+        self._mtime = self.cfg_path.stat().st_mtime
\ No newline at end of file
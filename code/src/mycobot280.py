@@ -88,8 +88,23 @@ class MyCobot280(CommandGenerator):
             close()
             open()
             wait() *
+            pipeline_query() *
     """
 
+    # Queries that pipeline_query() can batch, method name -> ProtocolCode
+    PIPELINE_QUERIES = {
+        "get_angles": ProtocolCode.GET_ANGLES,
+        "get_coords": ProtocolCode.GET_COORDS,
+        "get_angles_coords": ProtocolCode.GET_ANGLES_COORDS,
+        "get_encoders": ProtocolCode.GET_ENCODERS,
+        "get_servo_speeds": ProtocolCode.GET_SERVO_SPEED,
+        "get_servo_voltages": ProtocolCode.GET_SERVO_VOLTAGES,
+        "get_servo_status": ProtocolCode.GET_SERVO_STATUS,
+        "get_servo_temps": ProtocolCode.GET_SERVO_TEMPS,
+        "is_moving": ProtocolCode.IS_MOVING,
+        "get_fresh_mode": ProtocolCode.GET_FRESH_MODE,
+    }
+
     def __init__(self, port, baudrate="115200", timeout=0.1, debug=False, thread_lock=True):
         """
         Args:
@@ -151,15 +166,23 @@ class MyCobot280(CommandGenerator):
         else:
             try_count = 0
             while try_count < 3:
+                # Drop stale bytes (e.g. a late reply to an earlier query) before sending,
+                # and only accept a reply whose genre matches the command
+                self._serial_port.reset_input_buffer()
                 self._write(self._flatten(real_command))
                 data = self._read(genre)
-                if data is not None and data != b'':
-                    break
-                try_count += 1
+                if not data or len(data) < 4 or data[3] != genre:
+                    try_count += 1
+                    continue
+                break
             else:
                 return -1
         if genre == ProtocolCode.SET_SSID_PWD:
             return 1
+        res = self._decode_reply(data, genre)
+        return -1 if res is None else res
+
+    def _decode_reply(self, data, genre):
         res = self._process_received(data, genre)
         if res is None:
             return None
@@ -242,6 +265,85 @@ class MyCobot280(CommandGenerator):
         else:
             return res
 
+    def pipeline_query(self, *queries, timeout=0.5, retries=1):
+        """Send several queries back-to-back and collect all replies in one pass.
+
+        The commands are written in a single serial write, replies are split into
+        frames and matched to their query by ProtocolCode, so N queries cost about
+        one round trip instead of N.
+
+        Args:
+            *queries: method names in PIPELINE_QUERIES, e.g. "get_angles", "get_coords".
+                      The same query may appear more than once.
+            timeout: seconds to wait for the replies of one round
+            retries: how many times queries without a reply are sent again
+
+        Return:
+            list: results in the same order and format as the single-query methods,
+                  -1 for a query that never got a reply.
+        """
+        unknown = [q for q in queries if q not in self.PIPELINE_QUERIES]
+        if unknown:
+            raise ValueError("pipeline_query does not support: {}".format(unknown))
+        genres = [self.PIPELINE_QUERIES[q] for q in queries]
+        frames = [None] * len(genres)
+        for _ in range(retries + 1):
+            missing = [i for i, frame in enumerate(frames) if frame is None]
+            if not missing:
+                break
+            commands = [super(MyCobot280, self)._mesg(genres[i], has_reply=True)[0] for i in missing]
+            if self.thread_lock:
+                with self.lock:
+                    replies = self._pipeline_exchange(commands, [genres[i] for i in missing], timeout)
+            else:
+                replies = self._pipeline_exchange(commands, [genres[i] for i in missing], timeout)
+            for i, frame in zip(missing, replies):
+                frames[i] = frame
+        return [-1 if frame is None else self._decode_reply(frame, genre)
+                for frame, genre in zip(frames, genres)]
+
+    def _pipeline_exchange(self, commands, genres, timeout):
+        # Write all commands at once, then read until every genre has its reply
+        self._serial_port.reset_input_buffer()
+        self._write([byte for command in commands for byte in self._flatten(command)])
+        echoes = set(bytes(self._flatten(command)) for command in commands)
+        waiting = {}
+        for index, genre in enumerate(genres):
+            waiting.setdefault(genre, []).append(index)
+        replies = [None] * len(genres)
+        remaining = len(genres)
+        buf = bytearray()
+        deadline = time.time() + timeout
+        while remaining and time.time() < deadline:
+            buf += self._serial_port.read(max(1, self._serial_port.in_waiting))
+            while True:
+                start = buf.find(b"\xfe\xfe")
+                if start < 0:
+                    del buf[:-1]
+                    break
+                if len(buf) < start + 4:
+                    del buf[:start]
+                    break
+                length = buf[start + 2]
+                if length < 2 or length > 64:
+                    del buf[:start + 1]
+                    continue
+                end = start + 3 + length
+                if len(buf) < end:
+                    del buf[:start]
+                    break
+                frame = bytes(buf[start:end])
+                del buf[:end]
+                if frame[-1] != ProtocolCode.FOOTER or frame in echoes:
+                    continue
+                indexes = waiting.get(frame[3])
+                if indexes:
+                    replies[indexes.pop(0)] = frame
+                    remaining -= 1
+        if remaining:
+            self.log.debug("_pipeline_exchange: {} replies missing".format(remaining))
+        return replies
+
     # System Status
     def get_error_information(self):
         """Obtaining robot error information
@@ -0,0 +1,296 @@
+# mycobot_sim.py
+# 仿真机械臂：实现本项目用到的MyCobot280指令，按关节速度计算运动过程，可设置串口延迟
+# 设置环境变量 MYCOBOT_SIM=1 后，connect_robot()返回仿真机械臂，MYCOBOT_SIM=0.02 表示每条指令延迟20毫秒
+
+import math
+import threading
+import time
+
+import numpy as np
+
+SIM_LATENCY = 0.01          # 默认每条指令的串口往返延迟（秒）
+MAX_JOINT_SPEED = 160.0     # speed=100时的关节角速度（度/秒）
+ACCEL_TIME = 0.2            # 起步、停止的加减速时间（秒）
+
+# MyCobot280 DH参数：(theta偏置, d, a, alpha)，长度单位mm
+DH = [(0.0, 131.22, 0.0, math.pi / 2),
+      (-math.pi / 2, 0.0, -110.4, 0.0),
+      (0.0, 0.0, -96.0, 0.0),
+      (-math.pi / 2, 63.4, 0.0, math.pi / 2),
+      (math.pi / 2, 75.05, 0.0, -math.pi / 2),
+      (0.0, 45.6, 0.0, 0.0)]
+
+JOINT_LIMITS = np.array([[-168, 168], [-135, 135], [-150, 150],
+                         [-145, 145], [-165, 165], [-180, 180]], dtype=float)
+
+
+def forward_kinematics(angles):
+    '''
+    正运动学：关节角（度）-> [x, y, z, rx, ry, rz]（mm、度，姿态为ZYX欧拉角）
+    '''
+    T = np.eye(4)
+    for q, (offset, d, a, alpha) in zip(np.radians(angles), DH):
+        th = q + offset
+        ct, st, ca, sa = math.cos(th), math.sin(th), math.cos(alpha), math.sin(alpha)
+        T = T @ np.array([[ct, -st * ca, st * sa, a * ct],
+                          [st, ct * ca, -ct * sa, a * st],
+                          [0, sa, ca, d],
+                          [0, 0, 0, 1]])
+    R = T[:3, :3]
+    ry = math.asin(-max(-1.0, min(1.0, R[2, 0])))
+    if abs(R[2, 0]) < 1 - 1e-9:
+        rx = math.atan2(R[2, 1], R[2, 2])
+        rz = math.atan2(R[1, 0], R[0, 0])
+    else:                                   # 万向锁：rx并入rz
+        rx = 0.0
+        rz = math.atan2(-R[0, 1], R[1, 1])
+    return np.concatenate([T[:3, 3], np.degrees([rx, ry, rz])])
+
+
+def _rotation(rpy):
+    rx, ry, rz = np.radians(rpy)
+    cx, sx, cy, sy, cz, sz = math.cos(rx), math.sin(rx), math.cos(ry), math.sin(ry), math.cos(rz), math.sin(rz)
+    return np.array([[cz * cy, cz * sy * sx - sz * cx, cz * sy * cx + sz * sx],
+                     [sz * cy, sz * sy * sx + cz * cx, sz * sy * cx - cz * sx],
+                     [-sy, cy * sx, cy * cx]])
+
+
+def _pose_error(angles, target):
+    # 位置误差（mm）+ 姿态误差（旋转向量，按100mm/rad加权）
+    now = forward_kinematics(angles)
+    R_err = _rotation(target[3:]) @ _rotation(now[3:]).T
+    angle = math.acos(max(-1.0, min(1.0, (np.trace(R_err) - 1) / 2)))
+    if angle < 1e-9:
+        rot = np.zeros(3)
+    else:
+        rot = angle / (2 * math.sin(angle)) * np.array([R_err[2, 1] - R_err[1, 2],
+                                                         R_err[0, 2] - R_err[2, 0],
+                                                         R_err[1, 0] - R_err[0, 1]])
+    return np.concatenate([target[:3] - now[:3], 100.0 * rot])
+
+
+def inverse_kinematics(coords, seed, iterations=200, tol=0.5):
+    '''
+    数值逆运动学（阻尼最小二乘），从seed关节角出发求解，返回(关节角, 是否收敛)
+    '''
+    target = np.asarray(coords, dtype=float)
+    q = np.clip(np.asarray(seed, dtype=float), JOINT_LIMITS[:, 0], JOINT_LIMITS[:, 1])
+    for _ in range(iterations):
+        err = _pose_error(q, target)
+        if np.linalg.norm(err[:3]) < tol and np.linalg.norm(err[3:]) < tol:
+            return q, True
+        J = np.empty((6, 6))
+        for i in range(6):
+            dq = np.zeros(6)
+            dq[i] = 0.1
+            J[:, i] = (err - _pose_error(q + dq, target)) / 0.1
+        step = J.T @ np.linalg.solve(J @ J.T + 4.0 * np.eye(6), err)
+        q = np.clip(q + np.clip(step, -10, 10), JOINT_LIMITS[:, 0], JOINT_LIMITS[:, 1])
+    return q, False
+
+
+def _ease(s):
+    # 起止平滑的插值比例，与ACCEL_TIME配合近似梯形速度
+    return s * s * (3 - 2 * s)
+
+
+class SimMyCobot280:
+    '''
+    仿真MyCobot280，指令接口与pymycobot一致
+    运动按时间计算：每条运动指令是一段从起点到终点的关节空间轨迹，时长由最大关节转角和速度决定，
+    队列模式（fresh_mode=0）下新指令排在上一段之后，刷新模式（fresh_mode=1）下立即从当前位置转向新目标
+    latency：每条指令的串口往返延迟（秒）
+    '''
+
+    def __init__(self, port=None, baudrate=None, latency=SIM_LATENCY, max_speed=MAX_JOINT_SPEED, debug=False):
+        self.latency = latency
+        self.max_speed = max_speed
+        self.fresh_mode = 0
+        self.color = (255, 255, 255)
+        self.servos_on = True
+        self.segments = []          # [(开始时间, 结束时间, 起点关节角, 终点关节角), ...]
+        self.rest = np.zeros(6)     # 没有运动时的关节角
+        self.lock = threading.RLock()
+        self.commands = 0
+
+    # ---------- 内部 ----------
+    def _wire(self):
+        self.commands += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _angles_at(self, t):
+        for t0, t1, q0, q1 in self.segments:
+            if t < t0:
+                return q0
+            if t < t1:
+                return q0 + (q1 - q0) * _ease((t - t0) / (t1 - t0))
+        return self.segments[-1][3] if self.segments else self.rest
+
+    def _now(self):
+        # 丢弃已经完成的轨迹段
+        t = time.time()
+        while self.segments and self.segments[0][1] <= t:
+            self.rest = self.segments.pop(0)[3]
+        return t, self._angles_at(t)
+
+    def _move(self, target, speed):
+        t, current = self._now()
+        target = np.clip(np.asarray(target, dtype=float), JOINT_LIMITS[:, 0], JOINT_LIMITS[:, 1])
+        if self.fresh_mode == 1 or not self.segments:
+            self.segments = []
+            self.rest = current
+            start_t, start_q = t, current
+        else:
+            start_t, start_q = self.segments[-1][1], self.segments[-1][3]
+        speed = self.max_speed * min(max(float(speed), 1.0), 100.0) / 100.0
+        duration = float(np.max(np.abs(target - start_q))) / speed
+        if duration > 0:
+            self.segments.append((start_t, start_t + duration + ACCEL_TIME, start_q, target))
+        self.servos_on = True
+        return 1
+
+    def _target(self):
+        return self.segments[-1][3] if self.segments else self.rest
+
+    # ---------- 运动 ----------
+    def send_angles(self, angles, speed, _async=False):
+        with self.lock:
+            self._wire()
+            return self._move(angles, speed)
+
+    def send_angle(self, id, degree, speed):
+        with self.lock:
+            self._wire()
+            target = np.array(self._target())
+            target[int(id) - 1] = degree
+            return self._move(target, speed)
+
+    def send_coords(self, coords, speed, mode=0, _async=False):
+        with self.lock:
+            self._wire()
+            q, ok = inverse_kinematics(coords, self._target())
+            if not ok:
+                print('[sim] 坐标不可达，运动到最近的位置', list(coords))
+            return self._move(q, speed)
+
+    def send_coord(self, id, coord, speed):
+        with self.lock:
+            target = forward_kinematics(self._target())
+            target[int(id) - 1] = coord
+        return self.send_coords(target, speed)
+
+    def set_encoders(self, encoders, sp):
+        return self.send_angles([(e - 2048) * 360.0 / 4096 for e in encoders], sp)
+
+    def set_encoder(self, joint_id, encoder, speed=0):
+        return self.send_angle(joint_id, (encoder - 2048) * 360.0 / 4096, speed or 50)
+
+    def stop(self):
+        with self.lock:
+            self._wire()
+            self.rest = self._now()[1]
+            self.segments = []
+            return 1
+
+    def pause(self):
+        return self.stop()
+
+    def resume(self):
+        return 1
+
+    # ---------- 状态查询 ----------
+    def get_angles(self):
+        with self.lock:
+            self._wire()
+            return [round(float(a), 2) for a in self._now()[1]]
+
+    def get_coords(self):
+        with self.lock:
+            self._wire()
+            return [round(float(c), 2) for c in forward_kinematics(self._now()[1])]
+
+    def get_angles_coords(self):
+        with self.lock:
+            self._wire()
+            angles = self._now()[1]
+            return [round(float(v), 2) for v in np.concatenate([angles, forward_kinematics(angles)])]
+
+    def get_encoders(self):
+        with self.lock:
+            self._wire()
+            return [int(round(2048 + a * 4096 / 360.0)) for a in self._now()[1]]
+
+    def is_moving(self):
+        with self.lock:
+            self._wire()
+            self._now()
+            return 1 if self.segments else 0
+
+    def is_in_position(self, data, id=0):
+        with self.lock:
+            self._wire()
+            angles = self._now()[1]
+            if id == 1:
+                now, tol = forward_kinematics(angles)[:3], 5.0
+                data = data[:3]
+            else:
+                now, tol = angles, 1.0
+            return 1 if np.all(np.abs(np.asarray(data, dtype=float) - now) <= tol) else 0
+
+    def pipeline_query(self, *queries, timeout=0.5, retries=1):
+        '''
+        与mycobot280.MyCobot280.pipeline_query一致：多个查询只计一次串口往返延迟
+        '''
+        with self.lock:
+            self._wire()
+            latency, self.latency = self.latency, 0
+            try:
+                return [getattr(self, q)() for q in queries]
+            finally:
+                self.latency = latency
+
+    # ---------- 其它 ----------
+    def set_color(self, r=0, g=0, b=0):
+        with self.lock:
+            self._wire()
+            self.color = (r, g, b)
+            return 1
+
+    def release_all_servos(self, data=None):
+        with self.lock:
+            self._wire()
+            self.rest = self._now()[1]
+            self.segments = []
+            self.servos_on = False
+            return 1
+
+    def power_on(self):
+        with self.lock:
+            self._wire()
+            self.servos_on = True
+            return 1
+
+    def focus_all_servos(self):
+        return self.power_on()
+
+    def set_fresh_mode(self, mode):
+        with self.lock:
+            self._wire()
+            self.fresh_mode = int(mode)
+            return 1
+
+    def get_fresh_mode(self):
+        return self.fresh_mode
+
+    def set_end_type(self, end):
+        return 1
+
+    def set_vision_mode(self, flag):
+        return 1
+
+    def get_system_version(self):
+        return 'sim'
+
+    def close(self):
+        pass
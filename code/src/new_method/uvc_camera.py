@@ -13,7 +13,7 @@ class UVCCamera:
         capture_size: typing.Tuple[int, int] = (640, 480),
     ):
         super().__init__()
-        self.cam_index = 20
+        self.cam_index = cam_index
         self.mtx = mtx
         self.dist = dist
         self.curr_color_frame: typing.Union[np.ndarray, None] = None
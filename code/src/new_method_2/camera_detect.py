@@ -8,7 +8,11 @@ from marker_utils import *
 from scipy.linalg import svd
 from pymycobot import *
 from pymycobot import PI_PORT, PI_BAUD
-mc = MyCobot280(PI_PORT, PI_BAUD) # 需要手动设置端口及型号
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from robot_broker import connect_robot
+mc = connect_robot() # 代理进程在运行时共享串口，否则直接打开PI_PORT
 # mc = MyCobot320("COM32")  # 需要手动设置端口及型号
 type = mc.get_system_version()
 offset_j5 = 0
@@ -0,0 +1,189 @@
+# robot_broker.py
+# 机械臂连接代理：独占串口的代理进程，多个程序（智能体、调试监视、手眼标定）通过Unix套接字共享同一个机械臂连接
+# 启动代理：python robot_broker.py
+# 其它程序：mc = connect_robot()，用法与MyCobot280相同
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from multiprocessing.managers import BaseManager
+
+BROKER_ADDRESS = '/tmp/mycobot_broker.sock'   # Unix套接字路径
+BROKER_AUTHKEY = b'mycobot280'
+
+# 优先级：数字越小越先执行
+PRIORITY_URGENT = 0     # 急停、暂停、放松关节
+PRIORITY_MOTION = 1     # 运动指令（智能体、示教）
+PRIORITY_QUERY = 2      # 状态查询（调试监视、遥测）
+
+URGENT_METHODS = {'stop', 'pause', 'release_all_servos'}
+BLOCKED_METHODS = {'close', 'open'}           # 串口由代理进程管理，客户端不能关闭
+
+
+class RobotBroker:
+    '''
+    在代理进程内独占机械臂，所有客户端的调用进入同一个优先级队列，由一个工作线程按优先级、先来先到依次执行
+    '''
+
+    def __init__(self, arm):
+        self.arm = arm
+        self.queue = []                 # [(优先级, 序号, 任务), ...]
+        self.counter = itertools.count()
+        self.cond = threading.Condition()
+        self.calls = 0
+        self.busy_time = 0.0
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def call(self, method, args=(), kwargs=None, priority=PRIORITY_MOTION):
+        '''
+        调用机械臂方法，阻塞到执行完毕，返回结果；执行出错时异常原样抛给客户端
+        '''
+        if method.startswith('_') or method in BLOCKED_METHODS:
+            raise AttributeError('代理不允许调用 {}'.format(method))
+        if method in URGENT_METHODS:
+            priority = PRIORITY_URGENT
+        job = {'method': method, 'args': args, 'kwargs': kwargs or {},
+               'done': threading.Event(), 'result': None, 'error': None}
+        with self.cond:
+            heapq.heappush(self.queue, (priority, next(self.counter), job))
+            self.cond.notify()
+        job['done'].wait()
+        if job['error'] is not None:
+            raise job['error']
+        return job['result']
+
+    def stats(self):
+        '''
+        代理状态：{'calls', 'busy_time', 'pending'}
+        '''
+        with self.cond:
+            return {'calls': self.calls, 'busy_time': self.busy_time, 'pending': len(self.queue)}
+
+    def _loop(self):
+        while self.running:
+            with self.cond:
+                while not self.queue:
+                    self.cond.wait()
+                _, _, job = heapq.heappop(self.queue)
+            t0 = time.time()
+            try:
+                job['result'] = getattr(self.arm, job['method'])(*job['args'], **job['kwargs'])
+            except Exception as e:
+                job['error'] = e
+            with self.cond:
+                self.calls += 1
+                self.busy_time += time.time() - t0
+            job['done'].set()
+
+
+class _BrokerServer(BaseManager):
+    pass
+
+
+class _BrokerClient(BaseManager):
+    pass
+
+
+_BrokerClient.register('broker')
+
+
+class RobotClient:
+    '''
+    代理的客户端，接口与MyCobot280一致：mc.send_angles(...)、mc.get_angles()等都转发给代理进程执行
+    priority：本客户端调用的默认优先级
+    '''
+
+    def __init__(self, address=BROKER_ADDRESS, priority=PRIORITY_MOTION, authkey=BROKER_AUTHKEY):
+        manager = _BrokerClient(address=address, authkey=authkey)
+        manager.connect()
+        self._manager = manager
+        self._broker = manager.broker()
+        self._priority = priority
+
+    def __getattr__(self, method):
+        if method.startswith('_'):
+            raise AttributeError(method)
+
+        def remote(*args, **kwargs):
+            return self._broker.call(method, args, kwargs, self._priority)
+        remote.__name__ = method
+        return remote
+
+    def with_priority(self, priority):
+        '''
+        返回使用另一优先级、共享同一连接的客户端
+        '''
+        client = object.__new__(RobotClient)
+        client._manager = self._manager
+        client._broker = self._broker
+        client._priority = priority
+        return client
+
+    def broker_stats(self):
+        return self._broker.stats()
+
+    def close(self):
+        # 只断开与代理的连接，不关闭串口
+        pass
+
+
+def open_arm():
+    '''
+    直接打开机械臂；设置了环境变量MYCOBOT_SIM时返回仿真机械臂，值大于0且不为1时作为每条指令的延迟（秒）
+    '''
+    sim = os.environ.get('MYCOBOT_SIM', '').strip()
+    if sim and sim.lower() not in ('0', 'false', 'no'):
+        from mycobot_sim import SimMyCobot280, SIM_LATENCY
+        try:
+            latency = float(sim)
+        except ValueError:
+            latency = 1.0
+        latency = SIM_LATENCY if latency == 1.0 else latency
+        print('使用仿真机械臂，指令延迟 {} 秒'.format(latency))
+        return SimMyCobot280(latency=latency)
+    # 本地的MyCobot280（mycobot280.py）在pymycobot基础上增加了pipeline_query，遥测时多个查询合并为一次串口往返
+    from mycobot280 import MyCobot280
+    from pymycobot import PI_PORT, PI_BAUD
+    return MyCobot280(PI_PORT, PI_BAUD)
+
+
+def connect_robot(priority=PRIORITY_MOTION, address=BROKER_ADDRESS):
+    '''
+    连接机械臂：代理进程在运行时通过代理共享连接，否则直接打开串口（或仿真机械臂）
+    '''
+    if os.path.exists(address):
+        try:
+            client = RobotClient(address, priority)
+            print('通过代理进程连接机械臂', address)
+            return client
+        except (OSError, EOFError) as e:
+            print('机械臂代理进程连接失败，直接打开串口', e)
+    return open_arm()
+
+
+def serve(arm=None, address=BROKER_ADDRESS, authkey=BROKER_AUTHKEY):
+    '''
+    启动代理进程，阻塞运行
+    arm：机械臂对象，默认打开PI_PORT串口（设置MYCOBOT_SIM时为仿真机械臂）
+    '''
+    if arm is None:
+        arm = open_arm()
+    broker = RobotBroker(arm)
+    if os.path.exists(address):
+        os.unlink(address)          # 上次异常退出残留的套接字文件
+    _BrokerServer.register('broker', callable=lambda: broker)
+    server = _BrokerServer(address=address, authkey=authkey).get_server()
+    print('机械臂代理进程已启动', address)
+    try:
+        server.serve_forever()
+    finally:
+        if os.path.exists(address):
+            os.unlink(address)
+
+
+if __name__ == '__main__':
+    serve()
@@ -7,16 +7,19 @@
 import os
 import sys
 import time
-import json
 import threading
 import termios
 import tty
 
-from pymycobot import MyCobot280
-from pymycobot import PI_PORT, PI_BAUD
+import numpy as np
+
+from robot_broker import connect_robot
+from utils_telemetry import get_telemetry
+from utils_record import Recording, save_recording, load_recording
+from utils_playback import play, compress, SPEED_RANGE, COMPRESS_TOLERANCE, PLAY_RATE
 
 # ---------------- 连接机械臂 ----------------
-mc = MyCobot280(PI_PORT, PI_BAUD, debug=False)
+mc = connect_robot()
 
 # ---------------- 终端原始模式 ----------------
 class _Raw(object):
@@ -35,47 +38,64 @@ class DragTeacher:
         self.recording = False
         self.playing = False
         self.record = []
-        self.t_record = None
+        self.record_times = []      # 每条记录相对录制开始的时间（秒）
+        self.t_start = None
         self.t_play = None
-
-    def _recorder(self):
-        while self.recording:
-            enc = mc.get_encoders()
-            if enc:
-                self.record.append(enc)
-            time.sleep(0.1)
+        self.speed = 1.0            # 回放倍速
+        self.play_rate = PLAY_RATE  # 回放发送指令的频率（Hz）
+        self.smooth = False         # 是否用样条平滑轨迹，默认关键帧之间线性插值
+        self.compress_tolerance = COMPRESS_TOLERANCE    # 录制后压缩轨迹允许的关节误差（编码器刻度），0为不压缩
+
+    def _on_sample(self, t, angles, coords, encoders):
+        # 遥测线程每采样一次调用一次（10 Hz）
+        if self.recording and encoders is not None and not np.isnan(encoders).any():
+            if self.t_start is None:
+                self.t_start = t
+            self.record.append([int(e) for e in encoders])
+            self.record_times.append(t - self.t_start)
 
     def start_record(self):
-        self.record.clear()
-        self.recording = True
+        self.record = []
+        self.record_times = []
+        self.t_start = None
         mc.set_fresh_mode(0)
-        self.t_record = threading.Thread(target=self._recorder, daemon=True)
-        self.t_record.start()
+        self.recording = True
+        get_telemetry(mc, rate=10, with_encoders=True).subscribe(self._on_sample)
         print("\n>>> 开始录制，按 c 结束录制")
 
     def stop_record(self):
         if self.recording:
             self.recording = False
-            self.t_record.join()
+            get_telemetry(mc, with_encoders=True).unsubscribe(self._on_sample)
             print(">>> 录制结束")
+            if self.compress_tolerance and len(self.record) > 2:
+                n = len(self.record)
+                times, encoders = compress(self.record, self.record_times, self.compress_tolerance)
+                self.record = encoders.tolist()
+                self.record_times = times.tolist()
+                print(">>> 轨迹压缩: {} -> {} 个点".format(n, len(self.record)))
 
     def play_once(self):
         if not self.record:
             print(">>> 无录制数据")
             return
-        print(">>> 回放一次")
-        for enc in self.record:
-            mc.set_encoders(enc, 80)
-            time.sleep(0.1)
-        print(">>> 回放结束")
+        print(">>> 回放一次（{}倍速）".format(self.speed))
+        stats = play(mc, *self._timeline(), speed=self.speed, rate=self.play_rate, smooth=self.smooth)
+        print(">>> 回放结束，发送 {} 条指令，用时 {:.1f} 秒".format(stats['sent'], stats['duration']))
 
     def _looper(self):
-        idx = 0
-        n = len(self.record)
         while self.playing:
-            mc.set_encoders(self.record[idx % n], 80)
-            idx += 1
-            time.sleep(0.1)
+            play(mc, *self._timeline(), speed=self.speed, rate=self.play_rate, smooth=self.smooth,
+                 running=lambda: self.playing)
+
+    def _timeline(self):
+        encoders = self.record.encoders if isinstance(self.record, Recording) else self.record
+        times = self.record_times if len(self.record_times) == len(encoders) else None
+        return encoders, times
+
+    def change_speed(self, factor):
+        self.speed = min(max(round(self.speed * factor, 2), SPEED_RANGE[0]), SPEED_RANGE[1])
+        print(">>> 回放倍速", self.speed)
 
     def start_loop(self):
         if not self.record:
@@ -97,15 +117,15 @@ class DragTeacher:
         if not self.record:
             print(">>> 无数据可保存")
             return
-        os.makedirs("temp", exist_ok=True)
-        with open("temp/record.txt", "w") as f:
-            json.dump(self.record, f, indent=2)
-        print(">>> 已保存 temp/record.txt")
+        encoders = self.record.encoders if isinstance(self.record, Recording) else self.record
+        save_recording("temp/record.rec", encoders, self.record_times, meta={'rate': 10})
+        print(">>> 已保存 temp/record.rec")
 
     def load(self):
         try:
-            with open("temp/record.txt") as f:
-                self.record = json.load(f)
+            # 只有旧版temp/record.txt时自动转换
+            self.record = load_recording("temp/record.rec")
+            self.record_times = self.record.t
             print(">>> 已加载轨迹")
         except Exception as e:
             print(">>> 加载失败", e)
@@ -120,6 +140,8 @@ p : 回放一次
 P : 循环/停止循环
 s : 保存轨迹
 l : 加载轨迹
++ : 加快回放
+- : 减慢回放
 f : 放松机械臂
 q : 退出
 ----------------""")
@@ -148,6 +170,10 @@ q : 退出
                 self.save()
             elif key == "l":
                 self.load()
+            elif key in ("+", "="):
+                self.change_speed(1.5)
+            elif key == "-":
+                self.change_speed(1 / 1.5)
             elif key == "f":
                 mc.release_all_servos()
                 print(">>> 机械臂已放松")
@@ -1,6 +1,6 @@
 #test_xibeng.py
 
-from pymycobot import MyCobot280
+from mycobot280 import MyCobot280
 from pymycobot import PI_PORT, PI_BAUD  # 当使用树莓派版本的mycobot时，可以引用这两个变量进行MyCobot初始化
 import time
 from gpiozero.pins.lgpio import LGPIOFactory
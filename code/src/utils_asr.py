@@ -3,147 +3,270 @@
 
 print('正在导入录音+语音识别模块')
 
-import pyaudio
 import wave
 import numpy as np
 import os
 import sys
+import queue
+import threading
+import time
 from API_KEY import *
+from utils_vad import StreamingVAD, HANGOVER
+from utils_resource import lazy, appbuilder_client
 
 # 确定麦克风索引号
 # import sounddevice as sd
 # print(sd.query_devices())
 
-def record(MIC_INDEX=1, DURATION=5):
-    '''
-    调用麦克风录音，需用arecord -l命令获取麦克风ID
-    DURATION，录音时长
-    '''
-    print('开始 {} 秒录音'.format(DURATION))
-    os.system('sudo arecord -D "plughw:{}" -f dat -c 1 -r 16000 -d {} temp/speech_record.wav'.format(MIC_INDEX, DURATION))
-    print('录音结束')
+RATE = 16000               # 采样率
+CHUNK = 480                # 每次读取的采样数，与VAD帧长（30毫秒）一致
+CHANNELS = 1 if sys.platform == 'darwin' else 2 # 采样通道数
+
 
-def record_auto(MIC_INDEX=1):
+class AudioClip:
     '''
-    开启麦克风录音，保存至'temp/speech_record.wav'音频文件
-    音量超过阈值自动开始录音，低于阈值一段时间后自动停止录音
-    MIC_INDEX：麦克风设备索引号
+    内存中的一段录音：16位PCM数据（多声道交错存储）+ 格式，从录音直接交给语音识别，不经过磁盘
     '''
-    
-    CHUNK = 1024               # 采样宽度
-    RATE = 16000               # 采样率
-    
-    QUIET_DB = 2000            # 分贝阈值，大于则开始录音，否则结束
-    delay_time = 1             # 声音降至分贝阈值后，经过多长时间，自动终止录音
-    
-    FORMAT = pyaudio.paInt16
-    CHANNELS = 1 if sys.platform == 'darwin' else 2 # 采样通道数
-    
-    # 初始化录音
+
+    def __init__(self, pcm, rate=RATE, channels=1, sample_width=2):
+        self.pcm = pcm
+        self.rate = rate
+        self.channels = channels
+        self.sample_width = sample_width
+
+    @property
+    def duration(self):
+        return len(self.pcm) / float(self.rate * self.channels * self.sample_width)
+
+    def mono(self):
+        '''
+        转为单声道（取各声道平均）
+        '''
+        if self.channels == 1:
+            return self
+        samples = np.frombuffer(self.pcm, dtype=np.int16).reshape(-1, self.channels)
+        pcm = samples.mean(axis=1).astype(np.int16).tobytes()
+        return AudioClip(pcm, self.rate, 1, self.sample_width)
+
+    def save(self, wav_path):
+        '''
+        保存为wav文件，调试时使用
+        '''
+        with wave.open(wav_path, 'wb') as wf:
+            wf.setnchannels(self.channels)
+            wf.setsampwidth(self.sample_width)
+            wf.setframerate(self.rate)
+            wf.writeframes(self.pcm)
+        print('保存录音文件', wav_path)
+        return wav_path
+
+    @classmethod
+    def from_wav(cls, wav_path):
+        with wave.open(wav_path, 'rb') as wf:
+            return cls(wf.readframes(wf.getnframes()), wf.getframerate(), wf.getnchannels(), wf.getsampwidth())
+
+
+def _open_mic(MIC_INDEX):
+    import pyaudio          # 打开麦克风时才导入，只处理内存中音频的功能不依赖声卡驱动
     p = pyaudio.PyAudio()
-    stream = p.open(format=FORMAT,
+    stream = p.open(format=pyaudio.paInt16,
                     channels=CHANNELS,
                     rate=RATE,
                     input=True,
                     frames_per_buffer=CHUNK,
                     input_device_index=MIC_INDEX
                    )
-    
-    frames = []             # 所有音频帧
-    
-    flag = False            # 是否已经开始录音
-    quiet_flag = False      # 当前音量小于阈值
-    
-    temp_time = 0           # 当前时间是第几帧
-    last_ok_time = 0        # 最后正常是第几帧
-    START_TIME = 0          # 开始录音是第几帧
-    END_TIME = 0            # 结束录音是第几帧
+    return p, stream
+
+
+def _close_mic(p, stream):
+    stream.stop_stream()
+    stream.close()
+    p.terminate()
+
+
+def record(MIC_INDEX=1, DURATION=5, save_path=None):
+    '''
+    调用麦克风录音固定时长，返回AudioClip
+    MIC_INDEX：麦克风设备索引号；DURATION，录音时长
+    save_path：同时保存wav文件的路径，调试时使用
+    '''
+    print('开始 {} 秒录音'.format(DURATION))
+    p, stream = _open_mic(MIC_INDEX)
+    frames = [stream.read(CHUNK, exception_on_overflow=False) for _ in range(int(RATE * DURATION / CHUNK))]
+    _close_mic(p, stream)
+    print('录音结束')
+    clip = AudioClip(b''.join(frames), RATE, CHANNELS)
+    if save_path:
+        clip.save(save_path)
+    return clip
+
+def record_auto(MIC_INDEX=1, TIMEOUT=10, save_path=None):
+    '''
+    开启麦克风录音，返回AudioClip
+    流式语音活动检测：检测到说话自动开始录音，说话结束后自动停止，只保留语音段（含一小段预录）
+    MIC_INDEX：麦克风设备索引号
+    TIMEOUT：最长等待时长（秒），超时后返回已录到的语音
+    save_path：同时保存wav文件的路径，调试时使用
+    '''
+    p, stream = _open_mic(MIC_INDEX)
+    vad = StreamingVAD(rate=RATE, channels=CHANNELS)
     
     print('可以说话啦！')
-    
-    while True:
-        
-        # 获取当前chunk的声音
+    segment = None
+    while segment is None:
         data = stream.read(CHUNK, exception_on_overflow=False)
-        frames.append(data)
-        # 获取当前chunk的音量分贝值
-        temp_volume = np.max(np.frombuffer(data, dtype=np.short))
-        
-        if temp_volume > QUIET_DB and flag==False:
-            print("音量高于阈值，开始录音")
-            flag =True
-            START_TIME = temp_time
-            last_ok_time = temp_time
-    
-        if flag: # 录音中的各种情况
-    
-            if(temp_volume < QUIET_DB and quiet_flag==False):
-                print("录音中，当前音量低于阈值")
-                quiet_flag = True
-                last_ok_time = temp_time
-                
-            if(temp_volume > QUIET_DB):
-                # print('录音中，当前音量高于阈值，正常录音')
-                quiet_flag = False
-                last_ok_time = temp_time
-    
-            if(temp_time > last_ok_time + delay_time*15 and quiet_flag==True):
-                print("音量低于阈值{:.2f}秒后，检测当前音量".format(delay_time))
-                if(quiet_flag and temp_volume < QUIET_DB):
-                    print("当前音量仍然小于阈值，录音结束")
-                    END_TIME = temp_time
-                    break
-                else:
-                    print("当前音量重新高于阈值，继续录音中")
-                    quiet_flag = False
-                    last_ok_time = temp_time
-                    
-        # print('当前帧 {} 音量 {}'.format(temp_time+1, temp_volume))
-        temp_time += 1
-        if temp_time > 150:  # 超时直接退出
-            END_TIME = temp_time
+        segment = vad.push(data)
+        if segment is None and vad.duration > TIMEOUT:  # 超时直接退出
             print('超时，录音结束')
-            break
+            segment = vad.flush()
     
     # 停止录音
-    stream.stop_stream()
-    stream.close()
-    p.terminate()
+    _close_mic(p, stream)
     
-    # 导出wav音频文件
-    output_path = 'temp/speech_record.wav'
-    wf = wave.open(output_path, 'wb')
-    wf.setnchannels(CHANNELS)
-    wf.setsampwidth(p.get_sample_size(FORMAT))
-    wf.setframerate(RATE)
-    wf.writeframes(b''.join(frames[START_TIME-2:END_TIME]))
-    wf.close()
-    print('保存录音文件', output_path)
-
-import appbuilder
-# 配置密钥
-os.environ["APPBUILDER_TOKEN"] = APPBUILDER_TOKEN
-asr = appbuilder.ASR() # 语音识别组件
-def speech_recognition(audio_path='temp/speech_record.wav'):
+    clip = AudioClip(segment, RATE, CHANNELS)
+    print('录音时长 {:.2f} 秒'.format(clip.duration))
+    if save_path:
+        clip.save(save_path)
+    return clip
+
+asr = lazy('appbuilder_asr', appbuilder_client('ASR')) # 语音识别组件，第一次识别时才创建
+def _recognize_clip(clip):
+    # 调用AppBuilder语音识别，返回文字
+    clip = clip.mono()
+    content_data = {"audio_format": "wav", "raw_audio": clip.pcm, "rate": clip.rate}
+    import appbuilder
+    message = appbuilder.Message(content_data)
+    return asr.run(message).content['result'][0]
+
+
+def speech_recognition(audio='temp/speech_record.wav'):
     '''
     AppBuilder-SDK语音识别组件
+    audio：record/record_auto返回的AudioClip，或wav文件路径
     '''
     print('开始语音识别')
-    # 载入wav音频文件
-    with wave.open(audio_path, 'rb') as wav_file:
-        
-        # 获取音频文件的基本信息
-        num_channels = wav_file.getnchannels()
-        sample_width = wav_file.getsampwidth()
-        framerate = wav_file.getframerate()
-        num_frames = wav_file.getnframes()
-        
-        # 获取音频数据
-        frames = wav_file.readframes(num_frames)
-        
-    # 向API发起请求
-    content_data = {"audio_format": "wav", "raw_audio": frames, "rate": 16000}
-    message = appbuilder.Message(content_data)
-    speech_result = asr.run(message).content['result'][0]
+    if not isinstance(audio, AudioClip):
+        audio = AudioClip.from_wav(audio)   # 载入wav音频文件
+    speech_result = _recognize_clip(audio)
     print('语音识别结果：', speech_result)
-    return speech_result
\ No newline at end of file
+    return speech_result
+
+
+class StreamingASR:
+    '''
+    流式语音识别：边说边送入音频，后台线程每积累interval秒新音频就识别一次已录到的全部音频，得到中间结果；
+    结束时再识别一次得到最终结果，最后一次中间结果已经覆盖全部语音（之后只有静音）时直接作为最终结果
+    recognize：识别函数，输入AudioClip返回文字，默认调用AppBuilder语音识别
+    '''
+
+    def __init__(self, recognize=None, rate=RATE, channels=CHANNELS, interval=0.8):
+        self.recognize = recognize or _recognize_clip
+        self.rate = rate
+        self.channels = channels
+        self.interval_bytes = int(interval * rate) * 2 * channels
+        self.chunks = []
+        self.size = 0               # 已送入的字节数
+        self.submitted = 0          # 最近一次送去识别时的字节数
+        self.partial = ('', 0)      # (最新中间结果, 覆盖的字节数)
+        self.events = queue.Queue()
+        self.lock = threading.Lock()
+        self.worker = None
+
+    def feed(self, pcm):
+        with self.lock:
+            self.chunks.append(pcm)
+            self.size += len(pcm)
+            idle = self.worker is None or not self.worker.is_alive()
+            if idle and self.size - self.submitted >= self.interval_bytes:
+                self._submit()
+
+    def poll(self):
+        '''
+        取出新的中间结果，返回[('partial', 文字), ...]
+        '''
+        events = []
+        while not self.events.empty():
+            events.append(self.events.get())
+        return events
+
+    def finish(self, tail=0.0):
+        '''
+        说话结束，返回最终结果
+        tail：末尾静音时长（秒），最后一次中间结果之后只多了这些静音时不再识别
+        '''
+        if self.worker is not None:
+            self.worker.join()
+        text, covered = self.partial
+        if covered and self.size - covered <= int(tail * self.rate) * 2 * self.channels:
+            return text
+        if self.size == 0:
+            return ''
+        return self.recognize(self._clip())
+
+    def _clip(self):
+        return AudioClip(b''.join(self.chunks), self.rate, self.channels)
+
+    def _submit(self):
+        self.submitted = self.size
+        clip = self._clip()
+        self.worker = threading.Thread(target=self._run, args=(clip, self.size), daemon=True)
+        self.worker.start()
+
+    def _run(self, clip, covered):
+        try:
+            text = self.recognize(clip)
+        except Exception as e:
+            print('中间结果识别失败', e)
+            return
+        self.partial = (text, covered)
+        self.events.put(('partial', text))
+
+
+class ScriptedRecognizer:
+    '''
+    本地替身识别器，测试流式识别用：不调用云端接口，按音频时长返回预设文字的前若干个字
+    text：预设文字；chars_per_second：每秒音频对应的字数；delay：模拟的识别耗时（秒）
+    '''
+
+    def __init__(self, text, chars_per_second=4.0, delay=0.2):
+        self.text = text
+        self.chars_per_second = chars_per_second
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self, clip):
+        self.calls += 1
+        time.sleep(self.delay)
+        return self.text[:int(clip.duration * self.chars_per_second)]
+
+
+def stream_recognition(MIC_INDEX=1, recognize=None, TIMEOUT=10, source=None):
+    '''
+    边录音边识别的生成器：依次产出('partial', 中间结果)，最后产出('final', 最终结果)
+    recognize：识别函数，默认AppBuilder语音识别，测试时可传入ScriptedRecognizer
+    source：音频来源，可迭代的PCM数据块，默认打开麦克风
+    '''
+    asr_stream = StreamingASR(recognize)
+    vad = StreamingVAD(rate=RATE, channels=CHANNELS, on_frame=asr_stream.feed)
+    mic = None
+    if source is None:
+        mic = _open_mic(MIC_INDEX)
+        source = iter(lambda: mic[1].read(CHUNK, exception_on_overflow=False), None)
+    try:
+        print('可以说话啦！')
+        for data in source:
+            segment = vad.push(data)
+            for event in asr_stream.poll():
+                yield event
+            if segment is not None:
+                break
+            if vad.duration > TIMEOUT:  # 超时直接退出
+                print('超时，录音结束')
+                break
+    finally:
+        if mic is not None:
+            _close_mic(*mic)
+    final = asr_stream.finish(tail=HANGOVER)
+    print('语音识别结果：', final)
+    yield 'final', final
@@ -1,24 +1,130 @@
 # utils_camera.py
 # 开启摄像头，调用摄像头实时画面，按q键退出
+# 常驻摄像头采集线程，随取随用最新一帧
 
 import cv2
 import numpy as np
+import time
+import threading
+from collections import deque
+
+from new_method.uvc_camera import UVCCamera
+
+
+class CameraStream:
+    '''
+    常驻摄像头采集线程
+    摄像头只打开一次，后台线程持续读取V4L2缓冲区，只保留最近N帧（附带采集时间戳），
+    拍照时直接取最新一帧，无需每次打开摄像头、等待预热
+    '''
+
+    def __init__(self, cam_index=20, capture_size=(640, 480), buffer_len=4):
+        self.camera = UVCCamera(cam_index, capture_size=capture_size)
+        self.frames = deque(maxlen=buffer_len)   # [(时间戳, 图像), ...]
+        self.cond = threading.Condition()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if self.running:
+            return self
+        self.camera.capture()
+        # 驱动缓冲区只留1帧，避免读到排队的旧画面
+        self.camera.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+        return self
+
+    def _loop(self):
+        while self.running:
+            if not self.camera.update_frame():
+                time.sleep(0.01)
+                continue
+            t = time.time()
+            with self.cond:
+                self.frames.append((t, self.camera.color_frame()))
+                self.cond.notify_all()
+
+    def latest(self, after=None, timeout=2.0):
+        '''
+        获取最新一帧，返回(时间戳, 图像)，超时返回(None, None)
+        after：只接受该时间（time.time()）之后采集的帧，用于保证机械臂到位后的画面不是旧帧
+        timeout：最长等待时间（秒）
+        '''
+        def ready():
+            return len(self.frames) > 0 and (after is None or self.frames[-1][0] > after)
+
+        with self.cond:
+            if not self.cond.wait_for(ready, timeout):
+                return None, None
+            return self.frames[-1]
+
+    def read(self, after=None, timeout=2.0):
+        '''
+        获取最新一帧图像，接口与cv2.VideoCapture.read保持一致，返回(是否成功, 图像)
+        '''
+        _, frame = self.latest(after=after, timeout=timeout)
+        return frame is not None, frame
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1)
+        self.camera.release()
+        self.frames.clear()
+
+
+_camera_stream = None
+
+
+def get_camera_stream(cam_index=20):
+    '''
+    获取全局唯一的常驻摄像头采集线程，第一次调用时打开摄像头
+    '''
+    global _camera_stream
+    if _camera_stream is None:
+        print('启动常驻摄像头采集线程')
+        _camera_stream = CameraStream(cam_index).start()
+    return _camera_stream
+
+
+def show_image(name, img, wait=1):
+    '''
+    在窗口中显示图像，等待wait毫秒
+    OpenCV的窗口只能在主线程操作，在其他线程（如asyncio.to_thread执行的动作）中调用时不显示，返回False
+    '''
+    if threading.current_thread() is not threading.main_thread():
+        return False
+    cv2.imshow(name, img)
+    cv2.waitKey(wait)
+    return True
+
+
+def close_windows():
+    '''
+    关闭所有OpenCV窗口，不在主线程时什么也不做
+    '''
+    if threading.current_thread() is threading.main_thread():
+        cv2.destroyAllWindows()
+
 
 def check_camera():
     '''
     开启摄像头，调用摄像头实时画面，按q键退出
     '''
     print('开启摄像头')
-    cap = cv2.VideoCapture('/dev/video20', cv2.CAP_V4L2)
-    
+    cam = get_camera_stream()
+
     while(True):
-        ret, frame = cap.read()
-    
+        ret, frame = cam.read()
+        if not ret:
+            continue
+
         # gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    
+
         cv2.imshow('frame', frame)
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
-    
-    cap.release()
-    cv2.destroyAllWindows()
\ No newline at end of file
+
+    cv2.destroyAllWindows()
@@ -0,0 +1,57 @@
+# utils_client.py
+# OpenAI兼容接口的客户端复用：按base_url缓存客户端，保持HTTP长连接
+
+import threading
+
+import httpx
+import openai
+
+CLIENT_TIMEOUT = 60.0          # 单次请求超时（秒）
+CONNECT_TIMEOUT = 5.0          # 建立连接超时（秒）
+CLIENT_MAX_RETRIES = 3         # 连接失败、429、5xx时的重试次数，SDK内部按指数退避等待
+KEEPALIVE_EXPIRY = 60.0        # 空闲长连接保留时间（秒）
+MAX_CONNECTIONS = 8            # 每个base_url的最大连接数
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(base_url, api_key, timeout=None, max_retries=None):
+    '''
+    获取OpenAI兼容接口的客户端，同一(base_url, api_key)全程只创建一次
+    复用的客户端共享同一个HTTP连接池，后续请求不再重复TCP/TLS握手
+    base_url：接口地址
+    api_key：密钥
+    timeout：请求超时（秒），默认CLIENT_TIMEOUT，只在首次创建时生效
+    max_retries：失败重试次数，默认CLIENT_MAX_RETRIES，只在首次创建时生效
+    '''
+    key = (base_url, api_key)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            timeout = CLIENT_TIMEOUT if timeout is None else timeout
+            http_client = openai.DefaultHttpxClient(
+                limits=httpx.Limits(max_connections=MAX_CONNECTIONS,
+                                    max_keepalive_connections=MAX_CONNECTIONS,
+                                    keepalive_expiry=KEEPALIVE_EXPIRY),
+                timeout=httpx.Timeout(timeout, connect=CONNECT_TIMEOUT),
+            )
+            client = openai.OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                timeout=httpx.Timeout(timeout, connect=CONNECT_TIMEOUT),
+                max_retries=CLIENT_MAX_RETRIES if max_retries is None else max_retries,
+                http_client=http_client,
+            )
+            _clients[key] = client
+    return client
+
+
+def close_clients():
+    '''
+    关闭所有缓存的客户端及其连接池
+    '''
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
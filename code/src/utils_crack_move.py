@@ -5,6 +5,7 @@ import json
 import os
 import time
 import math
+from utils_crack_path import resample_polyline, extract_centerline
 from utils_robot import *  # 导入机械臂控制函数
 from utils_crack_upload import *
 
@@ -28,89 +29,19 @@ def extract_ordered_line_coordinates(image_path, output_json_path, num_points=50
     # 将透明通道转换为二值图像
     _, binary = cv2.threshold(alpha_channel, 1, 255, cv2.THRESH_BINARY)
 
-    # 查找轮廓
-    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
-
-    # 假设最长的轮廓是目标线条
-    if len(contours) == 0:
-        raise ValueError("未检测到任何轮廓！")
-    max_contour = max(contours, key=cv2.contourArea)
-
-    # 提取轮廓上的点
-    points = max_contour.reshape(-1, 2)
+    height, width = binary.shape
 
-    # 找到起点和终点（在图像边界上的点）
-    def is_on_edge(point, width, height):
-        return point[0] == 0 or point[0] == width - 1 or point[1] == 0 or point[1] == height - 1
+    # 骨架化提取裂纹中心线，沿骨架连通关系得到有序折线（不再沿外轮廓两侧走）
+    centerline = extract_centerline(binary)
+    if len(centerline) < 2:
+        raise ValueError("未检测到裂纹中心线！")
 
-    height, width = binary.shape
+    # 中心线两端即起点和终点，起点为靠近图像边界的一端
+    start_point = centerline[0].tolist()
+    end_point = centerline[-1].tolist()
 
-    # 找到所有在边界上的点
-    edge_points = [point for point in points if is_on_edge(point, width, height)]
-
-    if len(edge_points) < 2:
-
-        raise ValueError("未找到足够的边界点！")
-
-    # 假设第一个和最后一个边界点是起点和终点
-    start_point = edge_points[0]
-    end_point = edge_points[-1]
-
-    # 沿轮廓等距采样
-    def interpolate_points(points, num_points):
-        distances = np.sqrt(np.sum(np.diff(points, axis=0) ** 2, axis=1))
-        cumulative_distances = np.cumsum(distances)
-        total_distance = cumulative_distances[-1]
-        target_distances = np.linspace(0, total_distance, num_points)
-        interpolated_points = []
-        for target_distance in target_distances:
-            if target_distance == 0:
-                interpolated_points.append(points[0])
-            else:
-                idx = np.searchsorted(cumulative_distances, target_distance)
-                if idx == 0:
-                    interpolated_points.append(points[0])
-                else:
-                    prev_point = points[idx - 1]
-
-                    next_point = points[idx]
-                    prev_distance = cumulative_distances[idx - 1]
-                    fraction = (target_distance - prev_distance) / distances[idx - 1]
-                    interpolated_point = prev_point + fraction * (next_point - prev_point)
-                    interpolated_points.append(interpolated_point)
-        return np.array(interpolated_points)
-
-    ordered_points = interpolate_points(points, num_points)
-
-    # 点坐标排序算法 - 确保点按顺序连接形成连续线条
-    def sort_points(points, start, end):
-        """对点进行排序，从起点开始，沿着线条到终点"""
-        # 计算每个点到起点的距离
-        distances = np.linalg.norm(points - start, axis=1)
-
-        # 按距离排序
-        sorted_indices = np.argsort(distances)
-        sorted_points = points[sorted_indices]
-
-        # 确保起点是第一个点
-        start_idx = np.argmin(np.linalg.norm(sorted_points - start, axis=1))
-        if start_idx > 0:
-            sorted_points = np.roll(sorted_points, -start_idx, axis=0)
-
-
-        # 确保终点是最后一个点
-        end_idx = np.argmin(np.linalg.norm(sorted_points - end, axis=1))
-        if end_idx < len(sorted_points) - 1:
-            # 如果终点不在最后，反转后半部分点
-            sorted_points = np.concatenate([
-                sorted_points[:end_idx + 1],
-                np.flip(sorted_points[end_idx + 1:], axis=0)
-            ])
-
-        return sorted_points
-
-    # 应用排序算法
-    sorted_points = sort_points(ordered_points, start_point, end_point)
+    # 沿中心线等距采样
+    sorted_points = resample_polyline(centerline, num_points)
 
     # 创建JSON输出
     output = {
@@ -173,14 +104,13 @@ def extract_ordered_line_coordinates(image_path, output_json_path, num_points=50
         print(f"可视化图像已保存至: {visual_path}")
 
         # 显示可视化图像（可选）
-        cv2.imshow("Crack Visualization", visual_image)
-        cv2.waitKey(5000)  # 显示1秒
-        cv2.destroyAllWindows()
+        show_image("Crack Visualization", visual_image, 5000)  # 显示5秒
+        close_windows()
 
     return output
 
 
-def move_along_crack(json_path, safe_height=230, speed=20, delay=1.0):
+def move_along_crack(json_path, safe_height=230, speed=20, delay=1.0, stream=True, rate=5, lookahead=3):
     """
     控制机械臂沿着裂纹点坐标顺序移动（从第二个点开始）
 
@@ -190,7 +120,10 @@ def move_along_crack(json_path, safe_height=230, speed=20, delay=1.0):
     safe_height: 机械臂移动的安全高度
 
     speed: 机械臂移动速度
-    delay: 每个点之间的延迟时间（秒）
+    delay: 每个点之间的延迟时间（秒），仅逐点模式使用
+    stream: 是否流式执行（连续运动），False时逐点发送并等待delay秒
+    rate: 流式执行的下发频率上限（点/秒）
+    lookahead: 流式执行时控制器队列中保留的待执行点数
 
     """
     # 读取裂纹点坐标
@@ -208,45 +141,50 @@ def move_along_crack(json_path, safe_height=230, speed=20, delay=1.0):
     # 移动到安全高度
     print("移动机械臂到安全高度...")
     mc.send_coords([0, 0, safe_height, 0, 180, 90], speed, 0)
-    time.sleep(3)
+    wait_motion([0, 0, safe_height], mode=1, fallback=3)
 
-    # 移动到起点上方
+    # 先走到起点再开始流式执行：从安全位置到第一个点的距离较长，放在轨迹里会超过停滞判定时间
     start_point = crack_data["start_point"]
     start_x, start_y = eye2hand(start_point["x"], start_point["y"])
-   # print(f"移动到起点上方: ({start_x}, {start_y})")
-    #mc.send_coords([start_x, start_y, safe_height, 0, 180, 90], speed, 0)
-    #time.sleep(3)
+    print(f"移动到起点上方: ({start_x}, {start_y})")
+    mc.send_coords([start_x, start_y, safe_height, 0, 180, 90], speed, 0)
+    wait_motion([start_x, start_y, safe_height], mode=1, fallback=3)
 
     # 移动到起点位置（降低高度）
-    #print(f"移动到起点位置: ({start_x}, {start_y})")
-    #mc.send_coords([start_x, start_y, safe_height - 50, 0, 180, 90], speed, 0)
-    #time.sleep(2)
+    print(f"移动到起点位置: ({start_x}, {start_y})")
+    mc.send_coords([start_x, start_y, safe_height - 50, 0, 180, 90], speed, 0)
+    wait_motion([start_x, start_y, safe_height - 50], mode=1, fallback=2)
 
     # 沿着裂纹点移动（从第二个点开始）
 
     print("开始沿着裂纹移动")
 
-    # 跳过第一个点（起点），从第二个点开始
-    for i, point in enumerate(points[1:], start=1):  # 从索引1开始
-        # 手眼标定转换
-        x_robot, y_robot = eye2hand(point["x"], point["y"])
-
-        # 移动到当前点（保持安全高度）
-        print(f"移动至点 {i + 1}/{len(points)}: ({x_robot}, {y_robot})")
-        mc.send_coords([x_robot, y_robot, safe_height - 50, 0, 180, 90], speed, 0)
-        time.sleep(delay)
+    # 跳过第一个点（起点），从第二个点开始，先把所有点换算成机械臂坐标
+    # 手眼标定批量转换
+    path_xy = eye2hand_batch([[point["x"], point["y"]] for point in points[1:]])
+    path_coords = [[int(x_robot), int(y_robot), safe_height - 50, 0, 180, 90] for x_robot, y_robot in path_xy]
+
+    if stream:
+        # 流式执行，连续运动
+        stream_coords(path_coords, speed=speed, rate=rate, lookahead=lookahead)
+    else:
+        for i, coords in enumerate(path_coords, start=1):
+            # 移动到当前点（保持安全高度）
+            print(f"移动至点 {i + 1}/{len(points)}: ({coords[0]}, {coords[1]})")
+            mc.send_coords(coords, speed, 0)
+            time.sleep(delay)
 
     # 移动到终点上方
     end_point = crack_data["end_point"]
     end_x, end_y = eye2hand(end_point["x"], end_point["y"])
     print(f"移动到终点上方: ({end_x}, {end_y})")
     mc.send_coords([end_x, end_y, safe_height, 0, 180, 90], speed, 0)
-    time.sleep(2)
+    wait_motion([end_x, end_y, safe_height], mode=1, fallback=2)
 
     # 返回安全位置
     print("返回安全位置...")
     mc.send_coords([0, 0, safe_height, 0, 180, 90], speed, 0)
-    time.sleep(3)
+    wait_motion([0, 0, safe_height], mode=1, fallback=3)
 
     print("裂纹跟踪完成！")
 
@@ -263,28 +201,23 @@ def crack_move(PROMPT='焊接裂缝', input_way='keyboard'):
             check：是否需要人工看屏幕确认拍照成功，再在键盘上按q键确认继续
         '''
         print('    移动至俯视姿态')
-        move_to_top_view()
-        time.sleep(1)
+        move_to_top_view()      # 阻塞到机械臂进入到位容差
+        wait_settled()          # 等机械臂完全停稳
+        time.sleep(CAMERA_SETTLE)
 
-        # 获取摄像头，传入0表示获取系统默认摄像头
-        cap = cv2.VideoCapture(20)
-        # 打开cap
-        cap.open(20)
-        time.sleep(2)
-        success, img_bgr = cap.read()
+        # 从常驻采集线程取机械臂停稳之后的最新一帧
+        success, img_bgr = get_camera_stream().read(after=time.time())
+        if not success:
+            raise RuntimeError('摄像头取帧失败')
 
         # 保存图像
         print('    保存至同目录下的crack.png')
         cv2.imwrite('crack.png', img_bgr)
 
         # 屏幕上展示图像
-        cv2.destroyAllWindows()  # 关闭所有opencv窗口
-        cv2.imshow('waiic_crack', img_bgr)
-        cv2.waitKey(1000)  # 显示1秒
-        cv2.destroyAllWindows()
-
-        # 关闭摄像头
-        cap.release()
+        close_windows()  # 关闭所有opencv窗口
+        show_image('waiic_crack', img_bgr, 1000)  # 显示1秒
+        close_windows()
 
         # 2. 调用分割API
         print("调用分割API处理图像...")
@@ -0,0 +1,165 @@
+# utils_crack_path.py
+# 裂纹路径几何处理：折线等距重采样、骨架中心线提取
+
+import cv2
+import numpy as np
+from collections import deque
+
+
+def resample_polyline(points, num_points):
+    '''
+    沿折线按弧长等距重采样，全部向量化计算（一次searchsorted + 批量线性插值）
+    points：N×2 折线顶点，按连接顺序排列
+    num_points：输出点数，包含首尾两点
+    返回：num_points×2 浮点数组
+    '''
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(points) == 0:
+        raise ValueError("折线没有任何点！")
+    if len(points) == 1 or num_points < 2:
+        return np.repeat(points[:1], num_points, axis=0)
+
+    # 每段长度及累计弧长，cum[i]为第i个顶点处的弧长
+    seg = np.diff(points, axis=0)
+    seg_len = np.hypot(seg[:, 0], seg[:, 1])
+    cum = np.concatenate(([0.0], np.cumsum(seg_len)))
+
+    # 所有目标弧长一次性定位到所在线段
+    targets = np.linspace(0.0, cum[-1], num_points)
+    idx = np.searchsorted(cum, targets, side='right') - 1
+    idx = np.clip(idx, 0, len(seg) - 1)
+
+    # 段内比例，零长度线段取0
+    offset = targets - cum[idx]
+    frac = np.divide(offset, seg_len[idx], out=np.zeros_like(offset), where=seg_len[idx] > 0)
+    return points[idx] + frac[:, None] * seg[idx]
+
+
+# 8邻域偏移（dy, dx）
+_NEIGHBOR_OFFSETS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+
+
+def _zhang_suen_lut():
+    '''
+    预先计算Zhang-Suen两个子迭代的256项删除判定表，下标为P2~P9（从正上方开始顺时针）的8位邻域码
+    '''
+    luts = (np.zeros(256, dtype=bool), np.zeros(256, dtype=bool))
+    for code in range(256):
+        p2, p3, p4, p5, p6, p7, p8, p9 = [(code >> i) & 1 for i in range(8)]
+        ring = [p2, p3, p4, p5, p6, p7, p8, p9, p2]
+        b = sum(ring[:8])                                            # 前景邻居数
+        a = sum(ring[i] == 0 and ring[i + 1] == 1 for i in range(8))  # 0→1跳变数
+        if 2 <= b <= 6 and a == 1:
+            luts[0][code] = p2 * p4 * p6 == 0 and p4 * p6 * p8 == 0
+            luts[1][code] = p2 * p4 * p8 == 0 and p2 * p6 * p8 == 0
+    return luts
+
+
+_ZHANG_SUEN_LUT = _zhang_suen_lut()
+# P2~P9 对应的偏移（dy, dx），顺序与邻域码的位顺序一致
+_ZHANG_SUEN_OFFSETS = [(-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1)]
+
+
+def skeletonize(binary):
+    '''
+    二值图骨架化（细化为单像素宽的中心线）
+    优先使用opencv-contrib的ximgproc.thinning，没有时使用numpy向量化的Zhang-Suen细化，
+    每轮只计算剩余前景像素的邻域码再查表，计算量与前景像素数成正比
+    binary：二值图，非0为前景
+    返回：uint8骨架图，骨架像素为1
+    '''
+    img = (np.asarray(binary) > 0).astype(np.uint8)
+    if hasattr(cv2, 'ximgproc'):
+        return (cv2.ximgproc.thinning(img * 255) > 0).astype(np.uint8)
+
+    img = np.pad(img, 1)
+    ys, xs = np.nonzero(img)
+    while True:
+        changed = False
+        for lut in _ZHANG_SUEN_LUT:
+            code = np.zeros(len(ys), dtype=np.uint8)
+            for bit, (dy, dx) in enumerate(_ZHANG_SUEN_OFFSETS):
+                code |= img[ys + dy, xs + dx] << bit
+            remove = lut[code]
+            if remove.any():
+                # 同一子迭代内的像素同时删除
+                img[ys[remove], xs[remove]] = 0
+                ys, xs = ys[~remove], xs[~remove]
+                changed = True
+        if not changed:
+            return img[1:-1, 1:-1]
+
+
+def _longest_skeleton_path(skel):
+    '''
+    在骨架像素构成的8邻域图上求最长路径（两次BFS求直径），分支毛刺自动被剪掉
+    返回：按连接顺序排列的 M×2 (x, y) 整数坐标
+    '''
+    ys, xs = np.nonzero(skel)
+    n = len(xs)
+    if n == 0:
+        return np.empty((0, 2), dtype=np.int64)
+
+    # 像素 → 节点编号，四周补一圈-1，批量查出每个节点的8个邻居
+    index = np.full((skel.shape[0] + 2, skel.shape[1] + 2), -1, dtype=np.int64)
+    index[ys + 1, xs + 1] = np.arange(n)
+    nbr = np.stack([index[ys + 1 + dy, xs + 1 + dx] for dy, dx in _NEIGHBOR_OFFSETS], axis=1)
+    adjacency = [row[row >= 0].tolist() for row in nbr]
+
+    def bfs(src):
+        parent = [-1] * n
+        seen = [False] * n
+        seen[src] = True
+        queue = deque([src])
+        last = src
+        while queue:
+            last = queue.popleft()
+            for v in adjacency[last]:
+                if not seen[v]:
+                    seen[v] = True
+                    parent[v] = last
+                    queue.append(v)
+        return last, parent
+
+    end_a, _ = bfs(0)
+    end_b, parent = bfs(end_a)
+    path = [end_b]
+    while path[-1] != end_a:
+        path.append(parent[path[-1]])
+    path = np.array(path)
+    return np.stack([xs[path], ys[path]], axis=1)
+
+
+def extract_centerline(binary):
+    '''
+    提取裂纹中心线：闭运算补洞 → 骨架化 → 保留最大连通骨架 → 最长路径
+    binary：裂纹分割二值图（如分割结果的透明通道）
+    返回：按连接顺序排列的 M×2 (x, y) 整数坐标，起点为更靠近图像边界的一端
+    '''
+    mask = (np.asarray(binary) > 0).astype(np.uint8)
+    if not mask.any():
+        return np.empty((0, 2), dtype=np.int64)
+
+    # 只在裂纹外接矩形内计算，4K图上大幅减少骨架化的计算量
+    x0, y0, w, h = cv2.boundingRect(mask)
+    pad = 2
+    x0, y0 = max(x0 - pad, 0), max(y0 - pad, 0)
+    roi = mask[y0:y0 + h + 2 * pad, x0:x0 + w + 2 * pad]
+    roi = cv2.morphologyEx(roi, cv2.MORPH_CLOSE, np.ones((3, 3), np.uint8))
+
+    skel = skeletonize(roi)
+    num, labels, stats, _ = cv2.connectedComponentsWithStats(skel, connectivity=8)
+    if num <= 1:
+        return np.empty((0, 2), dtype=np.int64)
+    largest = 1 + int(np.argmax(stats[1:, cv2.CC_STAT_AREA]))
+    line = _longest_skeleton_path(labels == largest) + [x0, y0]
+
+    # 起点取离图像边界更近的一端，与原先“从边界点出发”的约定保持一致
+    height, width = mask.shape
+
+    def edge_distance(p):
+        return min(p[0], p[1], width - 1 - p[0], height - 1 - p[1])
+
+    if edge_distance(line[-1]) < edge_distance(line[0]):
+        line = line[::-1]
+    return line
@@ -5,12 +5,14 @@ import sys
 import tty
 import termios
 import cv2
-from pymycobot import MyCobot280, PI_PORT, PI_BAUD
+from robot_broker import connect_robot, PRIORITY_QUERY
+from utils_telemetry import get_telemetry
 
 # -------------------- 初始化 --------------------
-mc = MyCobot280(PI_PORT, PI_BAUD)
+mc = connect_robot(PRIORITY_QUERY)   # 通过代理连接时，状态查询让位于其它程序的运动指令
 mc.release_all_servos()          # 真正自由模式
 print("机械臂已释放电机（自由模式）")
+telemetry = get_telemetry(mc, rate=10)   # 后台采样，主循环只读最新状态
 print("实时打印中：按 r 复位 / 按 q 退出")
 print("摄像头画面已开启（窗口：camera）\n")
 
@@ -65,8 +67,10 @@ try:
             print("复位完成，已重新释放电机")
             continue
 
-        angles = mc.get_angles()
-        coords = mc.get_coords()
+        sample = telemetry.latest()
+        if sample is None:
+            continue
+        _, angles, coords, _ = sample
         print(
             f"\r{time.strftime('%H:%M:%S')} | "
             f"角度: [{', '.join(f'{a:7.2f}°' for a in angles)}] | "
@@ -80,6 +84,7 @@ except KeyboardInterrupt:
     pass
 
 print("\n👋 程序退出")
+telemetry.stop()
 mc.send_angles([0, 0, 0, 0, 0, 0], 30)
 time.sleep(2)
 mc.close()
\ No newline at end of file
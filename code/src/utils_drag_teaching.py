@@ -7,12 +7,15 @@ import sys
 import termios
 import tty
 import threading
-import json
 
-from pymycobot import MyCobot280, PI_PORT, PI_BAUD
+from utils_record import RecordingWriter, Recording, save_recording, load_recording
+from utils_playback import play, compress, COMPRESS_TOLERANCE, PLAY_RATE
 
-# 连接机械臂
-mc = MyCobot280(PI_PORT, PI_BAUD, debug=False)
+# 连接机械臂：与utils_robot共用同一个串口连接
+from utils_robot import mc
+
+RECORD_PATH = os.path.join(os.path.dirname(__file__), "temp", "record.rec")            # 录制文件
+RECORD_LIVE_PATH = os.path.join(os.path.dirname(__file__), "temp", "record_live.rec")  # 录制中实时写入的文件
 
 class Raw(object):
     """Set raw input mode for device"""
@@ -39,21 +42,33 @@ class TeachingTest(Helper):
         self.recording = False
         self.playing = False
         self.record_list = []
+        self.record_times = []          # 每条记录相对录制开始的时间（秒）
         self.record_t = None
         self.play_t = None
+        self.play_speed = 1.0           # 回放倍速，0.5~3
+        self.play_rate = PLAY_RATE      # 回放发送指令的频率（Hz）
+        self.play_smooth = False        # 是否用样条平滑轨迹，默认关键帧之间线性插值
+        self.compress_tolerance = COMPRESS_TOLERANCE    # 录制后压缩轨迹允许的关节误差（编码器刻度），0为不压缩
 
     def record(self):
         self.record_list = []
+        self.record_times = []
         self.recording = True
         self.mc.set_fresh_mode(0)          # 队列模式
+        # 边录边写入二进制文件，录制中断也能找回
+        writer = RecordingWriter(RECORD_LIVE_PATH, meta={'rate': 10})
         def _record():
             start_t = time.time()
-            while self.recording:
-                encs = self.mc.get_encoders()
-                if encs:
-                    self.record_list.append(encs)
-                    time.sleep(0.1)
-                    print("\r {}".format(time.time() - start_t), end="")
+            with writer:
+                while self.recording:
+                    encs = self.mc.get_encoders()
+                    if encs:
+                        t = time.time() - start_t
+                        self.record_list.append(encs)
+                        self.record_times.append(t)
+                        writer.append(encs, t)
+                        time.sleep(0.1)
+                        print("\r {}".format(t), end="")
         self.echo("开始录制动作")
         self.record_t = threading.Thread(target=_record, daemon=True)
         self.record_t.start()
@@ -63,24 +78,25 @@ class TeachingTest(Helper):
             self.recording = False
             self.record_t.join()
             self.echo("停止录制动作")
+            if self.compress_tolerance and len(self.record_list) > 2:
+                # 原始采样仍保存在record_live.rec中
+                n = len(self.record_list)
+                times, encoders = compress(self.record_list, self.record_times, self.compress_tolerance)
+                self.record_list = encoders.tolist()
+                self.record_times = times.tolist()
+                self.echo("轨迹压缩: {} -> {} 个点".format(n, len(self.record_list)))
 
     def play(self):
         self.echo("开始回放动作")
-        for encs in self.record_list:
-            self.mc.set_encoders(encs, 80)
-            time.sleep(0.1)
+        play(self.mc, *self._timeline(), speed=self.play_speed, rate=self.play_rate, smooth=self.play_smooth)
         self.echo("回放结束\n")
 
     def loop_play(self):
         self.playing = True
         def _loop():
-            len_ = len(self.record_list)
-            i = 0
             while self.playing:
-                idx_ = i % len_
-                i += 1
-                self.mc.set_encoders(self.record_list[idx_], 80)
-                time.sleep(0.1)
+                play(self.mc, *self._timeline(), speed=self.play_speed, rate=self.play_rate, smooth=self.play_smooth,
+                     running=lambda: self.playing)
         self.echo("开始循环回放")
         self.play_t = threading.Thread(target=_loop, daemon=True)
         self.play_t.start()
@@ -91,28 +107,36 @@ class TeachingTest(Helper):
             self.play_t.join()
             self.echo("停止循环回放")
 
+    def _timeline(self):
+        # 编码器和对应的时间戳；时间戳不全时按固定间隔回放
+        encoders = self.record_list.encoders if isinstance(self.record_list, Recording) else self.record_list
+        times = self.record_times if len(self.record_times) == len(encoders) else None
+        return encoders, times
+
     def save_to_local(self):
         if not self.record_list:
             self.echo("No data should save.")
             return
-        save_path = os.path.join(os.path.dirname(__file__), "temp", "record.txt")
-        os.makedirs(os.path.dirname(save_path), exist_ok=True)
-        with open(save_path, "w") as f:
-            json.dump(self.record_list, f, indent=2)
-            self.echo("回放动作导出至: {}".format(save_path))
+        if isinstance(self.record_list, Recording):
+            encoders = self.record_list.encoders
+        else:
+            encoders = self.record_list
+        save_recording(RECORD_PATH, encoders, self.record_times, meta={'rate': 10})
+        self.echo("回放动作导出至: {}".format(RECORD_PATH))
 
     def load_from_local(self):
-        load_path = os.path.join(os.path.dirname(__file__), "temp", "record.txt")
-        if not os.path.exists(load_path):
+        # 只有旧版record.txt时自动转换为record.rec
+        try:
+            recording = load_recording(RECORD_PATH)
+        except FileNotFoundError:
             self.echo("本地文件不存在")
             return
-        with open(load_path, "r") as f:
-            try:
-                data = json.load(f)
-                self.record_list = data
-                self.echo("载入本地动作数据成功")
-            except Exception:
-                self.echo("Error: invalid data.")
+        except Exception:
+            self.echo("Error: invalid data.")
+            return
+        self.record_list = recording
+        self.record_times = recording.t
+        self.echo("载入本地动作数据成功")
 
     def print_menu(self):
         print(
@@ -38,6 +38,7 @@ def llm_qianfan(PROMPT='你好，你是谁？'):
 import openai
 from openai import OpenAI
 from API_KEY import *
+from utils_client import get_client
 def llm_yi(message):
     '''
     零一万物大模型API
@@ -52,7 +53,7 @@ def llm_yi(message):
     # MODEL = 'yi-lightning'
 
     # 访问大模型API
-    client = OpenAI(api_key=API_KEY, base_url=API_BASE)
+    client = get_client(API_BASE, API_KEY)
     completion = client.chat.completions.create(model=MODEL, messages= message)
     result = completion.choices[0].message.content.strip()
     return result
@@ -0,0 +1,130 @@
+# utils_memory.py
+# 智能体对话记忆：固定系统提示词 + 最近若干轮原文 + 更早对话的摘要，发送给大模型的长度不随对话轮数增长
+
+import re
+import threading
+from collections import deque
+
+_CJK = re.compile(r'[　-〿㐀-䶿一-鿿＀-￯]')
+
+
+def count_tokens(text):
+    '''
+    粗略估算token数：中文字符和全角标点每个算1个，其余字符每4个算1个
+    '''
+    text = str(text)
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def _clip(text, max_tokens):
+    # 按估算token数截断，过长时保留开头
+    text = ' '.join(str(text).split())
+    if count_tokens(text) <= max_tokens:
+        return text
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(text[:mid]) + 1 <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo] + '…'
+
+
+class ConversationMemory:
+    '''
+    有界对话记忆
+    system_prompt：固定在最前面的系统提示词，永不淘汰
+    max_tokens：除系统提示词外，摘要和最近对话的总token预算
+    window：最多保留的最近消息条数（用户和助手各算一条）
+    淘汰按整轮进行，保留的对话原文总是从用户消息开始
+    summary_tokens：摘要的token上限，超出时丢弃最早的摘要内容
+    summarizer：可选，自定义摘要函数 summarizer(旧摘要, 被淘汰的消息列表) -> 新摘要；
+                默认在本地把每条消息压缩成一行，不额外调用大模型
+    '''
+
+    def __init__(self, system_prompt, max_tokens=2000, window=8, summary_tokens=400,
+                 line_tokens=60, summarizer=None):
+        self.system = {"role": "system", "content": system_prompt}
+        self.max_tokens = max_tokens
+        self.window = window
+        self.summary_tokens = summary_tokens
+        self.line_tokens = line_tokens
+        self.summarizer = summarizer
+        self.turns = deque()            # 最近的消息原文 [(消息, token数), ...]
+        self.turn_tokens = 0
+        self.summary_lines = deque()    # 本地摘要 [(一行摘要, token数), ...]
+        self.summary_text = ''          # 自定义摘要函数生成的摘要
+        self.lock = threading.Lock()
+
+    def add(self, role, content):
+        '''
+        追加一条消息，超出条数或token预算时把最早的消息折叠进摘要
+        '''
+        content = str(content)
+        with self.lock:
+            self.turns.append(({"role": role, "content": content}, count_tokens(content)))
+            self.turn_tokens += self.turns[-1][1]
+            self._compact()
+
+    def messages(self):
+        '''
+        生成发送给大模型的消息列表：系统提示词（对话摘要附在其后，只有一条system消息）、最近的对话原文
+        部分OpenAI兼容接口不接受中间的system消息，摘要不单独成条
+        '''
+        with self.lock:
+            summary = self._summary()
+            if summary:
+                system = {"role": "system", "content": self.system['content'] + '\n\n【之前的对话摘要】\n' + summary}
+            else:
+                system = self.system
+            return [system] + [msg for msg, _ in self.turns]
+
+    def token_count(self):
+        '''
+        当前消息列表的估算token数（含系统提示词）
+        '''
+        with self.lock:
+            return count_tokens(self.system['content']) + count_tokens(self._summary()) + self.turn_tokens
+
+    def clear(self):
+        with self.lock:
+            self.turns.clear()
+            self.turn_tokens = 0
+            self.summary_lines.clear()
+            self.summary_text = ''
+
+    def _summary(self):
+        if self.summarizer is not None:
+            return self.summary_text
+        return '\n'.join(line for line, _ in self.summary_lines)
+
+    def _compact(self):
+        # 最近一条消息始终保留原文；淘汰一条用户消息后，排在最前面的助手回复一并折叠，原文总是从用户消息开始
+        evicted = []
+        while len(self.turns) > 1 and (len(self.turns) > self.window or
+                                       self.turn_tokens + count_tokens(self._summary()) > self.max_tokens):
+            evicted.append(self._evict())
+        while self.turns and self.turns[0][0]['role'] != 'user':
+            evicted.append(self._evict())
+        if evicted and self.summarizer is not None:
+            try:
+                self.summary_text = _clip(self.summarizer(self.summary_text, evicted), self.summary_tokens)
+            except Exception as e:
+                print('[memory] 对话摘要失败，保留原摘要', e)
+
+    def _evict(self):
+        msg, tokens = self.turns.popleft()
+        self.turn_tokens -= tokens
+        if self.summarizer is None:
+            self._fold(msg)
+        return msg
+
+    def _fold(self, msg):
+        name = '用户' if msg['role'] == 'user' else '助手'
+        line = '{}：{}'.format(name, _clip(msg['content'], self.line_tokens))
+        self.summary_lines.append((line, count_tokens(line) + 1))
+        total = sum(tokens for _, tokens in self.summary_lines)
+        while len(self.summary_lines) > 1 and total > self.summary_tokens:
+            total -= self.summary_lines.popleft()[1]
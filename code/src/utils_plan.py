@@ -0,0 +1,219 @@
+# utils_plan.py
+# 智能体编排结果的解析、校验与执行：按函数注册表分发，代替eval
+
+import ast
+import inspect
+import json
+import time
+from collections import namedtuple
+
+try:
+    import orjson               # 可选，解析更快
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+Step = namedtuple('Step', ['name', 'args', 'kwargs', 'text'])   # 一个动作：函数名、位置参数、关键字参数、原始字符串
+Plan = namedtuple('Plan', ['steps', 'response'])                # 编排结果：动作列表、机器人的回复
+
+
+class PlanError(ValueError):
+    '''
+    编排结果无法解析，或调用了未注册的函数、参数不合法
+    '''
+
+
+# 智能体可以调用的函数 -> 预计耗时（秒），耗时也可以是根据参数估算的函数
+# None表示需要人工交互、耗时无法预估
+AGENT_FUNCTIONS = {
+    'back_zero': 3.0,
+    'relax_arms': 0.5,
+    'head_shake': 5.0,
+    'head_dance': 7.0,
+    'head_nod': 4.0,
+    'pump_on': 0.5,
+    'pump_off': 0.5,
+    'move_to_coords': 4.0,
+    'single_joint_move': 2.0,
+    'move_to_top_view': 3.0,
+    'top_view_shot': 4.5,
+    'check_camera': None,
+    'llm_led': 2.0,
+    'vlm_move': 20.0,
+    'vlm_movetome': 20.0,
+    'vlm_vqa': 10.0,
+    'crack_move': 60.0,
+    'drag_teach': None,
+    'time.sleep': lambda seconds=0, *args, **kwargs: float(seconds),
+}
+
+
+def build_registry(namespace, functions=AGENT_FUNCTIONS):
+    '''
+    从命名空间（如agent_go的globals()）中取出可调用的函数，生成注册表 {函数名: (函数, 预计耗时)}
+    函数名可以带模块前缀，如time.sleep；命名空间中不存在的函数跳过
+    '''
+    registry = {}
+    for name, duration in functions.items():
+        head, *rest = name.split('.')
+        func = namespace.get(head)
+        for attr in rest:
+            func = getattr(func, attr, None)
+        if not callable(func):
+            print('[plan] 函数 {} 不可用，未注册'.format(name))
+            continue
+        registry[name] = (func, duration)
+    return registry
+
+
+def _literal(node, text):
+    try:
+        return ast.literal_eval(node)
+    except ValueError:
+        raise PlanError('参数只能是常量：{}'.format(text))
+
+
+def parse_step(item):
+    '''
+    解析一个动作，支持两种写法：
+    字符串：'move_to_coords(X=150, Y=-120)'
+    字典：{'name': 'move_to_coords', 'args': [], 'kwargs': {'X': 150, 'Y': -120}}
+    '''
+    if isinstance(item, dict):
+        if 'name' not in item:
+            raise PlanError('动作缺少函数名：{}'.format(item))
+        name = str(item['name'])
+        args = tuple(item.get('args') or ())
+        kwargs = dict(item.get('kwargs') or {})
+        params = [repr(a) for a in args] + ['{}={!r}'.format(k, v) for k, v in kwargs.items()]
+        return Step(name, args, kwargs, '{}({})'.format(name, ', '.join(params)))
+
+    text = str(item).strip()
+    try:
+        node = ast.parse(text, mode='eval').body
+    except SyntaxError:
+        raise PlanError('动作格式错误：{}'.format(text))
+    if not isinstance(node, ast.Call):
+        raise PlanError('动作不是函数调用：{}'.format(text))
+    # 只接受 func(...) 或 module.func(...)
+    func = node.func
+    parts = []
+    while isinstance(func, ast.Attribute):
+        parts.append(func.attr)
+        func = func.value
+    if not isinstance(func, ast.Name):
+        raise PlanError('无法识别的函数：{}'.format(text))
+    name = '.'.join([func.id] + parts[::-1])
+    args = tuple(_literal(a, text) for a in node.args)
+    if any(kw.arg is None for kw in node.keywords):
+        raise PlanError('不支持**参数：{}'.format(text))
+    kwargs = {kw.arg: _literal(kw.value, text) for kw in node.keywords}
+    return Step(name, args, kwargs, text)
+
+
+def parse_plan(text):
+    '''
+    解析大模型输出的编排结果，返回Plan
+    优先按JSON解析，大模型输出单引号的Python字典时退回ast.literal_eval，均不执行任何代码
+    '''
+    text = text.strip()
+    start, end = text.find('{'), text.rfind('}')
+    if start < 0 or end < start:
+        raise PlanError('大模型输出中没有找到json：{}'.format(text))
+    body = text[start:end + 1]
+    try:
+        data = _json_loads(body)
+    except ValueError:
+        try:
+            data = ast.literal_eval(body)
+        except (ValueError, SyntaxError):
+            raise PlanError('大模型输出无法解析：{}'.format(body))
+    if not isinstance(data, dict):
+        raise PlanError('大模型输出不是字典：{}'.format(body))
+
+    functions = data.get('function') or []
+    if not isinstance(functions, (list, tuple)):
+        functions = [functions]
+    steps = [parse_step(each) for each in functions]
+    return Plan(steps, str(data.get('response', '')))
+
+
+def _check_types(sig, bound, step):
+    # 参数默认值是数字或字符串时，传入的参数类型需一致
+    for key, value in bound.arguments.items():
+        default = sig.parameters[key].default
+        if default is inspect.Parameter.empty or default is None:
+            continue
+        if isinstance(default, (int, float)) and not isinstance(default, bool):
+            ok = isinstance(value, (int, float)) and not isinstance(value, bool)
+        elif isinstance(default, str):
+            ok = isinstance(value, str)
+        else:
+            continue
+        if not ok:
+            raise PlanError('参数{}类型错误，应为{}：{}'.format(key, type(default).__name__, step.text))
+
+
+def validate_plan(plan, registry):
+    '''
+    执行前检查：函数已注册，参数个数、名称、类型与函数签名一致，不合法时抛出PlanError
+    '''
+    for step in plan.steps:
+        if step.name not in registry:
+            raise PlanError('未注册的函数：{}'.format(step.text))
+        func, _ = registry[step.name]
+        try:
+            sig = inspect.signature(func)
+        except (TypeError, ValueError):
+            continue        # 部分内置函数拿不到签名
+        try:
+            bound = sig.bind(*step.args, **step.kwargs)
+        except TypeError as e:
+            raise PlanError('参数错误 {}：{}'.format(e, step.text))
+        _check_types(sig, bound, step)
+    return plan
+
+
+def estimate_step(step, registry):
+    '''
+    预计一个动作的耗时（秒），无法预估时返回None
+    '''
+    _, duration = registry[step.name]
+    if callable(duration):
+        try:
+            return duration(*step.args, **step.kwargs)
+        except (TypeError, ValueError):
+            return None
+    return duration
+
+
+def dry_run(plan, registry):
+    '''
+    只校验并打印每个动作的预计耗时，不运动机械臂，返回预计总耗时（秒）
+    '''
+    validate_plan(plan, registry)
+    total = 0.0
+    unknown = 0
+    print('[plan] 编排预演，共 {} 个动作'.format(len(plan.steps)))
+    for i, step in enumerate(plan.steps):
+        seconds = estimate_step(step, registry)
+        if seconds is None:
+            unknown += 1
+            print('    {}. {:<40} 需人工交互，耗时未知'.format(i + 1, step.text))
+        else:
+            total += seconds
+            print('    {}. {:<40} 约 {:.1f} 秒'.format(i + 1, step.text, seconds))
+    print('[plan] 预计总耗时 {:.1f} 秒{}'.format(total, '（另有 {} 个动作耗时未知）'.format(unknown) if unknown else ''))
+    return total
+
+
+def run_step(step, registry, **extra):
+    '''
+    执行一个已校验的动作，返回函数的返回值
+    extra：额外传入的关键字参数，与编排中的关键字参数合并，同名时以extra为准
+    '''
+    func, _ = registry[step.name]
+    t0 = time.time()
+    ret = func(*step.args, **dict(step.kwargs, **extra))
+    print('[plan] {} 用时 {:.1f} 秒'.format(step.text, time.time() - t0))
+    return ret
@@ -0,0 +1,212 @@
+# utils_playback.py
+# 拖动示教回放：按录制时间戳回放，密集的采样点按发送时刻插值，压缩后的关键帧每帧一条指令由控制器插值，
+# 单调时钟排期并补偿指令耗时，可选样条平滑、倍速回放
+
+import time
+
+import numpy as np
+
+PLAY_RATE = 10              # 回放发送指令的频率，也是没有时间戳时默认的录制频率（Hz）
+SPEED_RANGE = (0.5, 3.0)    # 回放倍速范围
+TOLERANCE = 4               # 去冗余阈值：与上一个保留点（上次发送的位置）相比各关节变化都小于该值（编码器刻度）时丢弃
+COMPRESS_TOLERANCE = 10     # 轨迹压缩允许的关节误差（编码器刻度，约0.9度）
+DWELL_TIME = 0.5            # 停顿检测：保持不动超过该时长（秒）视为停顿
+FULL_SPEED = 160 * 4096 / 360.0     # 速度100时的关节速度（编码器刻度/秒），与仿真机械臂MAX_JOINT_SPEED一致
+ACCEL_MARGIN = 0.2          # 关键帧回放时给控制器加减速预留的时间（秒）
+
+
+def resample(encoders, t, rate):
+    '''
+    三次Hermite样条重采样到等间隔rate（Hz），切线由相邻采样点的差分估计，时间间隔不均匀也适用
+    返回(新时间戳, 新编码器)
+    '''
+    encoders = np.asarray(encoders, dtype=float)
+    t = np.asarray(t, dtype=float)
+    if len(t) < 3:
+        return t, encoders
+    tq = np.arange(t[0], t[-1], 1.0 / rate)
+    tq = np.append(tq, t[-1]) if tq[-1] < t[-1] else tq
+    m = np.gradient(encoders, t, axis=0)
+    i = np.clip(np.searchsorted(t, tq, side='right') - 1, 0, len(t) - 2)
+    h = (t[i + 1] - t[i])[:, None]
+    s = ((tq - t[i])[:, None]) / h
+    h00, h10 = 2 * s ** 3 - 3 * s ** 2 + 1, s ** 3 - 2 * s ** 2 + s
+    h01, h11 = -2 * s ** 3 + 3 * s ** 2, s ** 3 - s ** 2
+    out = h00 * encoders[i] + h10 * h * m[i] + h01 * encoders[i + 1] + h11 * h * m[i + 1]
+    return tq, out
+
+
+def _dwell_mask(encoders, t, tolerance, dwell_time):
+    # 停顿段内部的点标记为False，停顿段只保留首尾两点
+    keep = np.ones(len(t), dtype=bool)
+    start = 0
+    for k in range(1, len(t) + 1):
+        if k < len(t) and np.max(np.abs(encoders[k] - encoders[start])) < tolerance:
+            continue
+        if t[k - 1] - t[start] >= dwell_time:
+            keep[start + 1:k - 1] = False
+        start = k
+    return keep
+
+
+def _rdp(encoders, t, candidates, tolerance):
+    # 以时间为参数的Ramer-Douglas-Peucker：保留点之间按时间线性插值，各关节误差都不超过tolerance
+    keep = {candidates[0], candidates[-1]}
+    stack = [(0, len(candidates) - 1)]
+    while stack:
+        lo, hi = stack.pop()
+        if hi - lo < 2:
+            continue
+        i0, i1 = candidates[lo], candidates[hi]
+        inner = candidates[lo + 1:hi]
+        s = ((t[inner] - t[i0]) / (t[i1] - t[i0]))[:, None] if t[i1] > t[i0] else np.zeros((len(inner), 1))
+        err = np.max(np.abs(encoders[inner] - (encoders[i0] + s * (encoders[i1] - encoders[i0]))), axis=1)
+        worst = int(np.argmax(err))
+        if err[worst] > tolerance:
+            mid = lo + 1 + worst
+            keep.add(candidates[mid])
+            stack.append((lo, mid))
+            stack.append((mid, hi))
+    return np.array(sorted(keep))
+
+
+def compress(encoders, t=None, tolerance=COMPRESS_TOLERANCE, dwell_time=DWELL_TIME):
+    '''
+    轨迹压缩：先把停顿段缩成首尾两点，再在关节空间做RDP简化
+    保留点之间按时间线性插值（play每个关键帧只发一条指令，由控制器匀速插值）时，与原轨迹的关节误差不超过tolerance（编码器刻度）
+    返回(时间戳, 编码器)，t为None时按PLAY_RATE等间隔
+    '''
+    encoders = np.asarray(encoders, dtype=float).reshape(-1, 6)
+    t = np.arange(len(encoders)) / float(PLAY_RATE) if t is None else np.asarray(t, dtype=float)
+    if len(t) < 3:
+        return t, encoders.astype(int)
+    # 停顿段内各点与起点相差不到tolerance/2，首尾连线与原轨迹的误差就不超过tolerance
+    candidates = np.flatnonzero(_dwell_mask(encoders, t, tolerance / 2.0, dwell_time))
+    keep = _rdp(encoders, t, candidates, tolerance)
+    return t[keep], encoders[keep].astype(int)
+
+
+def plan_playback(encoders, t=None, speed=1.0, smooth=False, rate=PLAY_RATE):
+    '''
+    生成回放关键帧，返回(相对开始的时间, 编码器浮点数组)
+    encoders：N×6编码器；t：录制时间戳（秒），为None时按PLAY_RATE等间隔
+    speed：回放倍速，限制在SPEED_RANGE内；smooth：是否先按rate（Hz）做样条重采样，默认关键帧之间线性插值
+    '''
+    encoders = np.asarray(encoders, dtype=float).reshape(-1, 6)
+    t = np.arange(len(encoders)) / float(PLAY_RATE) if t is None else np.asarray(t, dtype=float)
+    if len(t) == 0:
+        return t, encoders
+    t = t - t[0]
+    if smooth:
+        t, encoders = resample(encoders, t, rate)
+    speed = min(max(float(speed), SPEED_RANGE[0]), SPEED_RANGE[1])
+    return t / speed, encoders
+
+
+def sample(times, points, tq):
+    '''
+    关键帧之间按时间线性插值，返回tq时刻的编码器（浮点）；超出范围时取首尾关键帧
+    '''
+    return np.array([np.interp(tq, times, points[:, j]) for j in range(points.shape[1])])
+
+
+def is_sparse(times, rate=PLAY_RATE):
+    '''
+    关键帧平均间隔超过两个发送周期时视为稀疏关键帧（压缩后的轨迹）
+    '''
+    return len(times) >= 2 and (times[-1] - times[0]) / (len(times) - 1) > 2.0 / rate
+
+
+def keyframe_speed(distance, duration):
+    '''
+    在duration秒内走完distance个编码器刻度所需的速度（1-100），按FULL_SPEED换算
+    '''
+    duration = max(duration - ACCEL_MARGIN, 1e-3)
+    return int(min(max(np.ceil(100.0 * distance / (duration * FULL_SPEED)), 1), 100))
+
+
+def play(arm, encoders, t=None, speed=1.0, rate=PLAY_RATE, smooth=False, tolerance=TOLERANCE, sp=80, running=None,
+         keyframes=None):
+    '''
+    按时间戳回放一遍，阻塞到回放结束，返回统计信息{'sent', 'skipped', 'idle', 'duration', 'latency'}
+    keyframes：True时每个关键帧只发一条指令，速度按该段的距离和时长计算，由控制器在两帧之间插值，
+    适合压缩后的轨迹；False时每隔1/rate秒发送该时刻在前后关键帧之间插值得到的位置；None时稀疏的关键帧按True处理
+    发送时刻按单调时钟排期，并按最近的指令耗时提前发送，串口耗时不会累积成漂移；
+    落后于计划时跳过已经过时的发送时刻（skipped），与上次发送的位置相比各关节变化都小于tolerance时不发送（idle），末点始终发送
+    sp：移动到起点的速度
+    running：可选的无参函数，返回False时提前结束（循环回放时用于停止）
+    '''
+    times, points = plan_playback(encoders, t, speed, smooth, rate)
+    if keyframes is None:
+        keyframes = not smooth and is_sparse(times, rate)
+    if keyframes:
+        return _play_keyframes(arm, times, points, tolerance, sp, running)
+    latency = 0.0           # 指令耗时的滑动平均
+    sent = skipped = idle = 0
+    start = time.monotonic()
+    if len(times):
+        period = 1.0 / rate
+        end = times[-1]
+        last = None
+        tick = 0.0
+        while running is None or running():
+            now = time.monotonic() - start
+            # 已经过时的发送时刻直接跳过，只按当前时刻取位置
+            while tick + period - latency <= now and tick < end:
+                tick += period
+                skipped += 1
+            tick = min(tick, end)
+            delay = tick - latency - now
+            if delay > 0:
+                time.sleep(delay)
+            point = np.rint(sample(times, points, tick)).astype(int)
+            final = tick >= end
+            if last is None or np.max(np.abs(point - last)) >= (1 if final else tolerance):
+                t0 = time.monotonic()
+                arm.set_encoders(point.tolist(), sp)
+                latency = 0.8 * latency + 0.2 * (time.monotonic() - t0)
+                last = point
+                sent += 1
+            else:
+                idle += 1
+            if final:
+                break
+            tick += period
+    return {'sent': sent, 'skipped': skipped, 'idle': idle, 'duration': time.monotonic() - start, 'latency': latency}
+
+
+def _play_keyframes(arm, times, points, tolerance, sp, running):
+    # 向第i个关键帧运动的一段从第i-1个关键帧的时刻开始，段开始时发出一条指令
+    latency = 0.0
+    sent = skipped = idle = 0
+    start = time.monotonic()
+    last = None
+    for i in range(len(times)):
+        if running is not None and not running():
+            break
+        target = np.rint(points[i]).astype(int)
+        final = i == len(times) - 1
+        now = time.monotonic() - start
+        if i and not final and now >= times[i]:
+            skipped += 1            # 整段都已过时，直接转向下一个关键帧
+            continue
+        delay = (times[i - 1] if i else 0.0) - latency - now
+        if delay > 0:
+            time.sleep(delay)
+        if last is not None and np.max(np.abs(target - last)) < (1 if final else tolerance):
+            idle += 1
+            continue
+        if last is None:
+            speed = sp
+        else:
+            speed = keyframe_speed(np.max(np.abs(target - last)), times[i] - (time.monotonic() - start))
+        t0 = time.monotonic()
+        arm.set_encoders(target.tolist(), speed)
+        latency = 0.8 * latency + 0.2 * (time.monotonic() - t0)
+        last = target
+        sent += 1
+    if len(times) and (running is None or running()):
+        delay = times[-1] - (time.monotonic() - start)
+        if delay > 0:
+            time.sleep(delay)       # 等最后一段运动结束
+    return {'sent': sent, 'skipped': skipped, 'idle': idle, 'duration': time.monotonic() - start, 'latency': latency}
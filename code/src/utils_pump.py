@@ -1,15 +1,24 @@
 # utils_pump.py
 print('导入吸泵控制模块')
 
-from gpiozero.pins.lgpio import LGPIOFactory
-from gpiozero import Device, LED
 import time
+from utils_resource import lazy
 
-# 显式指定 GPIO 设备（必须使用lgpio驱动）
-Device.pin_factory = LGPIOFactory(chip=0)
 
-pump = LED(46)   # 气泵
-valve = LED(37)  # 默认关闭（高电平）
+def _gpio_led(pin):
+    def factory():
+        from gpiozero.pins.lgpio import LGPIOFactory
+        from gpiozero import Device, LED
+        # 显式指定 GPIO 设备（必须使用lgpio驱动）
+        if not isinstance(Device.pin_factory, LGPIOFactory):
+            Device.pin_factory = LGPIOFactory(chip=0)
+        return LED(pin)
+    return factory
+
+
+# 第一次开关吸泵时才占用GPIO
+pump = lazy('pump', _gpio_led(46))    # 气泵
+valve = lazy('valve', _gpio_led(37))  # 默认关闭（高电平）
 def pump_on():
     '''
     开启吸泵（关闭泄气阀门）
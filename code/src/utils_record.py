@@ -0,0 +1,179 @@
+# utils_record.py
+# 拖动示教录制文件：定长二进制记录 + JSON文件头，录制时逐条追加，读取时内存映射，与录制时长无关
+#
+# 文件结构：
+#   8字节魔数 b'MCREC01\0' | 4字节小端文件头长度 | JSON文件头（补齐到64字节对齐） | 记录数组
+#   每条记录：t（float64，秒，相对录制开始） + encoders（6×int16）
+#   记录条数由文件大小推算，追加时不需要改写文件头
+
+import json
+import os
+import struct
+import time
+
+import numpy as np
+
+MAGIC = b'MCREC01\0'
+RECORD_DTYPE = np.dtype([('t', '<f8'), ('encoders', '<i2', (6,))])
+_ALIGN = 64
+
+
+def _header_bytes(meta):
+    body = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+    total = len(MAGIC) + 4 + len(body)
+    body += b' ' * (-total % _ALIGN)
+    return MAGIC + struct.pack('<I', len(body)) + body
+
+
+def _read_header(f):
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError('不是拖动示教录制文件')
+    (length,) = struct.unpack('<I', f.read(4))
+    meta = json.loads(f.read(length).decode('utf-8'))
+    return meta, len(MAGIC) + 4 + length
+
+
+class RecordingWriter:
+    '''
+    边录制边写文件，每条记录立即追加到文件末尾，录制中断也不会丢失已录的数据
+    path：文件路径；append=True且文件已存在时在原文件后继续追加，末尾不完整的记录先截掉
+    meta：写入文件头的附加信息，如采样频率
+    '''
+
+    def __init__(self, path, meta=None, append=False, flush_every=10):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.flush_every = flush_every
+        self.count = 0
+        if append and os.path.exists(path):
+            with open(path, 'r+b') as f:
+                self.meta, offset = _read_header(f)
+                # 上次录制中断时末尾可能只写了半条记录，截掉后再追加，否则之后的记录都会错位
+                size = os.path.getsize(path)
+                valid = offset + (size - offset) // RECORD_DTYPE.itemsize * RECORD_DTYPE.itemsize
+                if size > valid:
+                    print('录制文件末尾有不完整的记录（{} 字节），已截掉'.format(size - valid))
+                    f.truncate(valid)
+            self.f = open(path, 'ab')
+            self.t0 = time.time() - self._last_t()
+        else:
+            self.meta = {'created': time.strftime('%Y-%m-%d %H:%M:%S'), 'fields': ['t', 'encoders']}
+            self.meta.update(meta or {})
+            self.f = open(path, 'wb')
+            self.f.write(_header_bytes(self.meta))
+            self.t0 = time.time()
+
+    def _last_t(self):
+        recording = open_recording(self.path)
+        return float(recording.t[-1]) if len(recording) else 0.0
+
+    def append(self, encoders, t=None):
+        '''
+        追加一条记录；t为相对录制开始的秒数，默认按当前时间计算
+        '''
+        row = np.zeros(1, dtype=RECORD_DTYPE)
+        row['t'] = time.time() - self.t0 if t is None else t
+        row['encoders'] = encoders
+        self.f.write(row.tobytes())
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self.f.flush()
+
+    def close(self):
+        if not self.f.closed:
+            self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Recording:
+    '''
+    内存映射方式打开的录制文件，打开耗时与录制长度无关，数据在访问时才从磁盘读入
+    recording.t：N个时间戳（秒），recording.encoders：N×6编码器数组
+    按下标或迭代访问时返回编码器列表，可直接传给set_encoders
+    '''
+
+    def __init__(self, path, meta, data):
+        self.path = path
+        self.meta = meta
+        self.data = data
+
+    @property
+    def t(self):
+        return self.data['t']
+
+    @property
+    def encoders(self):
+        return self.data['encoders']
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, index):
+        return self.data['encoders'][index].tolist()
+
+    def __iter__(self):
+        for row in self.data['encoders']:
+            yield row.tolist()
+
+
+def open_recording(path):
+    '''
+    打开录制文件，返回Recording
+    '''
+    with open(path, 'rb') as f:
+        meta, offset = _read_header(f)
+    count = (os.path.getsize(path) - offset) // RECORD_DTYPE.itemsize
+    if count == 0:
+        return Recording(path, meta, np.zeros(0, dtype=RECORD_DTYPE))
+    data = np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=offset, shape=(count,))
+    return Recording(path, meta, data)
+
+
+def save_recording(path, encoders, t=None, meta=None, rate=10):
+    '''
+    一次性保存整段录制
+    encoders：N×6编码器；t：N个时间戳（秒），为None时按rate（Hz）等间隔生成
+    先写临时文件再替换，已经内存映射打开的旧文件不受影响
+    '''
+    data = np.zeros(len(encoders), dtype=RECORD_DTYPE)
+    data['encoders'] = np.asarray(encoders, dtype=np.int16).reshape(-1, 6)
+    data['t'] = np.arange(len(data)) / float(rate) if t is None else t
+    meta = dict(meta or {})
+    meta.setdefault('rate', rate)
+    tmp_path = path + '.tmp'
+    with RecordingWriter(tmp_path, meta) as writer:
+        writer.f.write(data.tobytes())
+        writer.count = len(data)
+    os.replace(tmp_path, path)
+    return path
+
+
+def convert_json(json_path, out_path=None, rate=10):
+    '''
+    把旧版JSON录制文件（编码器列表的列表，固定0.1秒间隔）转换为二进制录制文件
+    返回新文件路径，默认与原文件同名、扩展名为.rec
+    '''
+    if out_path is None:
+        out_path = os.path.splitext(json_path)[0] + '.rec'
+    with open(json_path, 'r') as f:
+        encoders = [row for row in json.load(f) if isinstance(row, list) and len(row) == 6]
+    return save_recording(out_path, encoders, meta={'source': os.path.basename(json_path)}, rate=rate)
+
+
+def load_recording(path):
+    '''
+    读取录制：优先读取二进制文件，只有旧版JSON文件（扩展名.txt）时先自动转换
+    path：二进制文件路径（.rec），同名.txt为旧版JSON文件
+    '''
+    if not os.path.exists(path):
+        legacy = os.path.splitext(path)[0] + '.txt'
+        if not os.path.exists(legacy):
+            raise FileNotFoundError(path)
+        print('转换旧版录制文件', legacy, '->', path)
+        convert_json(legacy, path)
+    return open_recording(path)
@@ -0,0 +1,86 @@
+# utils_resource.py
+# 延迟创建的共享资源：机械臂连接、GPIO、字体、云端语音客户端等在第一次使用时才创建，导入模块时没有任何副作用
+
+import os
+import threading
+
+_resources = {}
+_resources_lock = threading.Lock()
+
+
+class LazyResource:
+    '''
+    资源代理：第一次访问属性时调用factory()创建真实对象，之后所有属性访问都转发给该对象
+    同名资源全程只有一个实例，多个模块、多个线程共享
+    '''
+
+    def __init__(self, name, factory):
+        self._name = name
+        self._factory = factory
+        self._obj = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        '''
+        获取真实对象，未创建时立即创建
+        '''
+        obj = self._obj
+        if obj is None:
+            with self._lock:
+                if self._obj is None:
+                    self._obj = self._factory()
+                obj = self._obj
+        return obj
+
+    def loaded(self):
+        '''
+        真实对象是否已经创建
+        '''
+        return self._obj is not None
+
+    def reset(self):
+        '''
+        丢弃已创建的对象，下次访问时重新创建（如串口断开后重连）
+        '''
+        with self._lock:
+            self._obj = None
+
+    def __getattr__(self, attr):
+        # 只有代理自身没有的属性才会走到这里
+        return getattr(self.get(), attr)
+
+    def __repr__(self):
+        state = '已创建' if self.loaded() else '未创建'
+        return '<LazyResource {} {}>'.format(self._name, state)
+
+
+def lazy(name, factory):
+    '''
+    注册并返回名为name的共享资源代理；同名资源已注册时直接返回已有的代理，factory被忽略
+    '''
+    with _resources_lock:
+        resource = _resources.get(name)
+        if resource is None:
+            resource = _resources[name] = LazyResource(name, factory)
+        return resource
+
+
+def appbuilder_client(component):
+    '''
+    返回创建AppBuilder组件（如'ASR'、'TTS'）的factory，用于lazy注册；创建时才导入appbuilder并配置密钥
+    '''
+    def factory():
+        import appbuilder
+        from API_KEY import APPBUILDER_TOKEN
+        # 配置密钥
+        os.environ["APPBUILDER_TOKEN"] = APPBUILDER_TOKEN
+        return getattr(appbuilder, component)()
+    return factory
+
+
+def loaded_resources():
+    '''
+    已经创建的资源名称列表
+    '''
+    with _resources_lock:
+        return [name for name, resource in _resources.items() if resource.loaded()]
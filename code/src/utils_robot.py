@@ -3,25 +3,197 @@
 
 print('导入机械臂连接模块')
 
-from pymycobot import MyCobot280
+from mycobot280 import MyCobot280   # 增加了pipeline_query的MyCobot280
 from pymycobot import PI_PORT, PI_BAUD
 import cv2
 import numpy as np
 import time
 from utils_pump import *
+from utils_camera import get_camera_stream, show_image, close_windows
+from handeye import HandEye
+from utils_resource import lazy
+from robot_broker import connect_robot
+from utils_telemetry import running_telemetry, get_telemetry
 
-# 连接机械臂
-mc = MyCobot280(PI_PORT, PI_BAUD)
-# 设置运动模式为队列模式(0)
-mc.set_fresh_mode(0)
 
-def back_zero():
+def _connect_mycobot():
+    print('连接机械臂')
+    arm = connect_robot()           # 代理进程在运行时与其它程序共享串口
+    # 设置运动模式为队列模式(0)
+    arm.set_fresh_mode(0)
+    return arm
+
+
+# 连接机械臂：全局共享一个连接，第一次发送指令时才打开串口
+mc = lazy('mycobot', _connect_mycobot)
+
+# ---------- 运动完成检测 ----------
+AWAIT_MOTION = True        # True：轮询机械臂状态，到位立即返回；False：沿用固定等待时间
+MOTION_TIMEOUT = 15        # 单次运动最长等待时间（秒）
+ANGLE_TOL = 2.0            # 关节角到位容差（度）
+COORD_TOL = 3.0            # XYZ坐标到位容差（mm）
+POLL_MIN = 0.05            # 轮询间隔初值（秒）
+POLL_MAX = 0.3             # 轮询间隔上限（秒）
+SETTLE_TOL = 0.2           # 停稳判定：相邻两次关节角读数之差（度）
+SETTLE_TIMEOUT = 2.0       # 等待停稳的最长时间（秒）
+
+
+def _in_tolerance(now, target, tol):
+    '''
+    判断当前读数与目标值是否在容差范围内，读数异常（-1、None、长度不足）时返回False
+    '''
+    if not isinstance(now, list) or len(now) < len(target):
+        return False
+    return max(abs(a - b) for a, b in zip(now, target)) <= tol
+
+
+def wait_motion(target=None, mode=0, joint=None, timeout=None, fallback=3, arm=None, sent_at=None):
+    '''
+    等待机械臂运动完成，到位后立即返回
+    target：目标关节角列表（mode=0）或坐标列表（mode=1）；为None时依据is_moving判断
+    mode：0-关节角，1-坐标（只比较XYZ，姿态角存在±180°跳变）
+    joint：单关节运动时的关节序号（1-6），此时target为该关节的目标角度
+    timeout：最长等待时间（秒），默认MOTION_TIMEOUT
+    fallback：AWAIT_MOTION关闭时的固定等待时间（秒）
+    arm：机械臂实例，默认为本模块的mc
+    sent_at：运动指令的发送时间（time.time()），只采信此后的遥测采样，默认为调用本函数的时间
+    返回：超时前是否到位
+    '''
+    if not AWAIT_MOTION:
+        time.sleep(fallback)
+        return True
+    if arm is None:
+        arm = mc
+    if timeout is None:
+        timeout = MOTION_TIMEOUT
+
+    if joint is not None:
+        target, tol = [target], ANGLE_TOL
+    elif target is not None and mode == 1:
+        target, tol = list(target[:3]), COORD_TOL
+    else:
+        tol = ANGLE_TOL
+
+    # 遥测线程在运行时直接读取最新采样，不再额外占用串口
+    telemetry = running_telemetry(arm) if target is not None else None
+
+    t_start = time.time()
+    if sent_at is None:
+        sent_at = t_start
+    interval = POLL_MIN
+    while time.time() - t_start < timeout:
+        # 轮询间隔先短后长：短距离运动尽快返回，长距离运动少占串口
+        time.sleep(interval)
+        interval = min(interval * 1.5, POLL_MAX)
+        if target is None:
+            if arm.is_moving() == 0:
+                return True
+            continue
+        if telemetry is not None:
+            # 发送指令之前的采样还是旧位置，不能用来判断到位
+            sample = telemetry.latest(after=sent_at, timeout=POLL_MAX)
+            now = None if sample is None else sample[2 if mode == 1 else 1].tolist()
+        else:
+            now = arm.get_coords() if mode == 1 else arm.get_angles()
+        if joint is not None and isinstance(now, list) and len(now) >= joint:
+            now = [now[joint - 1]]
+        if _in_tolerance(now, target, tol):
+            return True
+    print('    等待运动完成超时（{} 秒）'.format(timeout))
+    return False
+
+
+def wait_settled(timeout=SETTLE_TIMEOUT, tol=SETTLE_TOL, arm=None):
+    '''
+    等待机械臂完全停稳：is_moving为0；is_moving读数异常时改为相邻两次关节角读数之差都不超过tol（度）
+    wait_motion在进入到位容差时就返回，此时机械臂可能还在减速，拍照前需要再等停稳
+    返回：超时前是否停稳
+    '''
+    if not AWAIT_MOTION:
+        return True
+    if arm is None:
+        arm = mc
+    t_start = time.time()
+    previous = None
+    while time.time() - t_start < timeout:
+        moving = arm.is_moving()
+        if moving == 0:
+            return True
+        if moving == 1:
+            time.sleep(POLL_MIN)
+            continue
+        now = arm.get_angles()
+        if isinstance(previous, list) and _in_tolerance(now, previous, tol):
+            return True
+        previous = now
+        time.sleep(POLL_MIN)
+    print('    等待机械臂停稳超时（{} 秒）'.format(timeout))
+    return False
+
+
+def stream_coords(coords_list, speed=20, rate=5, lookahead=3, stall_timeout=5, arm=None):
+    '''
+    流式执行一条坐标轨迹：按队列模式连续下发，控制器队列里始终保留lookahead个待执行点，
+    执行进度来自遥测线程的最新坐标（不另外占用串口轮询），机械臂沿路径连续运动，不再每个点停一下
+    coords_list：预先算好的机械臂坐标列表 [[x, y, z, rx, ry, rz], ...]
+    speed：机械臂移动速度
+    rate：下发频率上限（点/秒）
+    lookahead：已下发但尚未到达的点数上限
+    stall_timeout：超过该时间（秒）进度没有推进则急停，放弃控制器队列中和尚未下发的点
+    arm：机械臂实例，默认为本模块的mc
+    返回：{'points': 完成点数, 'time': 总耗时(秒), 'rate': 实际完成速率(点/秒)}
+    '''
+    if arm is None:
+        arm = mc
+    targets = np.asarray(coords_list, dtype=float).reshape(-1, 6)
+    n = len(targets)
+    arm.set_fresh_mode(0)  # 队列模式，保证按顺序执行
+    telemetry = get_telemetry(arm)
+
+    period = 1.0 / rate
+    sent = 0             # 已下发点数
+    reached = 0          # 已到达（或已越过）点数
+    t_start = time.time()
+    next_send = t_start
+    last_progress = t_start
+    sample_t = t_start          # 只采信下发第一个点之后的采样
+    while reached < n:
+        now = time.time()
+        if sent < n and sent - reached < lookahead and now >= next_send:
+            arm.send_coords(targets[sent].tolist(), speed, 0)
+            sent += 1
+            next_send = now + period
+
+        # 等待下一条遥测采样（最多到下一个下发时刻），当前位置离哪个已下发的点最近，它之前的点都视为已经走过
+        wait = period if sent >= n else next_send - time.time()
+        sample = telemetry.latest(after=sample_t, timeout=min(max(wait, 0.01), period))
+        if sample is not None and sent > reached:
+            sample_t, cur = sample[0], sample[2]
+            dist = np.linalg.norm(targets[reached:sent, :3] - cur[:3], axis=1)
+            nearest = reached + int(np.argmin(dist))
+            progress = nearest + 1 if dist[nearest - reached] <= COORD_TOL else nearest
+            if progress > reached:
+                reached = progress
+                last_progress = time.time()
+
+        if time.time() - last_progress > stall_timeout:
+            print('    轨迹执行停滞超过 {} 秒，急停，剩余 {} 个点放弃执行'.format(stall_timeout, n - reached))
+            arm.stop()      # 清空控制器队列中已下发的点，避免调用方继续下一步时机械臂还在走
+            break
+
+    total = time.time() - t_start
+    achieved = reached / total if total > 0 else 0.0
+    print('    轨迹执行完成：{}/{} 个点，用时 {:.2f} 秒，{:.2f} 点/秒'.format(reached, n, total, achieved))
+    return {'points': reached, 'time': total, 'rate': achieved}
+
+
+def back_zero(timeout=None):
     '''
     机械臂归零
     '''
     print('机械臂归零')
     mc.send_angles([0, 0, 0, 0, 0, 0], 40)
-    time.sleep(3)
+    wait_motion([0, 0, 0, 0, 0, 0], timeout=timeout, fallback=3)
 
 
 def relax_arms():
@@ -71,74 +243,91 @@ def head_nod():
     mc.send_angles([0.87, (-50.44), 47.28, 0.35, (-0.43), (-0.26)], 70)
 
 
-def move_to_coords(X=150, Y=-130, HEIGHT_SAFE=230):
+def move_to_coords(X=150, Y=-130, HEIGHT_SAFE=230, timeout=None):
     print('移动至指定坐标：X {} Y {}'.format(X, Y))
     mc.send_coords([X, Y, HEIGHT_SAFE, 0, 180, 90], 20, 0)
-    time.sleep(4)
+    wait_motion([X, Y, HEIGHT_SAFE], mode=1, timeout=timeout, fallback=4)
 
 
-def single_joint_move(joint_index, angle):
+def single_joint_move(joint_index, angle, timeout=None):
     print('关节 {} 旋转至 {} 度'.format(joint_index, angle))
     mc.send_angle(joint_index, angle, 40)
-    time.sleep(2)
+    wait_motion(angle, joint=joint_index, timeout=timeout, fallback=2)
 
 
-def move_to_top_view():
+TOP_VIEW_ANGLES = [39.19, -4.39, -69.43, -10.63, 1.75, 80.77]  # 俯视拍照姿态
+CAMERA_SETTLE = 0.1     # 机械臂停稳后等自动曝光稳定的时间（秒）
+
+
+def move_to_top_view(timeout=None):
     print('移动至俯视姿态')
-    mc.send_angles([39.19, -4.39, -69.43, -10.63, 1.75, 80.77], 10)
-    time.sleep(3)
+    mc.send_angles(TOP_VIEW_ANGLES, 10)
+    wait_motion(TOP_VIEW_ANGLES, timeout=timeout, fallback=3)
 
 
 def top_view_shot(check=False):
     '''
     拍摄一张图片并保存
     check：是否需要人工看屏幕确认拍照成功，再在键盘上按q键确认继续
+    在主线程调用时在屏幕上展示图像，在其他线程调用时只返回图像，由调用方在主线程展示
     '''
     print('    移动至俯视姿态')
-    move_to_top_view()
-    time.sleep(1.5)
-    # 获取摄像头，传入0表示获取系统默认摄像头
-    cap = cv2.VideoCapture(20)
-    # 打开cap
-    cap.open(20)
-    time.sleep(1)
-    success, img_bgr = cap.read()
+    move_to_top_view()      # 阻塞到机械臂进入到位容差
+    wait_settled()          # 等机械臂完全停稳
+    time.sleep(CAMERA_SETTLE)   # 等自动曝光稳定
+    # 从常驻采集线程取机械臂停稳之后的最新一帧
+    success, img_bgr = get_camera_stream().read(after=time.time())
+    if not success:
+        raise RuntimeError('摄像头取帧失败')
 
     # 保存图像
     print('    保存至temp/vl_now.jpg')
     cv2.imwrite('temp/vl_now.jpg', img_bgr)
 
     # 屏幕上展示图像
-    cv2.destroyAllWindows()  # 关闭所有opencv窗口
-    cv2.imshow('waiic_vlm', img_bgr)
+    close_windows()  # 关闭所有opencv窗口
+    show_image('waiic_vlm', img_bgr)
 
-    # 关闭摄像头
-    cap.release()
+    return img_bgr
 
 
-def eye2hand(X_im=160, Y_im=120):
-    '''
-    输入目标点在图像中的像素坐标，转换为机械臂坐标
-    '''
+# 两点线性标定，没有temp/handeye.json时使用
+cali_1_im = [138,339]  # 左下角，第一个标定点的像素坐标，要手动填！
+cali_1_mc = [135.5,20.6]  # 左下角，第一个标定点的机械臂坐标，要手动填！
+cali_2_im = [369,72]  # 右上角，第二个标定点的像素坐标   `
+cali_2_mc = [231.7,167.2]  # 右上角，第二个标定点的机械臂坐标，要手动填！
 
-    # 整理两个标定点的坐标
-    cali_1_im = [138,339]  # 左下角，第一个标定点的像素坐标，要手动填！
-    cali_1_mc = [135.5,20.6]  # 左下角，第一个标定点的机械臂坐标，要手动填！
-    cali_2_im = [369,72]  # 右上角，第二个标定点的像素坐标   `
-    cali_2_mc = [231.7,167.2]  # 右上角，第二个标定点的机械臂坐标，要手动填！
+X_cali_im = [cali_1_im[0], cali_2_im[0]]  # 像素坐标
+X_cali_mc = [cali_1_mc[0], cali_2_mc[0]]  # 机械臂坐标
+Y_cali_im = [cali_2_im[1], cali_1_im[1]]  # 像素坐标，先小后大
+Y_cali_mc = [cali_2_mc[1], cali_1_mc[1]]  # 机械臂坐标，先大后小
 
-    X_cali_im = [cali_1_im[0], cali_2_im[0]]  # 像素坐标
-    X_cali_mc = [cali_1_mc[0], cali_2_mc[0]]  # 机械臂坐标
-    Y_cali_im = [cali_2_im[1], cali_1_im[1]]  # 像素坐标，先小后大
-    Y_cali_mc = [cali_2_mc[1], cali_1_mc[1]]  # 机械臂坐标，先大后小
+# 透视标定（calibrate_cli.py生成temp/handeye.json），文件更新后自动重新加载
+handeye = HandEye('temp/handeye.json')
 
-    # X差值
-    X_mc = int(np.interp(X_im, X_cali_im, X_cali_mc))
 
-    # Y差值
-    Y_mc = int(np.interp(Y_im, Y_cali_im, Y_cali_mc))
+def eye2hand_batch(points):
+    '''
+    批量将图像像素坐标转换为机械臂坐标
+    有透视标定文件时用单应矩阵一次性变换，否则使用两点线性标定
+    points：N×2 像素坐标
+    返回：N×2 整数机械臂坐标
+    '''
+    pts = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+    if handeye.is_calibrated():
+        world = handeye.pixels_to_world(pts)
+    else:
+        world = np.stack([np.interp(pts[:, 0], X_cali_im, X_cali_mc),
+                          np.interp(pts[:, 1], Y_cali_im, Y_cali_mc)], axis=1)
+    return world.astype(int)
 
-    return X_mc, Y_mc
+
+def eye2hand(X_im=160, Y_im=120):
+    '''
+    输入目标点在图像中的像素坐标，转换为机械臂坐标
+    '''
+    X_mc, Y_mc = eye2hand_batch([[X_im, Y_im]])[0]
+    return int(X_mc), int(Y_mc)
 
 
 def pump_move(mc,
@@ -164,7 +353,7 @@ def pump_move(mc,
     # 吸泵移动至物体上方
     print('    吸泵移动至物体上方')
     mc.send_coords([XY_START[0], XY_START[1], HEIGHT_SAFE, 0, 180, 90], 20, 0)
-    time.sleep(4)
+    wait_motion([XY_START[0], XY_START[1], HEIGHT_SAFE], mode=1, fallback=4, arm=mc)
 
     # 开启吸泵
     pump_on()
@@ -173,22 +362,22 @@ def pump_move(mc,
     print('    吸泵向下吸取物体')
     #mc.send_coords([XY_START[0], XY_START[1], HEIGHT_START, 0, 180, 90], 15, 0)
     mc.send_coords([XY_START[0], XY_START[1], 85, 0, 180, 90], 15, 0)
-    time.sleep(3)
+    wait_motion([XY_START[0], XY_START[1], 85], mode=1, fallback=3, arm=mc)
 
     # 升起物体
     print('    升起物体')
     mc.send_coords([XY_START[0], XY_START[1], HEIGHT_SAFE, 0, 180, 90], 20, 0)
-    time.sleep(4)
+    wait_motion([XY_START[0], XY_START[1], HEIGHT_SAFE], mode=1, fallback=4, arm=mc)
 
     # 搬运物体至目标上方
     print('    搬运物体至目标上方')
     mc.send_coords([XY_END[0], XY_END[1], HEIGHT_SAFE, 0, 180, 90], 20, 0)
-    time.sleep(3.5)
+    wait_motion([XY_END[0], XY_END[1], HEIGHT_SAFE], mode=1, fallback=3.5, arm=mc)
 
     # 向下放下物体
     print('    向下放下物体')
     mc.send_coords([XY_END[0], XY_END[1], HEIGHT_END, 0, 180, 90], 20, 0)
-    time.sleep(3)
+    wait_motion([XY_END[0], XY_END[1], HEIGHT_END], mode=1, fallback=3, arm=mc)
 
     # 关闭吸泵
     pump_off()
@@ -196,7 +385,7 @@ def pump_move(mc,
     # 机械臂归零
     print('    机械臂归零')
     mc.send_angles([0, 0, 0, 0, 0, 0], 40)
-    time.sleep(1)
+    wait_motion([0, 0, 0, 0, 0, 0], fallback=1, arm=mc)
 def pump_movetome(mc,
               XY_START=[230, -50],
               HEIGHT_START=90,
@@ -211,7 +400,7 @@ def pump_movetome(mc,
     # 吸泵移动至物体上方
     print('    吸泵移动至物体上方')
     mc.send_coords([XY_START[0], XY_START[1], HEIGHT_SAFE, 0, 180, 90], 20, 0)
-    time.sleep(4)
+    wait_motion([XY_START[0], XY_START[1], HEIGHT_SAFE], mode=1, fallback=4, arm=mc)
 
     # 开启吸泵
     pump_on()
@@ -220,23 +409,23 @@ def pump_movetome(mc,
 
     print('    吸泵向下吸取物体')
     mc.send_coords([XY_START[0], XY_START[1], 75, 0, 180, 90], 15, 0)
-    time.sleep(2)
+    wait_motion([XY_START[0], XY_START[1], 75], mode=1, fallback=2, arm=mc)
 
     # 升起物体
     print('    升起物体')
     mc.send_coords([XY_START[0], XY_START[1], HEIGHT_SAFE, 0, 180, 90], 20, 0)
-    time.sleep(4)
+    wait_motion([XY_START[0], XY_START[1], HEIGHT_SAFE], mode=1, fallback=4, arm=mc)
 
     # 搬运物体
     print('    搬运物体')
     mc.send_coords([XY_END[0], XY_END[1], HEIGHT_SAFE, -90, 50, -80], 20, 0)
-    time.sleep(10)
+    wait_motion([XY_END[0], XY_END[1], HEIGHT_SAFE], mode=1, fallback=10, arm=mc)
 
 
 
     # 机械臂归零
     print('    机械臂归零')
     mc.send_angles([0, 0, 0, 0, 0, 0], 40)
-    time.sleep(1)
+    wait_motion([0, 0, 0, 0, 0, 0], fallback=1, arm=mc)
     # 关闭吸泵
     pump_off()
@@ -0,0 +1,172 @@
+# utils_telemetry.py
+# 机械臂状态遥测：后台线程按固定频率读取关节角和坐标，存入预分配的环形缓冲区，并推送给订阅者
+# 各个使用方直接读取最新状态，不再各自占用串口轮询
+
+import threading
+import time
+
+import numpy as np
+
+TELEMETRY_RATE = 10         # 默认采样频率（Hz）
+TELEMETRY_CAPACITY = 2048   # 环形缓冲区容量（条）
+
+
+class TelemetrySampler:
+    '''
+    机械臂状态采样线程
+    每次采样只发一条get_angles_coords指令（关节角+坐标），with_encoders=True时同时读取编码器，
+    机械臂支持pipeline_query时（open_arm打开的mycobot280.MyCobot280、仿真机械臂、代理客户端）两条查询合并为一次串口往返
+    缓冲区每行：[时间戳, 6个关节角, 6个坐标(, 6个编码器)]
+    '''
+
+    def __init__(self, arm, rate=TELEMETRY_RATE, capacity=TELEMETRY_CAPACITY, with_encoders=False):
+        self.arm = arm
+        self.rate = rate
+        self.with_encoders = with_encoders
+        self.buffer = np.full((capacity, 19 if with_encoders else 13), np.nan)
+        self.count = 0                  # 累计采样条数，写入位置为 count % capacity
+        self.errors = 0                 # 读数异常次数
+        self.subscribers = []
+        self.cond = threading.Condition()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if self.running:
+            return self
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1)
+
+    def subscribe(self, callback):
+        '''
+        订阅新采样，callback(时间戳, 关节角, 坐标, 编码器)在采样线程中调用，应尽快返回；不读编码器时编码器为None
+        '''
+        with self.cond:
+            self.subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        with self.cond:
+            if callback in self.subscribers:
+                self.subscribers.remove(callback)
+
+    def latest(self, after=None, timeout=1.0):
+        '''
+        最新一条采样，返回(时间戳, 关节角, 坐标, 编码器)，超时返回None
+        after：只接受该时间（time.time()）之后的采样
+        '''
+        def ready():
+            return self.count > 0 and (after is None or self.buffer[(self.count - 1) % len(self.buffer), 0] > after)
+
+        with self.cond:
+            if not self.cond.wait_for(ready, timeout):
+                return None
+            return self._split(self.buffer[(self.count - 1) % len(self.buffer)].copy())
+
+    def history(self, seconds=None, n=None):
+        '''
+        按时间顺序返回缓冲区中的采样（N×13或N×19数组）
+        seconds：只返回最近若干秒；n：只返回最近n条
+        '''
+        with self.cond:
+            size = min(self.count, len(self.buffer))
+            end = self.count % len(self.buffer)
+            rows = np.roll(self.buffer, -end, axis=0)[len(self.buffer) - size:] if size else self.buffer[:0].copy()
+        if n is not None:
+            rows = rows[-n:]
+        if seconds is not None and len(rows):
+            rows = rows[rows[:, 0] >= rows[-1, 0] - seconds]
+        return rows
+
+    def enable_encoders(self):
+        '''
+        运行中开启编码器采样，缓冲区扩展为19列，已有采样的编码器列为NaN
+        '''
+        with self.cond:
+            if self.with_encoders:
+                return
+            buffer = np.full((len(self.buffer), 19), np.nan)
+            buffer[:, :13] = self.buffer
+            self.buffer = buffer
+            self.with_encoders = True
+
+    def _split(self, row):
+        return row[0], row[1:7], row[7:13], (row[13:19] if len(row) > 13 else None)
+
+    def _read(self):
+        if not self.with_encoders:
+            return self.arm.get_angles_coords(), None
+        if hasattr(self.arm, 'pipeline_query'):
+            return self.arm.pipeline_query('get_angles_coords', 'get_encoders')
+        return self.arm.get_angles_coords(), self.arm.get_encoders()
+
+    def _loop(self):
+        period = 1.0 / self.rate
+        next_t = time.monotonic()
+        while self.running:
+            try:
+                angles_coords, encoders = self._read()
+            except Exception as e:
+                print('[telemetry] 读取机械臂状态失败', e)
+                angles_coords, encoders = None, None
+            t = time.time()
+            ok = isinstance(angles_coords, list) and len(angles_coords) >= 12 and \
+                (encoders is None or (isinstance(encoders, list) and len(encoders) >= 6))
+            if ok:
+                row = [t] + list(angles_coords[:12]) + (list(encoders[:6]) if encoders is not None else [])
+                with self.cond:
+                    if len(row) < self.buffer.shape[1]:
+                        row += [np.nan] * (self.buffer.shape[1] - len(row))     # 刚开启编码器采样
+                    self.buffer[self.count % len(self.buffer)] = row
+                    self.count += 1
+                    subscribers = list(self.subscribers)
+                    self.cond.notify_all()
+                sample = self._split(np.array(row))
+                for callback in subscribers:
+                    try:
+                        callback(*sample)
+                    except Exception as e:
+                        print('[telemetry] 订阅者处理出错', e)
+            else:
+                self.errors += 1
+
+            # 按单调时钟排期，串口耗时不会累积成频率漂移；落后超过一个周期时不再追赶
+            next_t += period
+            delay = next_t - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_t = time.monotonic()
+
+
+_samplers = {}
+_samplers_lock = threading.Lock()
+
+
+def get_telemetry(arm, rate=TELEMETRY_RATE, with_encoders=False):
+    '''
+    获取并启动该机械臂的全局唯一采样线程；已在运行时直接返回（rate被忽略，需要时开启编码器采样）
+    '''
+    with _samplers_lock:
+        sampler = _samplers.get(id(arm))
+        if sampler is None or not sampler.running:
+            sampler = TelemetrySampler(arm, rate=rate, with_encoders=with_encoders).start()
+            _samplers[id(arm)] = sampler
+        elif with_encoders:
+            sampler.enable_encoders()
+        return sampler
+
+
+def running_telemetry(arm):
+    '''
+    该机械臂正在运行的采样线程，没有时返回None
+    '''
+    sampler = _samplers.get(id(arm))
+    return sampler if sampler is not None and sampler.running else None
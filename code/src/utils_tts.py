@@ -3,31 +3,159 @@
 
 print('导入语音合成模块')
 
+import io
 import os
-import appbuilder
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from API_KEY import *
 import pyaudio
 import wave
+from utils_resource import lazy, appbuilder_client
+from utils_tts_cache import TTSCache, prompt_phrases
 
-tts_ab = appbuilder.TTS()
+tts_ab = lazy('appbuilder_tts', appbuilder_client('TTS'))   # 语音合成组件，第一次合成时才创建
 
-def tts(TEXT='我是多模态六轴机械臂', tts_wav_path = 'temp/tts.wav'):
+TTS_MODEL = 'paddlespeech-tts'
+tts_cache = TTSCache('temp/tts_cache', capacity=256)      # 常用回复的语音缓存
+
+# 预热的常用语
+COMMON_PHRASES = ['我是多模态六轴机械臂', '好的', '稍等一下', '我没有听清，请再说一遍']
+
+def synthesize(TEXT):
     '''
-    语音合成TTS，生成wav音频文件
+    调用云端语音合成，返回wav音频内容（bytes）
     '''
+    import appbuilder
     inp = appbuilder.Message(content={"text": TEXT})
-    out = tts_ab.run(inp, model="paddlespeech-tts", audio_type="wav")
+    out = tts_ab.run(inp, model=TTS_MODEL, audio_type="wav")
     # out = tts_ab.run(inp, audio_type="wav")
+    return out.content["audio_binary"]
+
+def tts(TEXT='我是多模态六轴机械臂', tts_wav_path = 'temp/tts.wav', use_cache=True):
+    '''
+    语音合成TTS，生成wav音频文件
+    同样的文字合成过一次后直接使用缓存的音频，不再请求云端
+    '''
     with open(tts_wav_path, "wb") as f:
-        f.write(out.content["audio_binary"])
+        f.write(tts_audio(TEXT, use_cache))
     # print("TTS语音合成，导出wav音频文件至：{}".format(tts_wav_path))
 
+def prewarm_tts(phrases=None):
+    '''
+    预先合成常用语并写入缓存，已缓存的跳过
+    按speak_stream的分句方式切开后逐句缓存，播报时才能按句命中
+    phrases：默认为COMMON_PHRASES和智能体系统提示词示例中的回复
+    '''
+    if phrases is None:
+        from utils_agent import AGENT_SYS_PROMPT
+        phrases = COMMON_PHRASES + prompt_phrases(AGENT_SYS_PROMPT)
+    count = 0
+    for text in dict.fromkeys(piece for phrase in phrases for piece in split_sentences(phrase)):
+        if tts_cache.contains(text, TTS_MODEL):
+            continue
+        try:
+            tts_cache.put(text, TTS_MODEL, synthesize(text))
+            count += 1
+        except Exception as e:
+            print('[prewarm_tts] 合成失败', text, e)
+    print('语音缓存预热完成，新合成 {} 条'.format(count), tts_cache.stats())
+
+class AudioPlayer:
+    '''
+    进程内播放wav音频：PyAudio和输出流常驻，格式不变时连续播放不再重新打开设备
+    多个线程同时播放时按先后顺序排队
+    '''
+
+    def __init__(self):
+        self.p = pyaudio.PyAudio()
+        self.stream = None
+        self.format = None          # (采样宽度, 声道数, 采样率)
+        self.lock = threading.Lock()
+
+    def play(self, wav):
+        '''
+        播放wav音频，wav为文件路径或wav文件内容（bytes），阻塞到播放完毕
+        '''
+        source = io.BytesIO(wav) if isinstance(wav, (bytes, bytearray)) else wav
+        with wave.open(source, 'rb') as wf:
+            fmt = (wf.getsampwidth(), wf.getnchannels(), wf.getframerate())
+            frames = wf.readframes(wf.getnframes())
+        with self.lock:
+            if fmt != self.format:
+                self._close_stream()
+                self.stream = self.p.open(format=self.p.get_format_from_width(fmt[0]),
+                                          channels=fmt[1],
+                                          rate=fmt[2],
+                                          output=True)
+                self.format = fmt
+            self.stream.write(frames)
+
+    def _close_stream(self):
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.stream = None
+
+    def close(self):
+        with self.lock:
+            self._close_stream()
+            self.p.terminate()
+
+
+player = lazy('audio_player', AudioPlayer)    # 扬声器输出，第一次播放时才打开
+
 def play_wav(wav_file='asset/welcome.wav'):
     '''
     播放wav音频文件
     '''
-    prompt = 'aplay -t wav {} -q'.format(wav_file)
-    os.system(prompt)
+    player.play(wav_file)
+
+def split_sentences(TEXT, max_len=40):
+    '''
+    按句号、问号、感叹号、分号、换行把回复切成句子，过长的句子再按逗号切开，过短的片段并入前一句
+    '''
+    sentences = []
+    for sentence in re.findall(r'[^。！？!?；;\n]+[。！？!?；;]*', str(TEXT)):
+        pieces = [sentence] if len(sentence) <= max_len else re.findall(r'[^，,、]+[，,、]*', sentence)
+        for piece in pieces:
+            piece = piece.strip()
+            if not piece:
+                continue
+            if sentences and (len(piece) < 4 or len(sentences[-1]) < 4) and len(sentences[-1]) + len(piece) <= max_len:
+                sentences[-1] += piece
+            else:
+                sentences.append(piece)
+    return sentences
+
+def tts_audio(TEXT, use_cache=True):
+    '''
+    语音合成，返回wav音频内容（bytes），优先使用缓存
+    '''
+    cached = tts_cache.get(TEXT, TTS_MODEL) if use_cache else None
+    if cached:
+        with open(cached, 'rb') as f:
+            return f.read()
+    audio = synthesize(TEXT)
+    if use_cache:
+        tts_cache.put(TEXT, TTS_MODEL, audio)
+    return audio
+
+tts_pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix='tts')   # 分句并行合成
+
+def speak_stream(TEXT):
+    '''
+    分句流式朗读：回复切成句子后并行合成，第一句合成好就开始播放，后面的句子边播边合成
+    '''
+    sentences = split_sentences(TEXT)
+    futures = [tts_pool.submit(tts_audio, sentence) for sentence in sentences]
+    for sentence, future in zip(sentences, futures):
+        try:
+            audio = future.result()
+        except Exception as e:
+            print('[speak_stream] 语音合成失败，跳过', sentence, e)
+            continue
+        player.play(audio)
 
 # def play_wav(wav_file='temp/tts.wav'):
 #     '''
@@ -56,4 +184,8 @@ def play_wav(wav_file='asset/welcome.wav'):
 #     # 停止流，关闭流和PyAudio
 #     stream.stop_stream()
 #     stream.close()
-#     p.terminate()
\ No newline at end of file
+#     p.terminate()
+
+if __name__ == '__main__':
+    # 预热语音缓存：python utils_tts.py
+    prewarm_tts()
@@ -0,0 +1,133 @@
+# utils_tts_cache.py
+# 语音合成结果缓存：相同文字、音色、模型的语音只合成一次，之后直接播放本地wav文件
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+def tts_key(text, model, voice=''):
+    '''
+    缓存键：文字（去掉空白）+ 音色 + 模型的SHA1
+    '''
+    text = re.sub(r'\s+', '', str(text))
+    return hashlib.sha1('{}|{}|{}'.format(model, voice, text).encode('utf-8')).hexdigest()
+
+
+def prompt_phrases(prompt):
+    '''
+    从系统提示词的示例中提取'response'回复，作为预热的常用语
+    '''
+    return re.findall(r"'response'\s*:\s*'([^']+)'", prompt)
+
+
+class TTSCache:
+    '''
+    以内容哈希为键的语音合成缓存，音频保存为目录下的wav文件，索引文件记录文字和最近使用顺序
+    超出条数或总大小时淘汰最久未使用的音频
+    '''
+
+    def __init__(self, folder='temp/tts_cache', capacity=256, max_bytes=64 * 1024 * 1024):
+        self.folder = folder
+        self.capacity = capacity          # 最多缓存条数
+        self.max_bytes = max_bytes        # 最多占用磁盘字节数
+        self.index_path = os.path.join(folder, 'index.json')
+        self.entries = OrderedDict()      # 键 -> {'text', 'bytes', 'time'}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self._load()
+
+    def path(self, key):
+        return os.path.join(self.folder, key + '.wav')
+
+    def get(self, text, model, voice=''):
+        '''
+        查询缓存，命中返回wav文件路径，未命中返回None
+        '''
+        key = tts_key(text, model, voice)
+        with self.lock:
+            if key not in self.entries or not os.path.exists(self.path(key)):
+                self.entries.pop(key, None)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.entries[key]['time'] = time.time()
+            self.hits += 1
+            return self.path(key)
+
+    def contains(self, text, model, voice=''):
+        '''
+        是否已缓存，不计入命中统计、不改变淘汰顺序（用于预热）
+        '''
+        key = tts_key(text, model, voice)
+        with self.lock:
+            return key in self.entries and os.path.exists(self.path(key))
+
+    def put(self, text, model, audio, voice=''):
+        '''
+        写入缓存，返回wav文件路径；超出容量时淘汰最久未使用的音频，并保存索引
+        audio：wav文件内容（bytes）
+        '''
+        key = tts_key(text, model, voice)
+        with self.lock:
+            os.makedirs(self.folder, exist_ok=True)
+            tmp_path = self.path(key) + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(audio)
+            os.replace(tmp_path, self.path(key))
+            self.entries[key] = {'text': text, 'bytes': len(audio), 'time': time.time()}
+            self.entries.move_to_end(key)
+            self._evict()
+            self._save()
+            return self.path(key)
+
+    def clear(self):
+        with self.lock:
+            for key in self.entries:
+                if os.path.exists(self.path(key)):
+                    os.remove(self.path(key))
+            self.entries.clear()
+            self._save()
+
+    def stats(self):
+        '''
+        命中统计：{'hits', 'misses', 'hit_rate', 'size', 'bytes'}
+        '''
+        total = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'size': len(self.entries),
+                'bytes': sum(e['bytes'] for e in self.entries.values())}
+
+    def _evict(self):
+        total = sum(e['bytes'] for e in self.entries.values())
+        while len(self.entries) > 1 and (len(self.entries) > self.capacity or total > self.max_bytes):
+            key, entry = self.entries.popitem(last=False)
+            total -= entry['bytes']
+            if os.path.exists(self.path(key)):
+                os.remove(self.path(key))
+
+    def _load(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, 'r') as f:
+                items = json.load(f)
+            for item in sorted(items, key=lambda item: item['time']):
+                if os.path.exists(self.path(item['key'])):
+                    self.entries[item['key']] = {'text': item['text'], 'bytes': item['bytes'], 'time': item['time']}
+        except Exception as e:
+            print('[TTSCache] 索引文件读取失败，忽略', e)
+            self.entries.clear()
+
+    def _save(self):
+        os.makedirs(self.folder, exist_ok=True)
+        data = [dict(key=k, **e) for k, e in self.entries.items()]
+        with open(self.index_path, 'w') as f:
+            json.dump(data, f, ensure_ascii=False)
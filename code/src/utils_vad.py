@@ -0,0 +1,122 @@
+# utils_vad.py
+# 流式语音活动检测（VAD）：按30毫秒分帧，用短时能量+过零率判断语音帧，自适应噪声底，
+# 说话前的音频只保存在固定长度的环形缓冲区里（预录），检测到说话结束后只输出语音段
+
+import collections
+
+import numpy as np
+
+VAD_RATE = 16000        # 采样率
+FRAME_MS = 30           # 帧长（毫秒）
+PRE_ROLL = 0.3          # 预录时长（秒），语音段前面保留的音频，避免吞掉第一个字
+HANGOVER = 0.6          # 拖尾时长（秒），静音超过该时长判定说话结束
+START_FRAMES = 3        # 连续若干帧为语音才开始录音，过滤短促的噪声
+MAX_DURATION = 10       # 语音段最长时长（秒）
+MIN_ENERGY = 300        # 语音帧最小能量（16位采样的均方根）
+ENERGY_RATIO = 3.0      # 能量超过噪声底的倍数才算语音
+ZCR_MAX = 0.35          # 过零率上限，能量不够高时过零率过高视为噪声（风声、嘶嘶声）
+
+
+class StreamingVAD:
+    '''
+    流式语音活动检测
+    push(数据)：送入任意长度的16位PCM数据（多声道为交错存储），说话结束时返回语音段（bytes，原声道格式），否则返回None
+    flush()：没有等到说话结束（如超时）时取出已录到的语音段
+    on_frame：可选回调，开始说话后每一帧（含预录的帧）到来时立即调用，用于流式识别
+    '''
+
+    def __init__(self, rate=VAD_RATE, channels=1, frame_ms=FRAME_MS, pre_roll=PRE_ROLL, hangover=HANGOVER,
+                 start_frames=START_FRAMES, max_duration=MAX_DURATION, min_energy=MIN_ENERGY, on_frame=None):
+        self.on_frame = on_frame
+        self.rate = rate
+        self.channels = channels
+        self.frame_samples = int(rate * frame_ms / 1000)
+        self.frame_bytes = self.frame_samples * 2 * channels
+        frame_s = frame_ms / 1000.0
+        self.hangover_frames = max(1, int(round(hangover / frame_s)))
+        self.start_frames = start_frames
+        self.max_frames = int(max_duration / frame_s)
+        self.min_energy = min_energy
+        self.pre_roll = collections.deque(maxlen=max(start_frames, int(round(pre_roll / frame_s)) + start_frames))
+        self.reset()
+
+    def reset(self):
+        self.pending = b''          # 不足一帧的剩余数据
+        self.pre_roll.clear()
+        self.speech = []            # 语音段的帧
+        self.triggered = False      # 是否已经开始说话
+        self.voiced_run = 0         # 连续语音帧数
+        self.silent_run = 0         # 开始说话后连续静音帧数
+        self.noise = None           # 噪声底能量
+        self.frames = 0             # 已处理帧数
+
+    def is_speech(self, frame):
+        '''
+        判断一帧是否为语音，同时在非语音帧上更新噪声底
+        '''
+        samples = np.frombuffer(frame, dtype=np.int16)
+        if self.channels > 1:
+            samples = samples[::self.channels]
+        samples = samples.astype(np.float32)
+        energy = float(np.sqrt(np.mean(samples ** 2)))
+        zcr = float(np.mean(np.abs(np.diff(np.signbit(samples).astype(np.int8)))))
+        if self.noise is None:
+            self.noise = energy
+        threshold = max(self.min_energy, self.noise * ENERGY_RATIO)
+        speech = energy > threshold and (zcr < ZCR_MAX or energy > 2 * threshold)
+        if not speech:
+            self.noise = 0.95 * self.noise + 0.05 * energy
+        return speech
+
+    def push(self, data):
+        data = self.pending + data
+        usable = len(data) - len(data) % self.frame_bytes
+        self.pending = data[usable:]
+        for start in range(0, usable, self.frame_bytes):
+            segment = self._frame(data[start:start + self.frame_bytes])
+            if segment is not None:
+                return segment
+        return None
+
+    def flush(self):
+        '''
+        取出已录到的语音段，没有检测到说话时返回b''
+        '''
+        segment = b''.join(self.speech) if self.triggered else b''
+        self.reset()
+        return segment
+
+    @property
+    def duration(self):
+        # 已处理的音频时长（秒）
+        return self.frames * self.frame_samples / float(self.rate)
+
+    def _frame(self, frame):
+        self.frames += 1
+        speech = self.is_speech(frame)
+        if not self.triggered:
+            self.pre_roll.append(frame)
+            self.voiced_run = self.voiced_run + 1 if speech else 0
+            if self.voiced_run >= self.start_frames:
+                print('检测到说话，开始录音')
+                self.triggered = True
+                self.speech = list(self.pre_roll)
+                self.pre_roll.clear()
+                if self.on_frame is not None:
+                    for f in self.speech:
+                        self.on_frame(f)
+            return None
+        self.speech.append(frame)
+        if self.on_frame is not None:
+            self.on_frame(frame)
+        self.silent_run = 0 if speech else self.silent_run + 1
+        if self.silent_run >= self.hangover_frames:
+            print('说话结束')
+            # 去掉拖尾的静音，只保留一小段
+            keep = len(self.speech) - self.silent_run + min(self.silent_run, self.start_frames)
+            self.speech = self.speech[:keep]
+            return self.flush()
+        if len(self.speech) >= self.max_frames:
+            print('语音过长，录音结束')
+            return self.flush()
+        return None
@@ -10,11 +10,15 @@ from PIL import Image, ImageFont, ImageDraw
 import openai
 import base64
 import json
-# 中文字体路径（请确保存在）
-font = ImageFont.truetype('asset/SimHei.ttf', 26)
+from utils_resource import lazy
+# 中文字体路径（请确保存在），第一次画图时才加载
+font = lazy('font_simhei_26', lambda: ImageFont.truetype('asset/SimHei.ttf', 26))
 
 from API_KEY import *          # YI_KEY / Qwen_KEY
-from utils_tts import *        # tts / play_wav
+from utils_tts import *        # tts / play_wav / speak_stream
+from utils_client import get_client  # 复用客户端与HTTP连接池
+from utils_vlm_cache import VLMCache
+from utils_camera import show_image   # 只在主线程显示窗口
 
 OUTPUT_VLM = ''
 
@@ -52,17 +56,20 @@ SYSTEM_PROMPT_VQA = '''
 我现在的指令是：
 '''
 
+# ---------- 上传前图像预处理 ----------
+from utils_vlm_image import *     # encode_image / rescale_boxes
+
 # ---------- Yi-Vision ----------
-def yi_vision_api(prompt='帮我把红色方块放在钢笔上', img_path='temp/vl_now.jpg', vlm_option=0):
+def yi_vision_api(prompt='帮我把红色方块放在钢笔上', img_path='temp/vl_now.jpg', vlm_option=0, img=None):
     if vlm_option == 0:
         system = SYSTEM_PROMPT_CATCH
     else:
         system = SYSTEM_PROMPT_VQA
 
-    client = openai.OpenAI(api_key=YI_KEY, base_url="https://api.lingyiwanwu.com/v1")
+    client = get_client("https://api.lingyiwanwu.com/v1", YI_KEY)
 
-    with open(img_path, 'rb') as f:
-        img_b64 = base64.b64encode(f.read()).decode()
+    # 缩放、重新编码后上传，img为None时读取img_path
+    img_url, scale = encode_image(img if img is not None else img_path)
 
     res = client.chat.completions.create(
         model="yi-vision-v2",
@@ -71,7 +78,7 @@ def yi_vision_api(prompt='帮我把红色方块放在钢笔上', img_path='temp/
                 "role": "user",
                 "content": [
                     {"type": "text", "text": system + prompt},
-                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{img_b64}"}}
+                    {"type": "image_url", "image_url": {"url": img_url}}
                 ]
             }
         ]
@@ -79,22 +86,35 @@ def yi_vision_api(prompt='帮我把红色方块放在钢笔上', img_path='temp/
 
     result = res.choices[0].message.content.strip()
     if vlm_option == 0:
-        return eval(result)
+        return rescale_boxes(eval(result), scale)
     else:
         print(result)
-        tts(result)
-        play_wav('temp/tts.wav')
+        speak_stream(result)
         return result
 
 
 # ---------- Qwen-VL ----------
+QWEN_VL_MODEL = "qwen-vl-max"   # 可改 qwen-vl-max 等
+
+# 问答结果缓存：64位感知哈希汉明距离≤4视为同一画面，5分钟过期
+vlm_cache = VLMCache('temp/vlm_cache.json', capacity=64, ttl=300, max_distance=4)
+# 定位结果缓存：框坐标直接决定机械臂抓取、放置的位置，画面哈希相近后还要求起点、终点框内的画面
+# 基本不变（平均灰度差≤8），重新拍照的噪声不影响命中，框内物体挪动时重新识别，5分钟过期
+grounding_cache = VLMCache('temp/vlm_grounding_cache.json', capacity=32, ttl=300, max_distance=6,
+                           region_tolerance=8)
+GROUNDING_OPTIONS = (0, 2)      # 输出物体框坐标的系统提示词编号
+
 def QwenVL_api(prompt='帮我把红色方块放在钢笔上',
                img_path='temp/vl_now.jpg',
                vlm_option=0,
-               max_retry=4):
+               max_retry=4,
+               img=None,
+               use_cache=True):
     """
     调用 Qwen-VL 并安全解析 JSON
-    return: dict，如 {"start":"...","start_xyxy":[...], ...}
+    img: 已拍摄的BGR图像，为None时读取img_path
+    use_cache: 画面和指令都没变时直接返回缓存结果
+    return: dict，如 {"start":"...","start_xyxy":[...], ...}，坐标为原图像素坐标
     """
 
     if vlm_option==0:
@@ -104,24 +124,35 @@ def QwenVL_api(prompt='帮我把红色方块放在钢笔上',
     if vlm_option==2:
         system=SYSTEM_PROMPT_CATCHTOME
 
-    client = openai.OpenAI(
-        api_key="sk-39e69b06c77440eaa7a1be063b42a520",
-        base_url="https://dashscope.aliyuncs.com/compatible-mode/v1"
-    )
+    client = get_client("https://dashscope.aliyuncs.com/compatible-mode/v1",
+                        "sk-39e69b06c77440eaa7a1be063b42a520")
+
+    if img is None:
+        img = cv2.imread(img_path)
+
+    cache = grounding_cache if vlm_option in GROUNDING_OPTIONS else vlm_cache
+    if use_cache:
+        result = cache.get(img, prompt, vlm_option, QWEN_VL_MODEL)
+        if result is not None:
+            print('[QwenVL_api] 画面与指令未变，使用缓存结果', cache.stats())
+            if vlm_option != 0:
+                print(result)
+                speak_stream(str(result))
+            return result
 
-    with open(img_path, 'rb') as f:
-        img_b64 = base64.b64encode(f.read()).decode()
+    # 缩放、重新编码后上传，返回的框坐标再按比例换算回原图
+    img_url, scale = encode_image(img)
 
     for attempt in range(1, max_retry + 1):
         try:
             res = client.chat.completions.create(
-                model="qwen-vl-max",   # 可改 qwen-vl-max 等
+                model=QWEN_VL_MODEL,
                 messages=[
                     {
                         "role": "user",
                         "content": [
                             {"type": "image_url",
-                             "image_url": {"url": f"data:image/jpeg;base64,{img_b64}"}},
+                             "image_url": {"url": img_url}},
                             {"type": "text",
                              "text": system + prompt}
                         ]
@@ -135,13 +166,14 @@ def QwenVL_api(prompt='帮我把红色方块放在钢笔上',
                 raw = raw[7:]
             if raw.endswith("```"):
                 raw = raw[:-3]
-            result = json.loads(raw.strip())
+            result = rescale_boxes(json.loads(raw.strip()), scale)
+            if use_cache:
+                cache.put(img, prompt, vlm_option, QWEN_VL_MODEL, result)
 
             # 如果是纯问答模式，直接朗读
             if vlm_option != 0:
                 print(result)
-                tts(str(result))
-                play_wav('temp/tts.wav')
+                speak_stream(str(result))
 
             return result
 
@@ -188,8 +220,8 @@ def post_processing_viz(result, img_path, check=False):
     img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
     pil = Image.fromarray(img_rgb)
     draw = ImageDraw.Draw(pil)
-    draw.text((sx_min, sy_min - 32), start_name, font=font, fill=(255, 0, 0))
-    draw.text((ex_min, ey_min - 32), end_name, font=font, fill=(0, 0, 255))
+    draw.text((sx_min, sy_min - 32), start_name, font=font.get(), fill=(255, 0, 0))
+    draw.text((ex_min, ey_min - 32), end_name, font=font.get(), fill=(0, 0, 255))
     img = cv2.cvtColor(np.array(pil), cv2.COLOR_RGB2BGR)
 
     # 保存
@@ -198,7 +230,7 @@ def post_processing_viz(result, img_path, check=False):
     cv2.imwrite('temp/vl_now_viz.jpg', img)
     cv2.imwrite(f'visualizations/{time.strftime("%Y%m%d%H%M")}.jpg', img)
 
-    cv2.imshow('zihao_vlm', img)
+    show_image('zihao_vlm', img)
 
 
     return sx_c, sy_c, ex_c, ey_c
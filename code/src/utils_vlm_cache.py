@@ -0,0 +1,172 @@
+# utils_vlm_cache.py
+# 多模态大模型结果缓存：桌面画面没变、指令相同时直接返回上次的识别结果
+
+import copy
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+def image_hash(img, size=8):
+    '''
+    计算图像的差值感知哈希（dHash），共size×size位，画面轻微噪声、亮度波动不影响结果
+    size=8（64位）只反映画面大致布局；size越大越能分辨物体的小幅移动
+    img：BGR或灰度图像数组
+    '''
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def box_regions(img, result, size=16):
+    '''
+    截取结果中各个框（start_xyxy、end_xyxy等）内的画面，缩放为size×size灰度图，用于判断框内物体是否挪动
+    返回[灰度图, ...]，按框的名称排序；结果不含框时返回空列表
+    '''
+    if not isinstance(result, dict):
+        return []
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    h, w = gray.shape[:2]
+    regions = []
+    for key in sorted(k for k in result if k.endswith('_xyxy')):
+        try:
+            (x1, y1), (x2, y2) = result[key]
+        except (TypeError, ValueError):
+            continue
+        x1, x2 = sorted((min(max(int(x1), 0), w - 1), min(max(int(x2), 0), w - 1)))
+        y1, y2 = sorted((min(max(int(y1), 0), h - 1), min(max(int(y2), 0), h - 1)))
+        crop = gray[y1:y2 + 1, x1:x2 + 1]
+        regions.append(cv2.resize(crop, (size, size), interpolation=cv2.INTER_AREA))
+    return regions
+
+
+def regions_match(old, new, tolerance):
+    '''
+    各个框内画面的平均灰度差都不超过tolerance时视为框内物体没有挪动
+    '''
+    if len(old) != len(new):
+        return False
+    return all(np.mean(np.abs(np.asarray(a, dtype=float) - np.asarray(b, dtype=float))) <= tolerance
+               for a, b in zip(old, new))
+
+
+def normalize_prompt(prompt):
+    '''
+    指令归一化：去掉空白和首尾标点，英文转小写
+    '''
+    prompt = re.sub(r'\s+', '', str(prompt)).lower()
+    return prompt.strip('。，,.!！?？')
+
+
+class VLMCache:
+    '''
+    内存LRU + 磁盘持久化的大模型结果缓存
+    键为(画面感知哈希, 归一化指令, 系统提示词编号, 模型名)，画面哈希的汉明距离不超过max_distance即视为同一画面
+    hash_size：感知哈希边长，哈希共hash_size×hash_size位
+    region_tolerance：不为None时，画面哈希相近后再比较结果中各个框内的画面（平均灰度差），
+    用于定位结果：整体画面几乎不变、但被抓取或放置的物体挪动了几厘米时也不会返回旧的框
+    '''
+
+    def __init__(self, path='temp/vlm_cache.json', capacity=64, ttl=600, max_distance=4, hash_size=8,
+                 region_tolerance=None):
+        self.path = path
+        self.hash_size = hash_size        # 感知哈希边长
+        self.capacity = capacity          # 最多缓存条数
+        self.ttl = ttl                    # 缓存有效期（秒）
+        self.max_distance = max_distance  # 画面哈希汉明距离阈值（0-hash_size²）
+        self.region_tolerance = region_tolerance    # 框内画面平均灰度差阈值，None表示不比较
+        self.entries = OrderedDict()      # (指令, 系统提示词编号, 模型, 哈希) -> (写入时间, 结果, 框内画面)
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self._load()
+
+    def get(self, img, prompt, system_id, model):
+        '''
+        查询缓存，命中返回结果的副本，未命中返回None
+        '''
+        h = image_hash(img, self.hash_size)
+        prompt = normalize_prompt(prompt)
+        now = time.time()
+        with self.lock:
+            candidates = []
+            for key, (t, _, _) in list(self.entries.items()):
+                if now - t > self.ttl:
+                    del self.entries[key]
+                    continue
+                if key[:3] != (prompt, system_id, model):
+                    continue
+                dist = (key[3] ^ h).bit_count()
+                if dist <= self.max_distance:
+                    candidates.append((dist, key))
+            best_key = None
+            for _, key in sorted(candidates, key=lambda c: c[0]):
+                _, result, regions = self.entries[key]
+                if self.region_tolerance is None or \
+                        regions_match(regions, box_regions(img, result), self.region_tolerance):
+                    best_key = key
+                    break
+            if best_key is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(best_key)
+            self.hits += 1
+            return copy.deepcopy(self.entries[best_key][1])
+
+    def put(self, img, prompt, system_id, model, result):
+        '''
+        写入缓存，超出容量时淘汰最久未使用的条目，并同步保存到磁盘
+        '''
+        key = (normalize_prompt(prompt), system_id, model, image_hash(img, self.hash_size))
+        regions = box_regions(img, result) if self.region_tolerance is not None else []
+        with self.lock:
+            self.entries[key] = (time.time(), copy.deepcopy(result), regions)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+            self._save()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self._save()
+
+    def stats(self):
+        '''
+        命中统计：{'hits', 'misses', 'hit_rate', 'size'}
+        '''
+        total = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'size': len(self.entries)}
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                for item in json.load(f):
+                    key = (item['prompt'], item['system_id'], item['model'], item['hash'])
+                    regions = [np.array(r, dtype=np.uint8) for r in item.get('regions', [])]
+                    self.entries[key] = (item['time'], item['result'], regions)
+        except Exception as e:
+            print('[VLMCache] 缓存文件读取失败，忽略', e)
+            self.entries.clear()
+
+    def _save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        data = [{'prompt': k[0], 'system_id': k[1], 'model': k[2], 'hash': k[3],
+                 'time': t, 'result': r, 'regions': [g.tolist() for g in regions]}
+                for k, (t, r, regions) in self.entries.items()]
+        with open(self.path, 'w') as f:
+            json.dump(data, f, ensure_ascii=False)
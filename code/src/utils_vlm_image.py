@@ -0,0 +1,47 @@
+# utils_vlm_image.py
+# 上传多模态大模型前的图像预处理：内存中缩放、重新编码，大模型返回的框坐标换算回原图
+
+import base64
+
+import cv2
+
+VLM_MAX_SIDE = 512         # 上传图像最长边（像素），超过则等比缩小，0表示不缩放；摄像头采集640×480，缩到512×384
+VLM_IMG_FORMAT = '.jpg'    # 上传编码格式，'.jpg' 或 '.webp'
+VLM_IMG_QUALITY = 80       # 编码质量（0-100）
+
+
+def encode_image(img, max_side=VLM_MAX_SIDE, fmt=VLM_IMG_FORMAT, quality=VLM_IMG_QUALITY):
+    '''
+    上传前在内存中缩放并重新编码图像，不读写磁盘
+    img：BGR图像数组，或图片路径
+    返回：(data URL, 缩放比例)，缩放比例 = 原图尺寸 / 上传图尺寸
+    '''
+    if isinstance(img, str):
+        img = cv2.imread(img)
+    h, w = img.shape[:2]
+    scale = 1.0
+    if max_side and max(h, w) > max_side:
+        scale = max(h, w) / max_side
+        img = cv2.resize(img, (round(w / scale), round(h / scale)), interpolation=cv2.INTER_AREA)
+
+    if fmt == '.webp':
+        params, mime = [cv2.IMWRITE_WEBP_QUALITY, quality], 'image/webp'
+    else:
+        params, mime = [cv2.IMWRITE_JPEG_QUALITY, quality], 'image/jpeg'
+    ok, buf = cv2.imencode(fmt, img, params)
+    if not ok:
+        raise ValueError('图像编码失败')
+    img_b64 = base64.b64encode(buf.tobytes()).decode()
+    return f"data:{mime};base64,{img_b64}", scale
+
+
+def rescale_boxes(result, scale):
+    '''
+    把大模型在缩小图上给出的start_xyxy/end_xyxy换算回原图像素坐标
+    '''
+    if scale == 1.0 or not isinstance(result, dict):
+        return result
+    for key in ('start_xyxy', 'end_xyxy'):
+        if key in result:
+            result[key] = [[int(round(v * scale)) for v in xy] for xy in result[key]]
+    return result
@@ -10,37 +10,18 @@ HEIGHT_SAFE = 220          # 搬运安全高度
 HEIGHT_START = 85        # 起点高度
 HEIGHT_END   = 130         # 终点高度
 
-def vlm_move(PROMPT='帮我把绿色方块放在小猪佩奇上', input_way='keyboard'):
+def vlm_locate(PROMPT='帮我把绿色方块放在小猪佩奇上', img_bgr=None, vlm_option=0):
     '''
-    多模态大模型识别图像，吸泵吸取并移动物体
-    input_way：speech语音输入，keyboard键盘输入
+    将俯视图输入给多模态视觉大模型，定位起点、终点物体，失败自动重试
+    img_bgr：俯视图，为None时读取temp/vl_now.jpg
+    vlm_option：0-起点和终点，2-只有起点（拿给我）
     '''
-    print('多模态大模型识别图像，吸泵吸取并移动物体')
-
-    # 机械臂归零
-    print('机械臂归零')
-    mc.send_angles([0, 0, 0, 0, 0, 0], 50)
-    time.sleep(1)
-
-    ## 第一步：完成手眼标定
-    print('第一步：完成手眼标定')
-
-    ## 第二步：发出指令
-    print('第二步，给出的指令是：', PROMPT)
-
-    ## 第三步：拍摄俯视图
-    print('第三步：拍摄俯视图')
-    top_view_shot(check=False)
-
-    ## 第四步：将图片输入给多模态视觉大模型
-    print('第四步：将图片输入给多模态视觉大模型')
-    img_path = 'temp/vl_now.jpg'
-
+    result = None
     n = 1
     while n < 5:
         try:
             print('    尝试第 {} 次访问多模态大模型'.format(n))
-            result = QwenVL_api(PROMPT, img_path='temp/vl_now.jpg')
+            result = QwenVL_api(PROMPT, img=img_bgr, vlm_option=vlm_option)
             #result = yi_vision_api(PROMPT, img_path='temp/vl_now.jpg')
             print('    多模态大模型调用成功！')
             print(result)
@@ -48,6 +29,39 @@ def vlm_move(PROMPT='帮我把绿色方块放在小猪佩奇上', input_way='key
         except Exception as e:
             print('    多模态大模型返回数据结构错误，再尝试一次', e)
             n += 1
+    return result
+
+
+def vlm_move(PROMPT='帮我把绿色方块放在小猪佩奇上', input_way='keyboard', result=None):
+    '''
+    多模态大模型识别图像，吸泵吸取并移动物体
+    input_way：speech语音输入，keyboard键盘输入
+    result：已提前拍照并完成的视觉定位结果，传入时跳过第一步至第四步
+    '''
+    print('多模态大模型识别图像，吸泵吸取并移动物体')
+    img_path = 'temp/vl_now.jpg'
+
+    if result is None:
+        # 机械臂归零
+        print('机械臂归零')
+        mc.send_angles([0, 0, 0, 0, 0, 0], 50)
+        wait_motion([0, 0, 0, 0, 0, 0], fallback=1)
+
+        ## 第一步：完成手眼标定
+        print('第一步：完成手眼标定')
+
+        ## 第二步：发出指令
+        print('第二步，给出的指令是：', PROMPT)
+
+        ## 第三步：拍摄俯视图
+        print('第三步：拍摄俯视图')
+        img_bgr = top_view_shot(check=False)
+
+        ## 第四步：将图片输入给多模态视觉大模型
+        print('第四步：将图片输入给多模态视觉大模型')
+        result = vlm_locate(PROMPT, img_bgr)
+    else:
+        print('使用提前完成的视觉定位结果：', result)
 
     ## 第五步：视觉大模型输出结果后处理和可视化
     print('第五步：视觉大模型输出结果后处理和可视化')
@@ -55,10 +69,9 @@ def vlm_move(PROMPT='帮我把绿色方块放在小猪佩奇上', input_way='key
     print('像素坐标为', START_X_CENTER, START_Y_CENTER, END_X_CENTER, END_Y_CENTER)
     ## 第六步：手眼标定转换为机械臂坐标
     print('第六步：手眼标定，将像素坐标转换为机械臂坐标')
-    # 起点，机械臂坐标
-    START_X_MC, START_Y_MC = eye2hand(START_X_CENTER, START_Y_CENTER)
-    # 终点，机械臂坐标
-    END_X_MC, END_Y_MC = eye2hand(END_X_CENTER, END_Y_CENTER)
+    # 起点、终点一次性批量转换为机械臂坐标
+    (START_X_MC, START_Y_MC), (END_X_MC, END_Y_MC) = eye2hand_batch(
+        [[START_X_CENTER, START_Y_CENTER], [END_X_CENTER, END_Y_CENTER]]).tolist()
     print('机械臂坐标为',START_X_MC, START_Y_MC,END_X_MC, END_Y_MC)
 
     ## 第七步：吸泵吸取移动物体
@@ -67,7 +80,7 @@ def vlm_move(PROMPT='帮我把绿色方块放在小猪佩奇上', input_way='key
 
     ## 第八步：收尾
     print('第八步：任务完成')
-    cv2.destroyAllWindows()  # 关闭所有opencv窗口
+    close_windows()  # 关闭所有opencv窗口
 
 
 def vlm_vqa(PROMPT='请数一数图中中几个方块', input_way='keyboard'):
@@ -78,14 +91,14 @@ def vlm_vqa(PROMPT='请数一数图中中几个方块', input_way='keyboard'):
     # 机械臂归零
     print('机械臂归零')
     mc.send_angles([0, 0, 0, 0, 0, 0], 50)
-    time.sleep(3)
+    wait_motion([0, 0, 0, 0, 0, 0], fallback=3)
 
     print('第二步，给出的指令是：', PROMPT)
-    top_view_shot(check=False)
+    img_bgr = top_view_shot(check=False)
     img_path = 'temp/vl_now.jpg'
 
-    result = QwenVL_api(PROMPT, img_path='temp/vl_now.jpg', vlm_option=1)
+    result = QwenVL_api(PROMPT, img=img_bgr, vlm_option=1)
     print('    多模态大模型调用成功！')
 
-    cv2.destroyAllWindows()  # 关闭所有opencv窗口
+    close_windows()  # 关闭所有opencv窗口
     return result
\ No newline at end of file
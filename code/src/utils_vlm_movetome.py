@@ -3,6 +3,7 @@
 from utils_robot import *
 from utils_asr import *
 from utils_vlm import *
+from utils_vlm_move import vlm_locate
 import time
 import numpy as np
 import base64
@@ -11,44 +12,35 @@ HEIGHT_SAFE = 250          # 搬运安全高度
 HEIGHT_START = 95        # 起点高度
 HEIGHT_END   = 250         # 终点高度
 
-def vlm_movetome(PROMPT='我把绿色方块拿给我', input_way='keyboard'):
+def vlm_movetome(PROMPT='我把绿色方块拿给我', input_way='keyboard', result=None):
     '''
     多模态大模型识别图像，吸泵吸取并移动物体
     input_way：speech语音输入，keyboard键盘输入
+    result：已提前拍照并完成的视觉定位结果，传入时跳过第一步至第四步
     '''
     print('多模态大模型识别图像，吸泵吸取并移动物体')
 
-    # 机械臂归零
-    print('机械臂归零')
-    mc.send_angles([0, 0, 0, 0, 0, 0], 50)
-    time.sleep(1)
+    if result is None:
+        # 机械臂归零
+        print('机械臂归零')
+        mc.send_angles([0, 0, 0, 0, 0, 0], 50)
+        wait_motion([0, 0, 0, 0, 0, 0], fallback=1)
 
-    ## 第一步：完成手眼标定
-    print('第一步：完成手眼标定')
+        ## 第一步：完成手眼标定
+        print('第一步：完成手眼标定')
 
-    ## 第二步：发出指令
-    print('第二步，给出的指令是：', PROMPT)
+        ## 第二步：发出指令
+        print('第二步，给出的指令是：', PROMPT)
 
-    ## 第三步：拍摄俯视图
-    print('第三步：拍摄俯视图')
-    top_view_shot(check=False)
+        ## 第三步：拍摄俯视图
+        print('第三步：拍摄俯视图')
+        img_bgr = top_view_shot(check=False)
 
-    ## 第四步：将图片输入给多模态视觉大模型
-    print('第四步：将图片输入给多模态视觉大模型')
-    img_path = 'temp/vl_now.jpg'
-
-    n = 1
-    while n < 5:
-        try:
-            print('    尝试第 {} 次访问多模态大模型'.format(n))
-            result = QwenVL_api(PROMPT, img_path='temp/vl_now.jpg', vlm_option=2)
-            #result = yi_vision_api(PROMPT, img_path='temp/vl_now.jpg')
-            print('    多模态大模型调用成功！')
-            print(result)
-            break
-        except Exception as e:
-            print('    多模态大模型返回数据结构错误，再尝试一次', e)
-            n += 1
+        ## 第四步：将图片输入给多模态视觉大模型
+        print('第四步：将图片输入给多模态视觉大模型')
+        result = vlm_locate(PROMPT, img_bgr, vlm_option=2)
+    else:
+        print('使用提前完成的视觉定位结果：', result)
 
     ## 第五步：视觉大模型输出结果后处理和可视化
     print('第五步：视觉大模型输出结果后处理和可视化')
@@ -72,5 +64,5 @@ def vlm_movetome(PROMPT='我把绿色方块拿给我', input_way='keyboard'):
 
     ## 第八步：收尾
     print('第八步：任务完成')
-    cv2.destroyAllWindows()  # 关闭所有opencv窗口
+    close_windows()  # 关闭所有opencv窗口
 
@@ -0,0 +1,7 @@
+# 测试时从code/src导入模块，与直接在code/src下运行脚本一致
+import os
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
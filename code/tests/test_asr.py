@@ -0,0 +1,84 @@
+# utils_asr.stream_recognition：合成的PCM音频按实时节奏送入，中间结果逐步变长，拖尾结束后很快给出最终结果；
+# utils_vad.StreamingVAD：只输出语音段，纯噪声不触发
+
+import time
+
+import numpy as np
+
+from utils_asr import CHANNELS, CHUNK, RATE, ScriptedRecognizer, stream_recognition
+from utils_vad import HANGOVER, PRE_ROLL, StreamingVAD
+
+TEXT = '帮我把红色方块放到绿色方块上面然后回到初始位置'
+
+
+def pcm(seconds, tone=0.0, amplitude=0, noise=50, seed=0, channels=CHANNELS):
+    '''
+    合成16位PCM：tone赫兹的正弦（模拟说话）叠加高斯噪声，多声道交错存储
+    '''
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * RATE)) / float(RATE)
+    samples = amplitude * np.sin(2 * np.pi * tone * t) + rng.normal(0, noise, len(t))
+    samples = np.clip(samples, -32768, 32767).astype(np.int16)
+    return np.repeat(samples, channels).tobytes()
+
+
+def chunks(data, realtime=False, log=None):
+    # 按麦克风读取的块大小送出；realtime=True时按实际录音节奏，log记录每块送出的时刻
+    size = CHUNK * 2 * CHANNELS
+    for start in range(0, len(data), size):
+        if realtime:
+            time.sleep(CHUNK / float(RATE))
+        if log is not None:
+            log.append(time.time())
+        yield data[start:start + size]
+
+
+def utterance(speech=2.0, lead=0.5, trail=1.5):
+    return pcm(lead, seed=1) + pcm(speech, tone=200, amplitude=4000, seed=2) + pcm(trail, seed=3)
+
+
+def test_partials_grow_and_final_follows_hangover():
+    lead, speech = 0.5, 2.0
+    recognizer = ScriptedRecognizer(TEXT, chars_per_second=4.0, delay=0.2)
+    fed = []
+    events = []
+    for kind, text in stream_recognition(recognize=recognizer, source=chunks(utterance(speech, lead), True, fed)):
+        events.append((kind, text, time.time()))
+
+    partials = [text for kind, text, _ in events if kind == 'partial']
+    assert len(partials) >= 2
+    for before, after in zip(partials, partials[1:]):
+        assert after.startswith(before) and len(after) > len(before)
+
+    kind, final, t_final = events[-1]
+    assert kind == 'final'
+    assert final.startswith(partials[-1]) and TEXT.startswith(final)
+    # 说话结束后静音满HANGOVER秒的那一块送入时刻，最终结果最多再等一次识别
+    hangover_end = fed[int((lead + speech + HANGOVER) * RATE / CHUNK) - 1]
+    assert t_final - hangover_end < recognizer.delay + 0.3
+    assert len(fed) < (lead + speech + HANGOVER + 0.3) * RATE / CHUNK   # 拖尾结束后不再继续录音
+
+
+def test_noise_alone_gives_empty_final():
+    recognizer = ScriptedRecognizer(TEXT)
+    events = list(stream_recognition(recognize=recognizer, TIMEOUT=1, source=chunks(pcm(3.0, noise=80))))
+    assert events == [('final', '')]
+    assert recognizer.calls == 0
+
+
+def test_vad_returns_speech_with_pre_roll():
+    lead, speech = 0.5, 1.0
+    vad = StreamingVAD(rate=RATE, channels=CHANNELS)
+    segments = [s for s in map(vad.push, chunks(utterance(speech, lead))) if s is not None]
+    assert len(segments) == 1
+    duration = len(segments[0]) / float(RATE * 2 * CHANNELS)
+    # 语音段 = 预录 + 说话 + 一小段拖尾，前面其余的静音和后面的拖尾静音都不保留
+    assert speech + PRE_ROLL - 0.1 < duration < speech + PRE_ROLL + 0.2
+
+
+def test_vad_ignores_noise():
+    vad = StreamingVAD(rate=RATE, channels=CHANNELS)
+    assert all(vad.push(c) is None for c in chunks(pcm(2.0, noise=80)))
+    # 能量高但过零率也高的嘶嘶声不算说话
+    assert all(vad.push(c) is None for c in chunks(pcm(1.0, noise=400, seed=4)))
+    assert vad.flush() == b''
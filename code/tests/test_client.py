@@ -0,0 +1,96 @@
+# utils_client.get_client：同一(base_url, api_key)复用客户端，超时、重试设置生效，多次请求复用同一条HTTP连接
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+import utils_client
+from utils_client import CLIENT_MAX_RETRIES, CLIENT_TIMEOUT, CONNECT_TIMEOUT, close_clients, get_client
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    '''
+    最小的OpenAI兼容接口：记录每个请求的客户端端口（同一端口即同一条TCP连接），
+    server.failures大于0时先返回500
+    '''
+    protocol_version = 'HTTP/1.1'       # 支持长连接
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.server.requests.append(self.client_address[1])
+        if self.server.failures > 0:
+            self.server.failures -= 1
+            self.reply(500, {'error': {'message': '服务繁忙'}})
+            return
+        self.reply(200, {'id': 'chatcmpl-1', 'object': 'chat.completion', 'created': 0, 'model': 'stub',
+                         'choices': [{'index': 0, 'finish_reason': 'stop',
+                                      'message': {'role': 'assistant', 'content': '好的'}}]})
+
+    def reply(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.requests = []
+    server.failures = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    close_clients()
+    yield server, 'http://127.0.0.1:{}/v1'.format(server.server_address[1])
+    close_clients()
+    server.shutdown()
+    server.server_close()
+
+
+def chat(client):
+    reply = client.chat.completions.create(model='stub', messages=[{'role': 'user', 'content': '你好'}])
+    return reply.choices[0].message.content
+
+
+def test_client_is_reused_per_base_url_and_key(stub):
+    _, base_url = stub
+    client = get_client(base_url, 'key-a')
+    assert get_client(base_url, 'key-a') is client
+    assert get_client(base_url, 'key-b') is not client
+    assert get_client(base_url + '/', 'key-a') is not client
+    assert len(utils_client._clients) == 3
+
+
+def test_timeout_and_retry_settings(stub):
+    _, base_url = stub
+    client = get_client(base_url, 'key')
+    assert client.max_retries == CLIENT_MAX_RETRIES
+    assert client.timeout == httpx.Timeout(CLIENT_TIMEOUT, connect=CONNECT_TIMEOUT)
+    # 只在首次创建时生效
+    assert get_client(base_url, 'key', timeout=1, max_retries=0) is client
+
+    custom = get_client(base_url, 'other', timeout=10, max_retries=1)
+    assert custom.max_retries == 1
+    assert custom.timeout == httpx.Timeout(10, connect=CONNECT_TIMEOUT)
+
+
+def test_failed_request_is_retried(stub):
+    server, base_url = stub
+    server.failures = 1
+    assert chat(get_client(base_url, 'key', max_retries=1)) == '好的'
+    assert len(server.requests) == 2
+
+
+def test_requests_share_one_pooled_connection(stub):
+    server, base_url = stub
+    for _ in range(5):
+        assert chat(get_client(base_url, 'key')) == '好的'
+    assert len(server.requests) == 5
+    assert len(set(server.requests)) == 1
@@ -0,0 +1,49 @@
+# handeye.HandEye：标定文件原子写入；重新加载失败时沿用原标定并在下次调用时重试
+
+import json
+import os
+
+import numpy as np
+
+from handeye import HandEye
+
+PIXEL = [[100, 100], [500, 100], [500, 400], [100, 400]]
+WORLD = [[250, 150], [250, -150], [100, -150], [100, 150]]
+
+
+def touch_later(path, seconds=1):
+    # 保证修改时间与上次加载时不同（部分文件系统的时间精度较低）
+    st = os.stat(path)
+    os.utime(path, (st.st_atime, st.st_mtime + seconds))
+
+
+def test_save_replaces_file_without_leftovers(tmp_path):
+    path = tmp_path / 'handeye.json'
+    HandEye(str(path)).calibrate(PIXEL, WORLD)
+    assert json.loads(path.read_text())['pixel'] == PIXEL
+    assert os.listdir(tmp_path) == ['handeye.json']
+
+
+def test_bad_file_keeps_previous_matrix_and_retries(tmp_path):
+    path = tmp_path / 'handeye.json'
+    writer = HandEye(str(path))
+    writer.calibrate(PIXEL, WORLD)
+    reader = HandEye(str(path))
+    before = reader.pixels_to_world([[300, 250]])
+
+    path.write_text('{"pixel": [[100, 100], [500')      # 写了一半的文件
+    touch_later(path)
+    assert not reader.reload_if_changed()
+    np.testing.assert_allclose(reader.pixels_to_world([[300, 250]]), before)
+
+    path.write_text(json.dumps({'pixel': PIXEL}))        # 缺少world
+    touch_later(path, 2)
+    assert not reader.reload_if_changed()
+    np.testing.assert_allclose(reader.pixels_to_world([[300, 250]]), before)
+
+    # 文件写完整后，下次调用重新加载
+    world = [[x + 10, y] for x, y in WORLD]
+    path.write_text(json.dumps({'pixel': PIXEL, 'world': world}))
+    touch_later(path, 3)
+    assert reader.reload_if_changed()
+    np.testing.assert_allclose(reader.pixels_to_world([[300, 250]]), before + [10, 0], atol=1e-3)
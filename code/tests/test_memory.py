@@ -0,0 +1,45 @@
+# utils_memory.ConversationMemory：只有一条system消息，淘汰按整轮进行，对话原文从用户消息开始
+
+from utils_memory import ConversationMemory
+
+
+def chat(memory, rounds, reply_len=10):
+    for i in range(rounds):
+        memory.add('user', '第{}条指令：把红色方块放到绿色方块上'.format(i))
+        memory.add('assistant', '好的' * reply_len + str(i))
+
+
+def check_roles(messages):
+    roles = [m['role'] for m in messages]
+    assert roles[0] == 'system' and roles.count('system') == 1
+    assert roles[1] == 'user'
+    # 用户、助手交替出现
+    assert all(a != b for a, b in zip(roles[1:], roles[2:]))
+
+
+def test_summary_is_merged_into_the_system_message():
+    memory = ConversationMemory('你是机械臂助手', window=4)
+    chat(memory, 5)
+    memory.add('user', '再来一次')
+    messages = memory.messages()
+    check_roles(messages)
+    assert messages[0]['content'].startswith('你是机械臂助手')
+    assert '【之前的对话摘要】' in messages[0]['content']
+    assert '第0条指令' in messages[0]['content']
+    assert messages[-1]['content'] == '再来一次'
+
+
+def test_token_eviction_keeps_whole_rounds():
+    # 助手回复很长，按token预算淘汰时不能只剩下半轮
+    memory = ConversationMemory('你是机械臂助手', max_tokens=150, window=20, summary_tokens=40)
+    for i in range(6):
+        memory.add('user', '指令{}'.format(i))
+        check_roles(memory.messages())
+        memory.add('assistant', '好的' * 40 + str(i))
+        messages = memory.messages()
+        assert [m['role'] for m in messages].count('system') == 1
+        assert len(messages) == 1 or messages[1]['role'] == 'user'
+    memory.add('user', '最后一条')
+    messages = memory.messages()
+    check_roles(messages)
+    assert memory.token_count() <= 150 + 40 + 10
@@ -0,0 +1,161 @@
+# mycobot280.MyCobot280.pipeline_query：用模拟串口检查分帧、按指令码分发应答与回显过滤
+
+import random
+import struct
+
+import pytest
+
+pytest.importorskip('pymycobot')
+
+from pymycobot.common import ProtocolCode
+from pymycobot.generate import CommandGenerator
+
+import robot_broker
+from mycobot280 import MyCobot280
+
+ANGLES = [1000, -2000, 0, 450, -900, 1234]                  # 角度×100
+ENCODERS = [2048, 1000, 3000, 2048, 4000, 10]
+ANGLES_COORDS = ANGLES + [1500, -300, 2000] + [9000, 0, -9000]
+
+
+def reply(genre, values):
+    data = b''.join(struct.pack('>h', v) for v in values)
+    return bytes([0xFE, 0xFE, len(data) + 2, genre]) + data + bytes([ProtocolCode.FOOTER])
+
+
+class FakeSerial:
+    '''
+    模拟机械臂固件：每条指令先回显原帧再应答，一次写入的多条指令的应答顺序打乱，
+    每次read最多返回chunk个字节，模拟应答分多次到达
+    noisy=False时不回显、应答按顺序、没有杂散字节（pymycobot的单条查询只能处理这种情况）
+    late：第一次写入后、真正的应答之前先到达的帧（迟到的、别的查询的应答）
+    '''
+
+    def __init__(self, replies, seed=0, chunk=5, drop=(), noisy=True, late=()):
+        self.noisy = noisy
+        self.late = list(late)
+        self.replies = replies
+        self.drop = set(drop)           # 第一次不应答的指令码，用于测试重发
+        self.random = random.Random(seed)
+        self.chunk = chunk
+        self.buf = bytearray()
+        self.writes = 0
+        self.timeout = 0.1
+
+    def isOpen(self):
+        return True
+
+    def reset_input_buffer(self):
+        self.buf.clear()
+
+    @property
+    def in_waiting(self):
+        return min(len(self.buf), self.chunk)
+
+    def write(self, data):
+        self.writes += 1
+        data = bytes(data)
+        out = [b'\x00\xfe'] if self.noisy else []    # 线路上的杂散字节
+        out, self.late = out + self.late, []
+        i = 0
+        while i + 3 < len(data):
+            n = data[i + 2]
+            genre = data[i + 3]
+            if self.noisy:
+                out.append(data[i:i + 3 + n])   # 回显
+            if genre in self.drop:
+                self.drop.discard(genre)
+            elif genre in self.replies:
+                out.append(reply(genre, self.replies[genre]))
+            i += 3 + n
+        if self.noisy:
+            self.random.shuffle(out)
+        self.buf += b''.join(out)
+
+    def read(self, n=1):
+        n = min(n, self.chunk)
+        data = bytes(self.buf[:n])
+        del self.buf[:n]
+        return data
+
+
+def make_arm(**kwargs):
+    arm = MyCobot280.__new__(MyCobot280)
+    CommandGenerator.__init__(arm, False)
+    arm.thread_lock = False
+    arm._serial_port = FakeSerial({ProtocolCode.GET_ANGLES: ANGLES,
+                                   ProtocolCode.GET_ENCODERS: ENCODERS,
+                                   ProtocolCode.GET_ANGLES_COORDS: ANGLES_COORDS}, **kwargs)
+    return arm
+
+
+def test_interleaved_replies_are_split_and_matched():
+    for seed in range(20):
+        arm = make_arm(seed=seed)
+        angles, encoders, angles_coords = arm.pipeline_query('get_angles', 'get_encoders', 'get_angles_coords')
+        assert angles == [10.0, -20.0, 0.0, 4.5, -9.0, 12.34]
+        assert encoders == ENCODERS
+        assert angles_coords == [10.0, -20.0, 0.0, 4.5, -9.0, 12.34, 150.0, -30.0, 200.0, 90.0, 0.0, -90.0]
+
+
+def test_pipeline_uses_one_write_and_matches_single_queries():
+    arm = make_arm(noisy=False)
+    single = [arm.get_angles(), arm.get_encoders(), arm.get_angles_coords()]
+    writes = arm._serial_port.writes
+    piped = arm.pipeline_query('get_angles', 'get_encoders', 'get_angles_coords')
+    assert piped == single
+    assert writes >= 3
+    assert arm._serial_port.writes - writes == 1
+
+
+def test_late_reply_of_another_query_is_rejected():
+    # 遥测线程与运动指令交替使用串口时，缓冲区里可能有别的查询迟到的应答
+    arm = make_arm(noisy=False, late=[reply(ProtocolCode.GET_ENCODERS, ENCODERS)])
+    assert arm.get_angles() == [10.0, -20.0, 0.0, 4.5, -9.0, 12.34]
+    assert arm._serial_port.writes == 2         # 应答的指令码不对，重发一次
+
+    arm = make_arm(noisy=False, late=[reply(ProtocolCode.GET_ENCODERS, ENCODERS)])
+    arm._serial_port.replies.pop(ProtocolCode.GET_ANGLES)
+    assert arm.get_angles() == -1               # 始终没有正确的应答
+
+
+def test_stale_bytes_are_dropped_before_sending():
+    stale = reply(ProtocolCode.GET_ANGLES, [0] * 6)
+    arm = make_arm(noisy=False)
+    arm._serial_port.buf += stale
+    assert arm.get_angles() == [10.0, -20.0, 0.0, 4.5, -9.0, 12.34]
+
+    arm = make_arm(seed=5)
+    arm._serial_port.buf += stale
+    angles, encoders = arm.pipeline_query('get_angles', 'get_encoders')
+    assert angles == [10.0, -20.0, 0.0, 4.5, -9.0, 12.34] and encoders == ENCODERS
+
+
+def test_repeated_queries_each_get_a_reply():
+    arm = make_arm(seed=3)
+    first, second = arm.pipeline_query('get_encoders', 'get_encoders')
+    assert first == second == ENCODERS
+
+
+def test_missing_reply_is_resent_then_reported():
+    arm = make_arm(drop={ProtocolCode.GET_ENCODERS})
+    assert arm.pipeline_query('get_angles', 'get_encoders', timeout=0.05) == \
+        [[10.0, -20.0, 0.0, 4.5, -9.0, 12.34], ENCODERS]
+    assert arm._serial_port.writes == 2
+
+    arm = make_arm(drop={ProtocolCode.GET_ENCODERS})
+    assert arm.pipeline_query('get_encoders', timeout=0.05, retries=0) == [-1]
+
+
+def test_unknown_query_is_rejected():
+    with pytest.raises(ValueError):
+        make_arm().pipeline_query('send_angles')
+
+
+def test_open_arm_uses_local_class(monkeypatch):
+    opened = []
+    monkeypatch.delenv('MYCOBOT_SIM', raising=False)
+    monkeypatch.setattr(MyCobot280, '__init__', lambda self, port, baud: opened.append(port))
+    arm = robot_broker.open_arm()
+    assert isinstance(arm, MyCobot280) and hasattr(arm, 'pipeline_query')
+    assert opened
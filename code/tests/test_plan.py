@@ -0,0 +1,35 @@
+# utils_plan.run_step：提前定位的结果与编排中的参数合并；utils_camera.show_image只在主线程操作窗口
+
+import threading
+
+import utils_camera
+from utils_plan import build_registry, parse_plan, run_step
+
+
+def vlm_move(PROMPT='帮我把绿色方块放在小猪佩奇上', input_way='keyboard', result=None):
+    return PROMPT, input_way, result
+
+
+def test_extra_kwargs_are_merged_with_step_arguments():
+    registry = build_registry({'vlm_move': vlm_move})
+    plan = parse_plan('{"function": ["vlm_move(\'把红色方块放到篮球上\', input_way=\'speech\')"], "response": "好的"}')
+    result = {'start': '红色方块', 'start_xyxy': [[1, 2], [3, 4]]}
+    assert run_step(plan.steps[0], registry, result=result) == ('把红色方块放到篮球上', 'speech', result)
+    assert run_step(plan.steps[0], registry) == ('把红色方块放到篮球上', 'speech', None)
+
+
+def test_show_image_skips_windows_off_the_main_thread(monkeypatch):
+    calls = []
+    monkeypatch.setattr(utils_camera.cv2, 'imshow', lambda name, img: calls.append(name))
+    monkeypatch.setattr(utils_camera.cv2, 'waitKey', lambda wait: -1)
+    monkeypatch.setattr(utils_camera.cv2, 'destroyAllWindows', lambda: calls.append('close'))
+
+    shown = []
+    worker = threading.Thread(target=lambda: shown.append((utils_camera.show_image('w', None), utils_camera.close_windows())))
+    worker.start()
+    worker.join()
+    assert shown == [(False, None)] and calls == []
+
+    assert utils_camera.show_image('w', None)
+    utils_camera.close_windows()
+    assert calls == ['w', 'close']
@@ -0,0 +1,138 @@
+# 拖动示教回放：关键帧之间插值、排期与轨迹压缩
+
+import threading
+import time
+
+import numpy as np
+
+from mycobot_sim import SimMyCobot280
+from utils_playback import compress, play
+
+
+class RecordingArm:
+    '''
+    记录每条set_encoders指令的发送时间和位置
+    '''
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.commands = []
+        self.t0 = time.monotonic()
+
+    def set_encoders(self, encoders, sp):
+        self.commands.append((time.monotonic() - self.t0, list(encoders)))
+        if self.latency:
+            time.sleep(self.latency)
+
+    def position_at(self, t):
+        # t时刻机械臂收到的最后一个目标
+        last = None
+        for t_sent, encoders in self.commands:
+            if t_sent > t:
+                break
+            last = encoders
+        return last
+
+
+def ramp(duration=2.0, rate=10, start=2048, stop=2923):
+    t = np.arange(int(duration * rate) + 1) / float(rate)
+    encoders = np.zeros((len(t), 6), dtype=int) + 2048
+    encoders[:, 0] = np.rint(start + (stop - start) * t / duration)
+    return t, encoders
+
+
+def test_compressed_ramp_keeps_only_endpoints():
+    t, encoders = ramp()
+    tc, ec = compress(encoders, t)
+    assert len(tc) == 2
+    assert ec[0][0] == 2048 and ec[-1][0] == 2923
+
+
+class SimRecordingArm(SimMyCobot280):
+    '''
+    记录set_encoders指令的仿真机械臂，用于检查控制器按指令速度插值后的实际位置
+    '''
+
+    def __init__(self):
+        super().__init__(latency=0)
+        self.sent = []
+
+    def set_encoders(self, encoders, sp):
+        self.sent.append((list(encoders), sp))
+        return super().set_encoders(encoders, sp)
+
+
+def test_compressed_ramp_sends_one_command_per_keyframe():
+    t, encoders = ramp(duration=2.0)
+    tc, ec = compress(encoders, t)
+    arm = SimRecordingArm()
+    arm.set_encoders(ec[0].tolist(), 100)       # 已在起点
+    time.sleep(0.3)
+    arm.sent.clear()
+    t0 = time.monotonic()
+    positions = []
+    timers = [threading.Timer(2.0 * frac, lambda frac=frac: positions.append((frac, arm.get_encoders()[0])))
+              for frac in (0.25, 0.5, 0.75)]
+    for timer in timers:
+        timer.start()
+    stats = play(arm, ec, tc)
+    for timer in timers:
+        timer.join()
+
+    assert stats['sent'] == len(ec) == 2        # 起点、终点各一条指令
+    assert arm.sent[-1][0][0] == 2923
+    assert abs(time.monotonic() - t0 - 2.0) < 0.2
+    # 控制器按计算出的速度匀速插值，扫过中途各点的时刻与录制时一致
+    for frac, position in positions:
+        expected = 2048 + 875 * frac
+        assert abs(position - expected) < 0.15 * 875, (frac, position, expected)
+
+
+def test_compression_cuts_serial_commands():
+    # 3秒录制：转动、停顿、再转动
+    t = np.arange(31) / 10.0
+    encoders = np.full((31, 6), 2048)
+    encoders[:11, 0] = np.rint(np.linspace(2048, 2600, 11))
+    encoders[11:21, 0] = 2600
+    encoders[21:, 0] = 2600
+    encoders[21:, 1] = np.rint(np.linspace(2048, 1500, 10))
+    raw, compressed = RecordingArm(), RecordingArm()
+    play(raw, encoders, t, keyframes=False)
+    tc, ec = compress(encoders, t)
+    play(compressed, ec, tc)
+    assert len(ec) <= 5
+    assert len(compressed.commands) <= len(ec)
+    assert len(compressed.commands) * 4 <= len(raw.commands)
+
+
+def test_playback_timing_and_speed():
+    t, encoders = ramp(duration=1.0)
+    arm = RecordingArm(latency=0.02)
+    stats = play(arm, encoders, t, speed=2.0)
+    assert abs(stats['duration'] - 0.5) < 0.1
+    assert arm.commands[-1][1][0] == 2923
+
+
+def test_dwell_sends_no_commands():
+    t = np.arange(21) / 10.0
+    encoders = np.full((21, 6), 2048)
+    encoders[-1, 0] = 2100
+    tc, ec = compress(encoders, t)
+    arm = RecordingArm()
+    stats = play(arm, ec, tc, speed=3.0)
+    # 停顿段不发指令：只发起点和终点
+    assert len(arm.commands) == 2
+    assert arm.commands[0][1][0] == 2048
+    assert arm.commands[-1][1][0] == 2100
+    assert stats['idle'] > 0
+
+
+def test_sparse_keyframes_are_interpolated_when_behind():
+    # 指令耗时大于发送周期时跳过过时的发送时刻，发送的位置仍是当前时刻的插值
+    t = np.array([0.0, 1.0])
+    encoders = np.array([[2048] * 6, [3048] + [2048] * 5])
+    arm = RecordingArm(latency=0.25)
+    stats = play(arm, encoders, t, keyframes=False)
+    assert stats['skipped'] > 0
+    for t_sent, sent in arm.commands[1:-1]:
+        assert 2048 < sent[0] < 3048
@@ -0,0 +1,40 @@
+# utils_record：录制文件写入、中断后续录、读取
+
+import numpy as np
+
+from utils_record import RECORD_DTYPE, RecordingWriter, open_recording, save_recording
+
+
+def rows(n, start=0):
+    return [[2048 + start + i] * 6 for i in range(n)]
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'record.rec')
+    save_recording(path, rows(5), t=[0.0, 0.1, 0.25, 0.3, 0.5], meta={'rate': 10})
+    recording = open_recording(path)
+    assert len(recording) == 5
+    assert recording.meta['rate'] == 10
+    np.testing.assert_allclose(recording.t, [0.0, 0.1, 0.25, 0.3, 0.5])
+    assert recording[2] == [2050] * 6
+    assert list(recording) == rows(5)
+
+
+def test_append_after_partial_write(tmp_path):
+    path = str(tmp_path / 'record_live.rec')
+    with RecordingWriter(path, meta={'rate': 10}) as writer:
+        for i, encoders in enumerate(rows(3)):
+            writer.append(encoders, t=i * 0.1)
+    # 录制中断：最后一条记录只写了一部分
+    with open(path, 'ab') as f:
+        f.write(b'\x01' * (RECORD_DTYPE.itemsize // 2))
+    assert len(open_recording(path)) == 3
+
+    with RecordingWriter(path, append=True) as writer:
+        for i, encoders in enumerate(rows(2, start=100)):
+            writer.append(encoders, t=0.3 + i * 0.1)
+
+    recording = open_recording(path)
+    assert recording.meta['rate'] == 10
+    assert list(recording) == rows(3) + rows(2, start=100)
+    np.testing.assert_allclose(recording.t, [0.0, 0.1, 0.2, 0.3, 0.4])
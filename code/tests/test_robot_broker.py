@@ -0,0 +1,105 @@
+# robot_broker：代理进程的优先级队列、异常回传、禁止客户端关闭串口
+
+import itertools
+import os
+import threading
+import time
+
+import pytest
+
+import robot_broker
+from mycobot_sim import SimMyCobot280
+from robot_broker import PRIORITY_MOTION, PRIORITY_QUERY, RobotClient
+
+
+class GatedArm(SimMyCobot280):
+    '''
+    记录执行顺序的仿真机械臂；send_angles阻塞到gate打开，期间其他调用都在代理队列里排队
+    '''
+
+    def __init__(self):
+        super().__init__(latency=0)
+        self.gate = threading.Event()
+        self.busy = threading.Event()       # 工作线程已经在执行send_angles
+        self.log = []
+
+    def send_angles(self, angles, speed, _async=False):
+        self.busy.set()
+        self.gate.wait(5)
+        self.log.append('send_angles')
+        return super().send_angles(angles, speed, _async)
+
+    def get_angles(self):
+        self.log.append('get_angles')
+        return super().get_angles()
+
+    def stop(self):
+        self.log.append('stop')
+        return super().stop()
+
+    def fail(self):
+        raise ValueError('关节超出范围')
+
+
+_sockets = itertools.count()
+
+
+@pytest.fixture
+def broker():
+    # Unix套接字路径长度有限，不用pytest的tmp_path；套接字文件在进程退出时由监听端删除
+    address = '/tmp/mycobot_broker_test_{}_{}.sock'.format(os.getpid(), next(_sockets))
+    arm = GatedArm()
+    threading.Thread(target=robot_broker.serve, kwargs={'arm': arm, 'address': address}, daemon=True).start()
+    deadline = time.time() + 5
+    while not os.path.exists(address) and time.time() < deadline:
+        time.sleep(0.01)
+    motion = RobotClient(address, PRIORITY_MOTION)
+    monitor = RobotClient(address, PRIORITY_QUERY)
+    yield arm, motion, monitor
+    arm.gate.set()
+
+
+def wait_pending(client, n):
+    deadline = time.time() + 5
+    while client.broker_stats()['pending'] < n and time.time() < deadline:
+        time.sleep(0.01)
+    assert client.broker_stats()['pending'] == n
+
+
+def test_urgent_stop_jumps_queued_queries(broker):
+    arm, motion, monitor = broker
+    threads = [threading.Thread(target=motion.send_angles, args=([10, 0, 0, 0, 0, 0], 50))]
+    threads[0].start()
+    assert arm.busy.wait(5)
+    for _ in range(3):
+        threads.append(threading.Thread(target=monitor.get_angles))
+        threads[-1].start()
+    wait_pending(monitor, 3)
+    # 运动优先级的客户端发出的stop也按急停处理
+    threads.append(threading.Thread(target=motion.stop))
+    threads[-1].start()
+    wait_pending(monitor, 4)
+
+    arm.gate.set()
+    for thread in threads:
+        thread.join(5)
+    assert arm.log == ['send_angles', 'stop', 'get_angles', 'get_angles', 'get_angles']
+
+
+def test_exceptions_are_raised_in_the_client(broker):
+    arm, motion, monitor = broker
+    with pytest.raises(ValueError, match='关节超出范围'):
+        motion.fail()
+    # 出错后代理继续服务
+    assert len(monitor.get_angles()) == 6
+
+
+def test_clients_cannot_close_the_serial_port(broker):
+    arm, motion, monitor = broker
+    for method in ('close', 'open', '_wire'):
+        with pytest.raises(AttributeError):
+            motion._broker.call(method, (), {}, PRIORITY_MOTION)
+    motion.close()
+    arm.gate.set()
+    assert motion.send_angles([5, 0, 0, 0, 0, 0], 50) == 1
+    assert len(monitor.get_angles()) == 6
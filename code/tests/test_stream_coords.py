@@ -0,0 +1,88 @@
+# utils_robot：stream_coords的进度来自遥测线程、停滞时急停；拍照前等机械臂停稳
+
+import time
+
+import utils_robot
+from mycobot_sim import SimMyCobot280
+
+START_ANGLES = [0, -30, -60, 0, 0, 0]
+
+
+class CountingArm(SimMyCobot280):
+    '''
+    统计单独的get_coords查询和stop指令；stuck=True时坐标指令不会让机械臂运动
+    '''
+
+    def __init__(self, stuck=False):
+        super().__init__(latency=0.002)
+        self.stuck = stuck
+        self.coord_queries = 0
+        self.stops = 0
+
+    def get_coords(self):
+        self.coord_queries += 1
+        return super().get_coords()
+
+    def send_coords(self, coords, speed, mode=0, _async=False):
+        if self.stuck:
+            self._wire()
+            return 1
+        return super().send_coords(coords, speed, mode, _async)
+
+    def stop(self):
+        self.stops += 1
+        return super().stop()
+
+
+def make_path(arm, n=8):
+    arm.send_angles(START_ANGLES, 100)
+    time.sleep(0.8)
+    x, y, z, rx, ry, rz = arm.get_coords()
+    arm.coord_queries = 0
+    return [[x + 3 * i, y + 2 * i, z, rx, ry, rz] for i in range(1, n + 1)]
+
+
+def test_progress_comes_from_telemetry():
+    arm = CountingArm()
+    path = make_path(arm)
+    try:
+        stats = utils_robot.stream_coords(path, speed=50, rate=5, arm=arm)
+    finally:
+        utils_robot.running_telemetry(arm).stop()
+    assert stats['points'] == len(path)
+    assert arm.coord_queries == 0           # 不再每20毫秒单独查询一次坐标
+    assert arm.stops == 0
+
+
+def test_stall_stops_the_arm():
+    arm = CountingArm(stuck=True)
+    path = make_path(arm)
+    t0 = time.time()
+    try:
+        stats = utils_robot.stream_coords(path, speed=50, rate=5, stall_timeout=0.5, arm=arm)
+    finally:
+        utils_robot.running_telemetry(arm).stop()
+    assert stats['points'] < len(path)
+    assert time.time() - t0 < 2
+    assert arm.stops == 1                   # 控制器队列里已下发的点不再继续执行
+
+
+def test_top_view_waits_until_the_arm_has_settled():
+    # wait_motion在进入到位容差（2度）时就返回，此时机械臂还在减速
+    arm = SimMyCobot280(latency=0.002)
+    arm.send_angles(utils_robot.TOP_VIEW_ANGLES, 10)
+    assert utils_robot.wait_motion(utils_robot.TOP_VIEW_ANGLES, arm=arm)
+    assert utils_robot.wait_settled(arm=arm)
+    assert arm.is_moving() == 0
+    assert utils_robot._in_tolerance(arm.get_angles(), utils_robot.TOP_VIEW_ANGLES, 0.05)
+
+
+def test_settle_falls_back_to_successive_readings():
+    class NoMovingFlag(SimMyCobot280):
+        def is_moving(self):
+            return -1           # 读数异常
+
+    arm = NoMovingFlag(latency=0.002)
+    assert utils_robot.wait_settled(arm=arm)
+    arm.send_angles(utils_robot.TOP_VIEW_ANGLES, 100)
+    assert not utils_robot.wait_settled(timeout=0.05, arm=arm)
@@ -0,0 +1,90 @@
+# 遥测采样线程：合并查询、按发送时间过滤旧采样
+
+import time
+
+import numpy as np
+
+import utils_robot
+from mycobot_sim import SimMyCobot280
+from utils_telemetry import TelemetrySampler
+
+
+class CountingArm(SimMyCobot280):
+    '''
+    统计采样线程发出的串口往返：pipeline_query算一次，单独的查询各算一次
+    '''
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.round_trips = 0
+        self.in_pipeline = False
+
+    def pipeline_query(self, *queries, **kwargs):
+        self.round_trips += 1
+        self.in_pipeline = True
+        try:
+            return super().pipeline_query(*queries, **kwargs)
+        finally:
+            self.in_pipeline = False
+
+    def get_angles_coords(self):
+        self.round_trips += 0 if self.in_pipeline else 1
+        return super().get_angles_coords()
+
+    def get_encoders(self):
+        self.round_trips += 0 if self.in_pipeline else 1
+        return super().get_encoders()
+
+
+def test_encoder_sampling_uses_one_round_trip_per_sample():
+    arm = CountingArm(latency=0.005)
+    sampler = TelemetrySampler(arm, rate=50, with_encoders=True).start()
+    time.sleep(0.5)
+    sampler.stop()
+    assert sampler.count > 5
+    # 关节角坐标+编码器两条查询通过pipeline_query合并为一次串口往返
+    assert arm.round_trips <= sampler.count + 1
+    t, angles, coords, encoders = sampler.latest()
+    assert encoders is not None and len(encoders) == 6
+
+
+def test_latest_after_skips_older_samples():
+    arm = SimMyCobot280(latency=0)
+    sampler = TelemetrySampler(arm, rate=20).start()
+    try:
+        assert sampler.latest(timeout=1) is not None
+        sent_at = time.time()
+        sample = sampler.latest(after=sent_at, timeout=1)
+        assert sample is not None and sample[0] > sent_at
+    finally:
+        sampler.stop()
+
+
+class StaleTelemetry:
+    '''
+    发送指令前的最后一条采样恰好在目标位置，之后机械臂先离开再回到目标
+    '''
+
+    def __init__(self, target, sent_at):
+        self.target = np.array(target, dtype=float)
+        self.sent_at = sent_at
+        self.calls = []
+
+    def latest(self, after=None, timeout=1.0):
+        self.calls.append(after)
+        now = time.time()
+        if after is None:
+            return self.sent_at - 0.05, self.target, np.zeros(6), None
+        away = self.target + (30 if now - self.sent_at < 0.4 else 0)
+        return now, away, np.zeros(6), None
+
+
+def test_wait_motion_ignores_samples_from_before_the_command(monkeypatch):
+    target = [10, 20, 30, 0, 0, 0]
+    sent_at = time.time()
+    telemetry = StaleTelemetry(target, sent_at)
+    monkeypatch.setattr(utils_robot, 'running_telemetry', lambda arm: telemetry)
+    monkeypatch.setattr(utils_robot, 'AWAIT_MOTION', True)
+    assert utils_robot.wait_motion(target, arm=object(), timeout=3, sent_at=sent_at)
+    assert time.time() - sent_at >= 0.4
+    assert all(after is not None for after in telemetry.calls)
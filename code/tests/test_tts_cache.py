@@ -0,0 +1,19 @@
+# utils_tts_cache.TTSCache：预热检查是否已缓存时不计入命中统计
+
+from utils_tts_cache import TTSCache, prompt_phrases
+
+
+def test_contains_does_not_touch_stats(tmp_path):
+    cache = TTSCache(str(tmp_path / 'tts'))
+    assert not cache.contains('好的', 'tts')
+    cache.put('好的', 'tts', b'RIFF....')
+    assert cache.contains('好的', 'tts')
+    assert not cache.contains('好的', 'other-model')
+    assert cache.stats()['hits'] == 0 and cache.stats()['misses'] == 0
+    assert cache.get('好的', 'tts') is not None
+    assert cache.stats()['hits'] == 1
+
+
+def test_prompt_phrases():
+    prompt = "{'function': ['back_zero()'], 'response': '好的，我这就回到原点。'}"
+    assert prompt_phrases(prompt) == ['好的，我这就回到原点。']
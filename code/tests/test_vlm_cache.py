@@ -0,0 +1,57 @@
+# utils_vlm_cache.VLMCache：重新拍摄的同一画面命中缓存，物体挪动后定位结果不能命中旧的框坐标
+
+import numpy as np
+
+from utils_vlm_cache import VLMCache, image_hash
+
+PROMPT = '把红色方块放到绿色方块上'
+BOXES = {'start': '红色方块', 'start_xyxy': [[300, 220], [340, 260]], 'end': '绿色方块', 'end_xyxy': [[100, 100], [140, 140]]}
+
+
+def table(block_x=300, green_y=100, seed=0, noise=2):
+    '''
+    640×480的俯视桌面：渐变底色，一个40像素见方的红色方块（约3厘米）和一个绿色方块，
+    叠加±noise的传感器噪声，seed不同相当于重新拍了一张
+    '''
+    rng = np.random.default_rng(seed)
+    img = np.full((480, 640, 3), 170, dtype=np.uint8)
+    img[:, :, 0] = np.linspace(140, 200, 640, dtype=np.uint8)[None, :]
+    img[220:260, block_x:block_x + 40] = (40, 40, 200)
+    img[green_y:green_y + 40, 100:140] = (40, 200, 40)
+    jitter = rng.integers(-noise, noise + 1, img.shape)
+    return np.clip(img.astype(int) + jitter, 0, 255).astype(np.uint8)
+
+
+def grounding_cache(tmp_path):
+    # 与utils_vlm.grounding_cache相同的设置
+    return VLMCache(str(tmp_path / 'grounding.json'), capacity=32, ttl=300, max_distance=6, region_tolerance=8)
+
+
+def test_coarse_hash_cannot_see_a_small_move():
+    # 64位哈希几乎分辨不出方块挪动约2厘米，所以定位结果还要比较框内画面
+    assert bin(image_hash(table(300)) ^ image_hash(table(330))).count('1') <= 6
+
+
+def test_noisy_recapture_of_same_scene_hits(tmp_path):
+    cache = grounding_cache(tmp_path)
+    cache.put(table(seed=0), PROMPT, 0, 'qwen-vl', BOXES)
+    for seed in range(1, 6):
+        assert cache.get(table(seed=seed), PROMPT, 0, 'qwen-vl') == BOXES
+    assert cache.get(table(seed=1), '把绿色方块放到红色方块上', 0, 'qwen-vl') is None
+
+
+def test_moved_object_misses(tmp_path):
+    cache = grounding_cache(tmp_path)
+    cache.put(table(seed=0), PROMPT, 0, 'qwen-vl', BOXES)
+    for moved in (310, 330, 360):
+        assert cache.get(table(moved, seed=1), PROMPT, 0, 'qwen-vl') is None
+    # 终点物体挪动也要重新识别
+    assert cache.get(table(green_y=115, seed=1), PROMPT, 0, 'qwen-vl') is None
+    assert cache.stats()['misses'] == 4
+
+
+def test_regions_are_persisted(tmp_path):
+    grounding_cache(tmp_path).put(table(seed=0), PROMPT, 0, 'qwen-vl', BOXES)
+    cache = grounding_cache(tmp_path)
+    assert cache.get(table(seed=1), PROMPT, 0, 'qwen-vl') == BOXES
+    assert cache.get(table(330, seed=1), PROMPT, 0, 'qwen-vl') is None
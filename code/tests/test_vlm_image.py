@@ -0,0 +1,41 @@
+# utils_vlm_image：上传前缩小摄像头画面，框坐标换算回原图
+
+import base64
+
+import cv2
+import numpy as np
+
+from utils_vlm_image import VLM_MAX_SIDE, encode_image, rescale_boxes
+
+
+def camera_frame(seed=0):
+    # 640×480的带纹理画面（与摄像头采集尺寸相同）
+    rng = np.random.default_rng(seed)
+    img = cv2.resize(rng.integers(0, 256, (60, 80, 3), dtype=np.uint8), (640, 480), interpolation=cv2.INTER_LINEAR)
+    cv2.rectangle(img, (300, 220), (340, 260), (40, 40, 200), -1)
+    return img
+
+
+def decode(url):
+    data = base64.b64decode(url.split(',', 1)[1])
+    return len(data), cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+def test_camera_frame_is_downscaled_and_smaller():
+    img = camera_frame()
+    full_bytes, _ = decode(encode_image(img, max_side=0)[0])
+    url, scale = encode_image(img)
+    size, uploaded = decode(url)
+    assert VLM_MAX_SIDE < 640
+    assert uploaded.shape[:2] == (384, 512)
+    assert scale == 640 / 512
+    assert size < 0.8 * full_bytes
+
+
+def test_boxes_map_back_to_original_pixels():
+    _, scale = encode_image(camera_frame())
+    box = [[300, 220], [340, 260]]
+    on_upload = [[v / scale for v in xy] for xy in box]
+    # 大模型给出的是缩小图上的整数坐标，换算回原图的误差不超过一个缩小图像素
+    result = rescale_boxes({'start_xyxy': [[round(v) for v in xy] for xy in on_upload]}, scale)
+    assert np.max(np.abs(np.array(result['start_xyxy']) - box)) <= scale